@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+
+from app.crypto_data import get_price_history_batch
+from app.figure_cache import data_fingerprint
+from app.metrics import span
+from app.shared_cache import shared_cache
+
+# Cross-asset statistics over one timestamp-aligned close matrix (rows = UTC days,
+# columns = assets, NaN where an asset has no candle).
+#
+# Everything is computed from daily log returns with matrix products over
+# validity masks: an N-asset correlation or covariance matrix is a few BLAS calls
+# over pairwise-complete observations (like pandas' DataFrame.corr), not N² pair
+# loops, and rolling statistics against the benchmark use cumulative sums along
+# the time axis for every asset at once. Results are cached per (close matrix
+# content, window, benchmark), so reruns and other sessions read them back.
+ANALYTICS_TTL = 600
+# Pairs (and rolling windows) with fewer overlapping returns than this are NaN
+MIN_OBSERVATIONS = 10
+# Crypto trades every day
+PERIODS_PER_YEAR = 365
+DEFAULT_BENCHMARK = "bitcoin"
+
+
+def align_closes(frames, column="Close"):
+    """Close matrix of {crypto_id: frame} on the union of their UTC days, columns in input order."""
+    series = {}
+    for crypto_id, frame in frames.items():
+        if frame is None or frame.empty or column not in frame:
+            continue
+        close = frame[column].astype(np.float64)
+        day = close.index.tz_convert("UTC") if close.index.tz is not None else close.index.tz_localize("UTC")
+        close.index = day.floor("D")
+        series[crypto_id] = close[~close.index.duplicated(keep="last")]
+    if not series:
+        return pd.DataFrame(dtype=np.float64)
+    # One outer join; gaps stay NaN rather than being filled with flat prices
+    return pd.concat(series, axis=1, sort=True)
+
+
+def log_returns(closes):
+    """Daily log returns of a close matrix (one row shorter); NaN next to any gap."""
+    closes = np.asarray(closes, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.diff(np.log(np.where(closes > 0, closes, np.nan)), axis=0)
+
+
+def pairwise_covariance(returns, min_obs=MIN_OBSERVATIONS):
+    """Sample covariance of every column pair over the rows where both are finite.
+
+    Returns ``(cov, var_row, var_col)``: var_row[i, j] and var_col[i, j] are the
+    variances of columns i and j over that same overlap.
+    """
+    valid = np.isfinite(returns)
+    mask = valid.astype(np.float64)
+    x = np.where(valid, returns, 0.0)
+    n = mask.T @ mask
+    sums = x.T @ mask  # sums[i, j]: sum of column i where column j is finite
+    squares = (x * x).T @ mask
+    products = x.T @ x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (products - sums * sums.T / n) / (n - 1)
+        var_row = (squares - sums * sums / n) / (n - 1)
+    too_few = n < max(min_obs, 2)
+    cov[too_few] = np.nan
+    var_row[too_few] = np.nan
+    return cov, var_row, var_row.T
+
+
+def correlation_matrix(returns, min_obs=MIN_OBSERVATIONS):
+    """Pearson correlation of every column pair (pairwise-complete observations)."""
+    cov, var_row, var_col = pairwise_covariance(returns, min_obs)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / np.sqrt(var_row * var_col)
+    np.fill_diagonal(corr, np.where(np.isfinite(np.diag(cov)), 1.0, np.nan))
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _windowed_sums(values, window):
+    c = np.concatenate((np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)))
+    out = np.full(values.shape, np.nan)
+    if values.shape[0] >= window:
+        out[window - 1:] = c[window:] - c[:-window]
+    return out
+
+
+def rolling_benchmark_stats(returns, benchmark, window, min_obs=MIN_OBSERVATIONS):
+    """Rolling correlation with and beta against one benchmark return series, for every column.
+
+    Both are ``returns``-shaped arrays, NaN for the first ``window - 1`` rows and
+    wherever a window holds fewer than ``min_obs`` rows where the column and the
+    benchmark are both finite.
+    """
+    both = np.isfinite(returns) & np.isfinite(benchmark)[:, None]
+    x = np.where(both, returns, 0.0)
+    y = np.where(both, benchmark[:, None], 0.0)
+    n = _windowed_sums(both.astype(np.float64), window)
+    sx, sy = _windowed_sums(x, window), _windowed_sums(y, window)
+    sxx, syy, sxy = _windowed_sums(x * x, window), _windowed_sums(y * y, window), _windowed_sums(x * y, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+        beta = cov / var_y
+    too_few = ~(n >= max(min_obs, 2))
+    corr[too_few] = np.nan
+    beta[too_few] = np.nan
+    return corr, beta
+
+
+@shared_cache(ttl=ANALYTICS_TTL)
+def get_close_matrix(period, crypto_ids):
+    """Aligned closes of ``crypto_ids`` (a tuple) over period; assets without history are left out."""
+    frames = get_price_history_batch(period, crypto_ids)
+    with span("transform.align_closes", assets=len(frames)):
+        return align_closes({crypto_id: frames[crypto_id] for crypto_id in crypto_ids if crypto_id in frames})
+
+
+class _Closes:
+    """A close matrix that cache keys identify by its content, not by its loader's arguments."""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.version = data_fingerprint(frame)
+
+    def __repr__(self):
+        # The shared cache keys on argument reprs: new candles mean new
+        # statistics, while reruns on unchanged data are cache hits
+        return f"_Closes({self.version})"
+
+
+# Each statistic is cached as its own frame, so hits are shallow copy-on-write
+# views; a miss computes its siblings too and primes them.
+@shared_cache(ttl=ANALYTICS_TTL)
+def _window_stat(closes, window, statistic):
+    """Asset x asset "correlation" or "covariance", or one-column "volatility", over the last window days."""
+    ids = list(closes.frame.columns)
+    recent = log_returns(closes.frame.to_numpy())[-window:]
+    with span("transform.cross_asset", assets=len(ids), window=window):
+        cov, _, _ = pairwise_covariance(recent)
+        stats = {
+            "correlation": pd.DataFrame(correlation_matrix(recent), index=ids, columns=ids),
+            "covariance": pd.DataFrame(cov, index=ids, columns=ids),
+            "volatility": pd.DataFrame(
+                {"volatility": np.nanstd(recent, axis=0, ddof=1) * np.sqrt(PERIODS_PER_YEAR)}, index=ids),
+        }
+    for name, frame in stats.items():
+        if name != statistic:
+            _window_stat.prime(frame, closes, window, name)
+    return stats[statistic]
+
+
+@shared_cache(ttl=ANALYTICS_TTL)
+def _rolling_stat(closes, window, benchmark, statistic):
+    """Rolling "correlation" with or "beta" against the benchmark, day x asset."""
+    ids = list(closes.frame.columns)
+    returns = log_returns(closes.frame.to_numpy())
+    with span("transform.cross_asset_rolling", assets=len(ids), window=window):
+        corr, beta = rolling_benchmark_stats(returns, returns[:, ids.index(benchmark)], window)
+    stats = {"correlation": corr, "beta": beta}
+    for name, values in stats.items():
+        stats[name] = pd.DataFrame(values, index=closes.frame.index[1:], columns=ids)
+        if name != statistic:
+            _rolling_stat.prime(stats[name], closes, window, benchmark, name)
+    return stats[statistic]
+
+
+def cross_asset_stats(period, crypto_ids, window, benchmark=DEFAULT_BENCHMARK):
+    """Correlation, covariance, volatility and rolling benchmark stats over the last ``window`` days.
+
+    Returns ``(closes, stats)``. stats maps "correlation" and "covariance" to
+    asset x asset frames of daily log returns, "volatility" to annualized
+    volatility per asset, and (if the benchmark loaded) "rolling_correlation"
+    and "rolling_beta" to day x asset frames.
+    """
+    crypto_ids = tuple(crypto_ids)
+    closes = get_close_matrix(period, crypto_ids)
+    if closes.shape[1] == 0 or len(closes) < 2:
+        return closes, {}
+    # Every statistic is computed from (and keyed on) this one matrix, even if
+    # get_close_matrix's entry expires in between
+    keyed = _Closes(closes)
+    stats = {
+        "correlation": _window_stat(keyed, window, "correlation"),
+        "covariance": _window_stat(keyed, window, "covariance"),
+        "volatility": _window_stat(keyed, window, "volatility")["volatility"],
+    }
+    if benchmark in closes.columns:
+        stats["rolling_correlation"] = _rolling_stat(keyed, window, benchmark, "correlation")
+        stats["rolling_beta"] = _rolling_stat(keyed, window, benchmark, "beta")
+    return closes, stats
@@ -0,0 +1,141 @@
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+# In-memory search over the coin universe: a prefix trie over each coin's
+# symbol, id, name and name words, and a trigram index for misspellings
+# ("etherum", "solanna"). The index is built once from the coin list and then
+# updated in place as refreshed lists and market pages come in; a query walks
+# one trie path and scores the few candidates it finds, well under a
+# millisecond for thousands of coins, so it can run on every keystroke.
+
+# Results returned by search() unless asked otherwise
+DEFAULT_LIMIT = 8
+# Share of the query's trigrams a coin must contain to count as a fuzzy match
+FUZZY_MIN_SIMILARITY = 0.5
+
+# Match kinds, best first; ties go to the higher market cap rank
+EXACT_SYMBOL, EXACT_NAME, SYMBOL_PREFIX, NAME_PREFIX, ID_PREFIX, FUZZY = range(6)
+
+
+def normalize(text):
+    """Case- and accent-folded text with only letters, digits and single spaces."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text).split())
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Node:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()  # every coin with a key through this node
+
+
+class AssetIndex:
+    """Prefix and fuzzy index over ``{'id', 'symbol', 'name', 'rank'}`` entries."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._root = _Node()
+        self._grams = {}   # trigram -> ids
+        self._entries = {}  # id -> (entry, normalized symbol, name, id, keys)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def update(self, entries):
+        """Add new coins and re-index changed ones; unchanged coins are skipped."""
+        with self._lock:
+            for entry in entries:
+                crypto_id = entry['id']
+                fields = (entry.get('symbol') or '', entry.get('name') or crypto_id, entry.get('rank'))
+                current = self._entries.get(crypto_id)
+                if current is not None:
+                    if (current[0].get('symbol') or '', current[0].get('name') or crypto_id,
+                            current[0].get('rank')) == fields:
+                        continue
+                    self._remove(crypto_id)
+                self._add(dict(entry))
+
+    def _add(self, entry):
+        crypto_id = entry['id']
+        symbol, name, id_text = normalize(entry.get('symbol') or ''), normalize(entry.get('name') or crypto_id), normalize(crypto_id)
+        keys = {k for k in (symbol, name, id_text, *name.split(), *id_text.split()) if k}
+        for key in keys:
+            node = self._root
+            for char in key:
+                node = node.children.setdefault(char, _Node())
+                node.ids.add(crypto_id)
+        for gram in set().union(*(_trigrams(k) for k in (symbol, name, id_text) if k)):
+            self._grams.setdefault(gram, set()).add(crypto_id)
+        self._entries[crypto_id] = (entry, symbol, name, id_text, keys)
+
+    def _remove(self, crypto_id):
+        entry, symbol, name, id_text, keys = self._entries.pop(crypto_id)
+        for key in keys:
+            node = self._root
+            for char in key:
+                node = node.children.get(char)
+                if node is None:
+                    break
+                node.ids.discard(crypto_id)
+        for gram in set().union(*(_trigrams(k) for k in (symbol, name, id_text) if k)):
+            self._grams.get(gram, set()).discard(crypto_id)
+
+    def _kind(self, crypto_id, query):
+        _, symbol, name, id_text, _ = self._entries[crypto_id]
+        if symbol == query:
+            return EXACT_SYMBOL
+        if query in (name, id_text):
+            return EXACT_NAME
+        if symbol.startswith(query):
+            return SYMBOL_PREFIX
+        if name.startswith(query) or any(word.startswith(query) for word in name.split()):
+            return NAME_PREFIX
+        return ID_PREFIX
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Up to ``limit`` entries matching ``query``, best first."""
+        query = normalize(query)
+        if not query:
+            return []
+        with self._lock:
+            node = self._root
+            for char in query:
+                node = node.children.get(char)
+                if node is None:
+                    break
+            scored = {}
+            if node is not None:
+                scored = {crypto_id: self._kind(crypto_id, query) for crypto_id in node.ids}
+            if len(scored) < limit and len(query) >= 3:
+                grams = _trigrams(query)
+                hits = Counter(crypto_id for gram in grams for crypto_id in self._grams.get(gram, ()))
+                for crypto_id, count in hits.items():
+                    if crypto_id not in scored and count / len(grams) >= FUZZY_MIN_SIMILARITY:
+                        scored[crypto_id] = FUZZY
+            best = heapq.nsmallest(limit, scored,
+                                   key=lambda c: (scored[c], self._entries[c][0].get('rank') or float("inf"), c))
+            return [self._entries[crypto_id][0] for crypto_id in best]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_asset_index():
+    """Process-wide AssetIndex instance."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = AssetIndex()
+        return _index
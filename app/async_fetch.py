@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+
+def _in_script_context(fn, ctx):
+    """Wrap fn so the worker thread can use st.cache_data and friends."""
+    def run():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return fn()
+    return run
+
+
+async def _gather(calls, ctx):
+    names = list(calls)
+    results = await asyncio.gather(
+        *(asyncio.to_thread(_in_script_context(calls[name], ctx)) for name in names),
+        return_exceptions=True,
+    )
+    return dict(zip(names, results))
+
+
+def fetch_concurrently(**calls):
+    """Run independent blocking calls at the same time and wait for all of them.
+
+    Each keyword maps a name to a zero-argument callable (use a lambda to bind
+    arguments). Returns ``{name: result}``; a call that raised maps to its exception
+    instead, so callers can handle failures per call. Total wall time is that of the
+    slowest call rather than the sum of all of them.
+    """
+    if not calls:
+        return {}
+    return asyncio.run(_gather(calls, get_script_run_ctx()))
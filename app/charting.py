@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Server-side downsampling for the price charts. Browsers can't show more than a
+# couple of points per horizontal pixel, so sending more only grows the payload
+# and render time. Streamlit doesn't report the rendered chart width to the
+# script, so the wide-layout width is assumed.
+DEFAULT_CHART_WIDTH = 1200
+POINTS_PER_PIXEL = 2
+CANDLES_PER_PIXEL = 1 / 3   # a readable candlestick needs ~3px
+# Above this many points line traces are drawn with WebGL (Scattergl) instead of SVG
+WEBGL_THRESHOLD = 5000
+
+
+def target_points(visible_fraction=1.0, width_px=DEFAULT_CHART_WIDTH, points_per_pixel=POINTS_PER_PIXEL):
+    """Points to send so the initially visible part of the series keeps full resolution.
+
+    ``visible_fraction`` is the share of the series inside the initial x-axis range,
+    e.g. 7/180 for a six-month series zoomed to the last week.
+    """
+    visible_fraction = min(max(visible_fraction, 1e-9), 1.0)
+    return max(3, int(width_px * points_per_pixel / visible_fraction))
+
+
+def _x_values(frame, x):
+    values = frame.index if x is None else frame[x]
+    if isinstance(values, pd.DatetimeIndex) or pd.api.types.is_datetime64_any_dtype(values):
+        return pd.DatetimeIndex(values).asi8.astype(np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of ``n_out`` points that keep the shape of y.
+
+    NaN values are skipped; the first and last finite points are always kept.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.flatnonzero(np.isfinite(y))
+    n = finite.size
+    if n_out >= n or n_out < 3:
+        return finite
+    x, y = x[finite], y[finite]
+
+    every = (n - 2) / (n_out - 2)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        picked[i + 1] = a
+    picked[-1] = n - 1
+    return finite[picked]
+
+
+def downsample_frame(frame, y_cols, n_out, x=None):
+    """Rows of ``frame`` picked by LTTB on each of ``y_cols`` (union, in order).
+
+    The budget is split across the columns so the result never exceeds ``n_out`` rows.
+    """
+    if len(frame) <= n_out:
+        return frame
+    xs = _x_values(frame, x)
+    per_col = max(3, n_out // len(y_cols))
+    keep = np.unique(np.concatenate([lttb_indices(xs, frame[col].to_numpy(dtype=np.float64), per_col)
+                                     for col in y_cols]))
+    return frame.iloc[keep]
+
+
+def aggregate_ohlc(frame, n_buckets, open_col="open", high_col="high", low_col="low",
+                   close_col="close", volume_col="volume"):
+    """Merge consecutive candles into at most ``n_buckets`` candles (first/max/min/last/sum)."""
+    n = len(frame)
+    if n <= n_buckets:
+        return frame
+    starts = np.unique(np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1])
+    ends = np.append(starts[1:], n) - 1
+
+    data = {
+        open_col: frame[open_col].to_numpy()[starts],
+        high_col: np.maximum.reduceat(frame[high_col].to_numpy(dtype=np.float64), starts),
+        low_col: np.minimum.reduceat(frame[low_col].to_numpy(dtype=np.float64), starts),
+        close_col: frame[close_col].to_numpy()[ends],
+    }
+    if volume_col in frame.columns:
+        data[volume_col] = np.add.reduceat(frame[volume_col].to_numpy(dtype=np.float64), starts)
+    return pd.DataFrame(data, index=frame.index[starts])
+
+
+def line_trace(x, y, **kwargs):
+    """Scatter trace that switches to WebGL for large series."""
+    trace = go.Scattergl if len(x) > WEBGL_THRESHOLD else go.Scatter
+    return trace(x=x, y=y, **kwargs)
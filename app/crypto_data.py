@@ -1,8 +1,12 @@
-import requests
-import pandas as pd
-import streamlit as st
-from datetime import datetime
-import yfinance as yf
+import os
+from datetime import datetime, timezone
+from app.asset_search import DEFAULT_LIMIT, get_asset_index
+from app.providers import fetch_markets, fetch_quotes, load_daily_history, load_daily_history_batch, register_asset
+from app.refresher import BackgroundRefresher
+from app.shared_cache import shared_cache
+
+# pandas, yfinance and the history store are imported inside the history helpers
+# so the landing page (quotes only) doesn't pay for them at startup
 
 # Define our four main cryptocurrencies
 MAIN_CRYPTOS = {
@@ -36,78 +40,237 @@ MAIN_CRYPTOS = {
     }
 }
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def get_crypto_data():
-    """Get data for our four main cryptocurrencies"""
-    crypto_data = []
+# Quotes are kept fresh by a background refresher; page runs only read its snapshot
+QUOTE_REFRESH_SECONDS = 240
+# Snapshots older than this are flagged as stale on the landing page
+QUOTE_STALE_SECONDS = 600
+
+# Shown only if no live quote has been fetched since the process started
+SAMPLE_CRYPTO_DATA = [
+    {'id': 'bitcoin', 'symbol': 'BTC', 'name': 'Bitcoin', 'icon': '₿', 'color': '#F7931A', 'current_price': 43250, 'price_change_percentage_24h': 2.5, 'market_cap': 850000000000},
+    {'id': 'ethereum', 'symbol': 'ETH', 'name': 'Ethereum', 'icon': 'Ξ', 'color': '#627EEA', 'current_price': 2650, 'price_change_percentage_24h': 1.8, 'market_cap': 320000000000},
+    {'id': 'ripple', 'symbol': 'XRP', 'name': 'XRP', 'icon': '◉', 'color': '#00D4AA', 'current_price': 0.52, 'price_change_percentage_24h': -0.5, 'market_cap': 15000000000},
+    {'id': 'solana', 'symbol': 'SOL', 'name': 'Solana', 'icon': '◎', 'color': '#9945FF', 'current_price': 145, 'price_change_percentage_24h': 3.2, 'market_cap': 42000000000}
+]
+
+# Shared across replicas for half a refresh period, so each replica's refresher
+# mostly reads the snapshot another replica already fetched. The fetch time is
+# cached with the quotes, so a snapshot read back from the cache keeps its real age
+@shared_cache(ttl=QUOTE_REFRESH_SECONDS // 2)
+def _fetch_quotes():
+    """Fetch current quotes for our four main cryptocurrencies (CoinGecko, else Kraken).
+
+    Returns ``(quotes, fetched_at)`` with fetched_at in epoch seconds.
+    """
+    quotes = fetch_quotes(MAIN_CRYPTOS)
     
-    # Try to get real data from CoinGecko
+    crypto_data = []
+    for crypto_id, crypto_info in MAIN_CRYPTOS.items():
+        if crypto_id in quotes:
+            quote = quotes[crypto_id]
+            crypto_data.append({
+                'id': crypto_id,
+                'symbol': crypto_info['symbol'],
+                'name': crypto_info['name'],
+                'icon': crypto_info['icon'],
+                'color': crypto_info['color'],
+                'current_price': quote['price'],
+                'price_change_percentage_24h': quote['change_24h'],
+                'market_cap': _market_cap(crypto_id, quote)
+            })
+    return crypto_data, datetime.now(timezone.utc).timestamp()
+
+# crypto_id -> (price, market cap) of the last quote that had a market cap
+_last_caps = {}
+
+def _market_cap(crypto_id, quote):
+    """Quoted market cap, else the last known one scaled to the current price (supply barely moves)"""
+    if quote['market_cap'] is not None:
+        _last_caps[crypto_id] = (quote['price'], quote['market_cap'])
+        return quote['market_cap']
+    price, cap = _last_caps.get(crypto_id, (0, 0))
+    return cap * quote['price'] / price if price else 0
+
+_quotes = BackgroundRefresher(_fetch_quotes, refresh_after=QUOTE_REFRESH_SECONDS, name="quote-refresher",
+                              timestamped=True)
+
+def get_quote_snapshot():
+    """Latest quotes with their age: {'data', 'fetched_at', 'age', 'is_sample', 'error'}"""
+    data, fetched_at, error = _quotes.get()
+    if data is None:
+        return {'data': SAMPLE_CRYPTO_DATA, 'fetched_at': None, 'age': None, 'is_sample': True, 'error': error}
+    age = max(0.0, datetime.now(timezone.utc).timestamp() - fetched_at)
+    return {'data': data, 'fetched_at': fetched_at, 'age': age, 'is_sample': False, 'error': error}
+
+def get_crypto_data():
+    """Get data for our four main cryptocurrencies (last good snapshot)"""
+    return get_quote_snapshot()['data']
+
+# Coin universe on the landing page: CoinGecko's /coins/markets, sorted and paged
+# server-side. Each page is cached on its own, so browsing costs one request per
+# (page, sort) per cache period however many coins are listed
+UNIVERSE_SIZE = int(os.environ.get("CRYPTO_UNIVERSE_SIZE", "250"))
+CARDS_PER_PAGE = 24
+MARKET_PAGES = -(-UNIVERSE_SIZE // CARDS_PER_PAGE)
+# Sort option -> CoinGecko order
+MARKET_SORTS = {"Market cap": "market_cap_desc", "Volume": "volume_desc", "Name": "id_asc"}
+# Card colour for coins outside MAIN_CRYPTOS
+DEFAULT_COIN_COLOR = "#4a5568"
+
+@shared_cache(ttl=QUOTE_REFRESH_SECONDS // 2)
+def _fetch_market_page(page, per_page, order):
+    return fetch_markets(page, per_page, order)
+
+# crypto_id -> latest card seen on a market page (to open a coin from its link);
+# yf symbol -> crypto_id for coins outside MAIN_CRYPTOS
+_known_coins = {}
+_universe_symbols = {}
+
+def _card(row):
+    """Quote dict in the shape of get_crypto_data's entries for a /coins/markets row"""
+    info = MAIN_CRYPTOS.get(row['id'], {})
+    card = {
+        'id': row['id'],
+        'symbol': info.get('symbol', row['symbol']),
+        'name': info.get('name', row['name']),
+        'icon': info.get('icon', ''),
+        'image': row['image'],
+        'color': info.get('color', DEFAULT_COIN_COLOR),
+        'current_price': row['price'],
+        'price_change_percentage_24h': row['change_24h'],
+        'market_cap': row['market_cap'],
+        'rank': row['rank'],
+    }
+    _known_coins[card['id']] = card
+    if card['id'] not in MAIN_CRYPTOS and card['symbol']:
+        # Detail pages of other coins load history through the same providers
+        register_asset(card['id'], card['symbol'])
+        _universe_symbols[yf_symbol_for(card)] = card['id']
+    return card
+
+def get_market_page(page=1, sort="Market cap", per_page=CARDS_PER_PAGE):
+    """One page of the coin universe as quote dicts, or None if CoinGecko is unavailable"""
+    if page > MARKET_PAGES:
+        return []
     try:
-        url = "https://api.coingecko.com/api/v3/simple/price"
-        params = {
-            'ids': 'bitcoin,ethereum,ripple,solana',
-            'vs_currencies': 'usd',
-            'include_24hr_change': 'true',
-            'include_market_cap': 'true'
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            
-            for crypto_id, crypto_info in MAIN_CRYPTOS.items():
-                if crypto_id in data:
-                    crypto_data.append({
-                        'id': crypto_id,
-                        'symbol': crypto_info['symbol'],
-                        'name': crypto_info['name'],
-                        'icon': crypto_info['icon'],
-                        'color': crypto_info['color'],
-                        'current_price': data[crypto_id].get('usd', 0),
-                        'price_change_percentage_24h': data[crypto_id].get('usd_24h_change', 0),
-                        'market_cap': data[crypto_id].get('usd_market_cap', 0)
-                    })
-        else:
-            raise Exception("API request failed")
-            
-    except Exception as e:
-        # Fallback data if API fails
-        st.warning("Using sample data - API unavailable")
-        crypto_data = [
-            {'id': 'bitcoin', 'symbol': 'BTC', 'name': 'Bitcoin', 'icon': '₿', 'color': '#F7931A', 'current_price': 43250, 'price_change_percentage_24h': 2.5, 'market_cap': 850000000000},
-            {'id': 'ethereum', 'symbol': 'ETH', 'name': 'Ethereum', 'icon': 'Ξ', 'color': '#627EEA', 'current_price': 2650, 'price_change_percentage_24h': 1.8, 'market_cap': 320000000000},
-            {'id': 'ripple', 'symbol': 'XRP', 'name': 'XRP', 'icon': '◉', 'color': '#00D4AA', 'current_price': 0.52, 'price_change_percentage_24h': -0.5, 'market_cap': 15000000000},
-            {'id': 'solana', 'symbol': 'SOL', 'name': 'Solana', 'icon': '◎', 'color': '#9945FF', 'current_price': 145, 'price_change_percentage_24h': 3.2, 'market_cap': 42000000000}
-        ]
+        rows = _fetch_market_page(page, per_page, MARKET_SORTS[sort])
+    except Exception:
+        return None
+    # Never past the configured universe, even if the last page is a full one
+    cards = [_card(row) for row in rows[:max(0, UNIVERSE_SIZE - (page - 1) * per_page)]]
+    # Browsed pages keep the search index current between full refreshes
+    get_asset_index().update(cards)
+    return cards
+
+# The search index is built from the whole universe in the background and rebuilt
+# (in place, only changed coins) this often
+UNIVERSE_REFRESH_SECONDS = 1800
+# Largest page /coins/markets serves
+MARKETS_MAX_PER_PAGE = 250
+
+@shared_cache(ttl=UNIVERSE_REFRESH_SECONDS // 2)
+def _fetch_universe():
+    rows = []
+    for page in range(1, -(-UNIVERSE_SIZE // MARKETS_MAX_PER_PAGE) + 1):
+        rows += fetch_markets(page, MARKETS_MAX_PER_PAGE)
+    return rows[:UNIVERSE_SIZE]
+
+def _index_universe():
+    cards = [_card(row) for row in _fetch_universe()]
+    get_asset_index().update(cards)
+    return len(cards)
+
+_universe = BackgroundRefresher(_index_universe, refresh_after=UNIVERSE_REFRESH_SECONDS, retry_after=120,
+                                name="universe-refresher")
+
+def get_universe_ids(limit=UNIVERSE_SIZE):
+    """Ids of the top ``limit`` coins by market cap, or None if CoinGecko is unavailable"""
+    try:
+        rows = _fetch_universe()
+    except Exception:
+        return None
+    # Cards register each coin with the providers, so its history can be loaded
+    return [_card(row)['id'] for row in rows[:limit]]
+
+def search_assets(query, limit=DEFAULT_LIMIT):
+    """Coins whose symbol, name or id starts with (or nearly spells) query, best first"""
+    # Keeps the background indexing running; never waits for it
+    _universe.get(first_load_timeout=0)
+    index = get_asset_index()
+    if not len(index):
+        # Searchable before the first universe load, and when CoinGecko is down
+        index.update({'id': crypto_id, 'symbol': info['symbol'], 'name': info['name'], 'rank': None}
+                     for crypto_id, info in MAIN_CRYPTOS.items())
+    return index.search(query, limit)
+
+def get_coin(crypto_id):
+    """Quote dict for any coin in the universe (e.g. from a ?coin= link or a search pick), or None"""
+    for coin in get_crypto_data():
+        if coin['id'] == crypto_id:
+            return coin
+    if crypto_id in _known_coins:
+        return _known_coins[crypto_id]
+    try:
+        rows = fetch_markets(1, 1, ids=[crypto_id])
+    except Exception:
+        return None
+    return _card(rows[0]) if rows else None
+
+def yf_symbol_for(crypto):
+    """yfinance ticker of a quote dict (MAIN_CRYPTOS, else SYMBOL-USD)"""
+    return MAIN_CRYPTOS.get(crypto['id'], {}).get('yf_symbol', f"{crypto['symbol'].upper()}-USD")
+
+# Map UI periods to days of daily candles
+PERIOD_DAYS = {"7d": 7, "30d": 30, "90d": 90, "1y": 365}
+# First option of the period selectors on the detail pages
+DEFAULT_PERIOD = "7d"
+
+def _sample_history():
+    """Generate sample data when no real data is available"""
+    import pandas as pd
     
-    return crypto_data
+    dates = pd.date_range(end=datetime.now(), periods=30, freq='D')
+    return pd.DataFrame({
+        'Close': [100 + i*2 + (i%3)*10 for i in range(30)]
+    }, index=dates)
 
-@st.cache_data(ttl=600)
+@shared_cache(ttl=600)  # shared by every app process; frames are memory-mapped
 def get_price_history(yf_symbol, period="7d"):
-    """Get price history using yfinance"""
+    """Get daily price history from the fastest healthy provider, served from the local history store"""
+    import pandas as pd
+    
     try:
-        # Convert period to yfinance format
-        period_map = {"7d": "7d", "30d": "1mo", "90d": "3mo", "1y": "1y"}
-        yf_period = period_map.get(period, "7d")
+        days = PERIOD_DAYS.get(period, 7)
+        start = pd.Timestamp.now(tz="UTC").normalize() - pd.Timedelta(days=days)
+        crypto_id = next((c for c, info in MAIN_CRYPTOS.items() if info['yf_symbol'] == yf_symbol), None)
+        crypto_id = crypto_id or _universe_symbols[yf_symbol]
         
-        # Get data from yfinance
-        crypto = yf.Ticker(yf_symbol)
-        hist = crypto.history(period=yf_period)
+        # Only candles newer than the stored ones are downloaded
+        hist = load_daily_history(crypto_id, start.timestamp())
         
         if not hist.empty:
-            return hist
+            return hist.rename(columns=str.capitalize)
         else:
-            # Generate sample data if no real data available
-            dates = pd.date_range(end=datetime.now(), periods=30, freq='D')
-            sample_data = pd.DataFrame({
-                'Close': [100 + i*2 + (i%3)*10 for i in range(30)]
-            }, index=dates)
-            return sample_data
+            return _sample_history()
             
     except:
         # Generate sample data as fallback
-        dates = pd.date_range(end=datetime.now(), periods=30, freq='D')
-        sample_data = pd.DataFrame({
-            'Close': [100 + i*2 + (i%3)*10 for i in range(30)]
-        }, index=dates)
-        return sample_data
\ No newline at end of file
+        return _sample_history()
+
+def get_price_history_batch(period="7d", crypto_ids=None):
+    """Daily price history for several assets with one provider request where possible.
+
+    Returns {crypto_id: frame} for the assets that loaded and primes
+    get_price_history's cache with each, so the detail pages read them directly.
+    """
+    import pandas as pd
+
+    crypto_ids = list(crypto_ids or MAIN_CRYPTOS)
+    days = PERIOD_DAYS.get(period, 7)
+    start = pd.Timestamp.now(tz="UTC").normalize() - pd.Timedelta(days=days)
+    frames = {}
+    for crypto_id, hist in load_daily_history_batch(crypto_ids, start.timestamp()).items():
+        frames[crypto_id] = hist.rename(columns=str.capitalize)
+        if crypto_id in MAIN_CRYPTOS:
+            get_price_history.prime(frames[crypto_id], MAIN_CRYPTOS[crypto_id]['yf_symbol'], period)
+    return frames
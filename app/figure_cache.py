@@ -0,0 +1,87 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from app.metrics import record_cache
+
+# Process-wide LRU of serialized chart specs. Charts are keyed on what they depend on
+# (asset, period, chart type, a fingerprint of the plotted data and any styling such
+# as theme or colour), so a rerun triggered by an unrelated widget reuses the spec
+# instead of rebuilding the chart. Only plain spec dicts are cached, never live
+# figure objects: the cache is shared between sessions, and each caller gets its
+# own figure built from the spec.
+FIGURE_CACHE_SIZE = 128
+
+
+def data_fingerprint(frame):
+    """Content hash of a frame (values and index), computed with vectorized hashing."""
+    if frame is None or len(frame) == 0:
+        return "empty"
+    row_hashes = pd.util.hash_pandas_object(frame, index=True).to_numpy()
+    digest = hashlib.blake2b(row_hashes.tobytes(), digest_size=16)
+    digest.update(",".join(map(str, frame.columns)).encode())
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Thread-safe LRU mapping a chart key to its serialized spec."""
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                record_cache("figure", "hit")
+                return self._items[key]
+            self.misses += 1
+        record_cache("figure", "miss")
+
+        value = build()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+
+_cache = FigureCache()
+
+
+def _cached_spec(kind, build_spec, asset, period, chart_type, data, params):
+    key = (kind, asset, period, chart_type, data_fingerprint(data), tuple(sorted(params.items())))
+    return _cache.get_or_build(key, build_spec)
+
+
+def cached_figure(build, asset, period, chart_type, data, **params):
+    """Plotly figure of ``build()`` for this (asset, period, data fingerprint, chart type, params).
+
+    ``build`` is a zero-argument callable returning a Plotly figure; it only runs
+    when the key is not cached yet. The figure's ``to_dict()`` spec (default template applied) is what
+    is cached, and every call returns a new figure built from it, so callers may
+    modify the result.
+    """
+    import plotly.graph_objects as go
+
+    spec = _cached_spec("plotly", lambda: build().to_dict(), asset, period, chart_type, data, params)
+    # The spec came out of a validated figure, so skip re-validating it (the
+    # expensive part of building a figure from a dict)
+    return go.Figure(spec, _validate=False)
+
+
+def cached_vega_spec(build_chart, asset, period, chart_type, data, **params):
+    """Like cached_figure for Altair: caches the serialized Vega-Lite spec dict.
+
+    Render the result with ``st.vega_lite_chart(spec=...)``, which skips rebuilding and
+    re-validating the Altair chart on reruns.
+    """
+    return dict(_cached_spec("vega", lambda: build_chart().to_dict(), asset, period, chart_type, data, params))
@@ -0,0 +1,245 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.metrics import record_cache, span
+
+# Local OHLCV store shared by every history fetcher (yfinance, Kraken, CoinGecko).
+# SQLite in WAL mode lets several Streamlit replicas on one host read and write
+# the same file, so a warm store turns every fetch into a small "since" request.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+
+DEFAULT_DB_PATH = os.environ.get(
+    "CRYPTO_HISTORY_DB", os.path.join(parent_dir, "data", "history.sqlite3")
+)
+
+# Canonical candle columns; providers fill the ones they have and leave the rest NULL
+CANDLE_COLUMNS = ["open", "high", "low", "close", "volume", "vwap", "count", "market_cap"]
+
+# Prices (open/high/low/close, vwap) and market caps are read back as float64:
+# float32's ~7 significant digits would round a five-figure close to the dollar
+# and shift the returns and backtests computed from it. Only volume is narrowed
+# to float32, and trade counts become int32 when no candle lacks one. The index
+# holds int64 epoch seconds.
+VOLUME_DTYPE = np.float32
+COUNT_DTYPE = np.int32
+
+# Don't ask an upstream for new candles more often than this per series
+DEFAULT_REFRESH_SECONDS = 60
+
+
+class HistoryStore:
+    """Append-only candle store keyed by series (e.g. ``kraken:XXBTZUSD:1440``)."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._init_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        columns = ", ".join(f"{c} REAL" for c in CANDLE_COLUMNS)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS candles ("
+                f"series TEXT NOT NULL, ts INTEGER NOT NULL, {columns}, "
+                f"PRIMARY KEY (series, ts)) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS series ("
+                "series TEXT PRIMARY KEY, start_ts INTEGER NOT NULL, "
+                "last_ts INTEGER, checked_at REAL NOT NULL)"
+            )
+
+    def coverage(self, series):
+        """Return ``(start_ts, last_ts, checked_at)`` for a series, or None if never fetched."""
+        row = self._connect().execute(
+            "SELECT start_ts, last_ts, checked_at FROM series WHERE series = ?", (series,)
+        ).fetchone()
+        return row
+
+    def write(self, series, df, start_ts, checked=True):
+        """Upsert candles from a frame indexed by UTC timestamp and record coverage.
+
+        ``start_ts`` is the earliest time the caller asked for, which may be before the
+        first candle the provider actually has. ``checked=False`` writes derived
+        candles without counting as an upstream check (see DEFAULT_REFRESH_SECONDS).
+        """
+        rows = []
+        if df is not None and not df.empty:
+            index = pd.DatetimeIndex(df.index)
+            if index.tz is None:
+                index = index.tz_localize("UTC")
+            ts = index.tz_convert("UTC").as_unit("s").asi8
+            values = {c: (df[c].astype(float).tolist() if c in df.columns else [None] * len(df))
+                      for c in CANDLE_COLUMNS}
+            for i, t in enumerate(ts):
+                rows.append((series, int(t), *(values[c][i] for c in CANDLE_COLUMNS)))
+
+        placeholders = ", ".join("?" * (len(CANDLE_COLUMNS) + 2))
+        conn = self._connect()
+        with conn:
+            if rows:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO candles (series, ts, {', '.join(CANDLE_COLUMNS)}) "
+                    f"VALUES ({placeholders})",
+                    rows,
+                )
+            last_ts = conn.execute(
+                "SELECT MAX(ts) FROM candles WHERE series = ?", (series,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO series (series, start_ts, last_ts, checked_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(series) DO UPDATE SET "
+                "start_ts = MIN(start_ts, excluded.start_ts), "
+                "last_ts = excluded.last_ts, checked_at = MAX(checked_at, excluded.checked_at)",
+                (series, int(start_ts), last_ts, time.time() if checked else 0.0),
+            )
+
+    def bounds(self, series):
+        """Return ``(first_ts, last_ts)`` of the stored candles, or None if there are none."""
+        row = self._connect().execute(
+            "SELECT MIN(ts), MAX(ts) FROM candles WHERE series = ?", (series,)
+        ).fetchone()
+        return row if row[0] is not None else None
+
+    def prune(self, series, before_ts):
+        """Delete candles older than ``before_ts`` (coverage is left as recorded)."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM candles WHERE series = ? AND ts < ?", (series, int(before_ts)))
+
+    def read(self, series, start_ts=None, end_ts=None):
+        """Return stored candles as a frame indexed by UTC timestamp (only populated columns)."""
+        query = f"SELECT ts, {', '.join(CANDLE_COLUMNS)} FROM candles WHERE series = ?"
+        params = [series]
+        if start_ts is not None:
+            query += " AND ts >= ?"
+            params.append(int(start_ts))
+        if end_ts is not None:
+            query += " AND ts <= ?"
+            params.append(int(end_ts))
+        query += " ORDER BY ts"
+        rows = self._connect().execute(query, params).fetchall()
+
+        # One float64 block (NULL -> NaN), then an array per populated column
+        values = np.array(rows, dtype=np.float64).reshape(len(rows), len(CANDLE_COLUMNS) + 1)
+        index = pd.DatetimeIndex(values[:, 0].astype(np.int64).view("M8[s]"), name="timestamp").tz_localize("UTC")
+        columns = {}
+        for i, name in enumerate(CANDLE_COLUMNS, start=1):
+            column = values[:, i]
+            missing = np.isnan(column)
+            if missing.all():
+                continue
+            if name == "count":
+                columns[name] = column.astype(VOLUME_DTYPE if missing.any() else COUNT_DTYPE)
+            elif name == "volume":
+                columns[name] = column.astype(VOLUME_DTYPE)
+            else:
+                columns[name] = column.copy()  # own its memory, not a strided view of the block
+        return pd.DataFrame(columns, index=index, copy=False)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Process-wide HistoryStore instance."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
+
+
+def _fetch_start(store, series, start_ts, refresh_seconds):
+    """Return ``(coverage, since)``; since is None when the stored candles are fresh enough."""
+    coverage = store.coverage(series)
+    if coverage is None or start_ts < coverage[0] or coverage[1] is None:
+        return coverage, start_ts
+    if time.time() - coverage[2] < refresh_seconds:
+        return coverage, None  # fetched recently, serve from disk
+    return coverage, coverage[1]
+
+
+def sync_history(series, start_ts, fetch_since, refresh_seconds=DEFAULT_REFRESH_SECONDS):
+    """Read a series from the local store, fetching only candles newer than what is stored.
+
+    ``fetch_since(since_ts)`` must return a frame indexed by UTC timestamp with any of
+    ``CANDLE_COLUMNS``. The last stored candle is re-requested because it may still be
+    forming. If the caller asks for an earlier start than the store covers, the missing
+    range is backfilled from ``start_ts``. Upstream failures fall back to stored data.
+    """
+    store = get_history_store()
+    start_ts = int(start_ts)
+    with span("history.sync", series=series) as s:
+        coverage, since = _fetch_start(store, series, start_ts, refresh_seconds)
+        # A "hit" is served from disk alone; an incremental fetch counts as a miss
+        record_cache("history_store", "miss" if since is not None else "hit")
+
+        if since is not None:
+            try:
+                fresh = fetch_since(since)
+            except Exception:
+                if coverage is None:
+                    raise
+                s.set(fallback="stored")
+            else:
+                with span("history.write", series=series):
+                    store.write(series, fresh, start_ts)
+
+        with span("history.read", series=series) as read:
+            frame = store.read(series, start_ts)
+            read.set(rows=len(frame))
+        return frame
+
+
+def sync_history_batch(series_by_key, start_ts, fetch_batch, refresh_seconds=DEFAULT_REFRESH_SECONDS):
+    """sync_history for several series filled by one upstream call.
+
+    ``series_by_key`` maps a caller key (e.g. an asset id) to its series.
+    ``fetch_batch({key: since_ts})`` is called once for the series that need new
+    candles and returns ``{key: frame}``; a key it leaves out keeps its stored
+    candles. Returns ``{key: frame}`` read back from the store.
+    """
+    store = get_history_store()
+    start_ts = int(start_ts)
+    with span("history.sync_batch", series=len(series_by_key)) as s:
+        coverage, since = {}, {}
+        for key, series in series_by_key.items():
+            coverage[key], key_since = _fetch_start(store, series, start_ts, refresh_seconds)
+            record_cache("history_store", "miss" if key_since is not None else "hit")
+            if key_since is not None:
+                since[key] = key_since
+
+        if since:
+            try:
+                fresh = fetch_batch(since)
+            except Exception:
+                if any(coverage[key] is None for key in since):
+                    raise
+                s.set(fallback="stored")
+            else:
+                with span("history.write", series=len(fresh)):
+                    for key, frame in fresh.items():
+                        if key in since:
+                            store.write(series_by_key[key], frame, start_ts)
+
+        with span("history.read", series=len(series_by_key)):
+            return {key: store.read(series, start_ts) for key, series in series_by_key.items()}
@@ -0,0 +1,109 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.metrics import record_upstream, span, upstream_name
+from app.rate_limit import acquire, block, retry_after_seconds
+
+# Bounded (connect, read) timeouts so a hung upstream can't pin a script thread
+DEFAULT_TIMEOUT = (5, 30)
+# render.com prediction APIs may take up to a minute to wake from a cold start
+PREDICTION_TIMEOUT = (5, 60)
+
+# Keep-alive pools: one pool per host, at most POOL_MAXSIZE open sockets per host
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 8
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Status retries are made by http_get rather than urllib3, so each one takes a
+# rate-limit token and a 429 backs off the whole process
+STATUS_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+# Block after a 429 without Retry-After (CoinGecko's limit window is a minute)
+RATE_LIMITED_BACKOFF = 15
+# Retry-After longer than this is not slept through inline; the response is returned
+MAX_RETRY_SLEEP = 10
+
+
+class JitteredRetry(Retry):
+    """Exponential backoff with full jitter so replicas don't retry in lockstep."""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+
+def _build_session():
+    # Connection-level retries only; see STATUS_RETRIES
+    retry = JitteredRetry(
+        total=3,
+        connect=3,
+        read=1,
+        status=0,
+        backoff_factor=BACKOFF_FACTOR,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=True,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json"})
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide pooled requests session shared by every provider."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def http_get(url, params=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """GET through the shared session with a bounded timeout and jittered retries.
+
+    Every attempt first takes a token from the upstream's rate-limit bucket (see
+    app.rate_limit). 429/5xx answers are retried up to STATUS_RETRIES times, after
+    Retry-After if given, else a jittered exponential backoff; a 429 blocks the
+    bucket for every caller. Each call is a timed ``http.<upstream>`` span and
+    each attempt's status code (or exception class) is counted per upstream.
+    """
+    upstream = upstream_name(url)
+    with span(f"http.{upstream}", url=url.split("?")[0]) as s:
+        for attempt in range(STATUS_RETRIES + 1):
+            acquire(upstream)
+            try:
+                response = get_session().get(url, params=params, timeout=timeout, **kwargs)
+            except requests.RequestException as exc:
+                record_upstream(upstream, type(exc).__name__)
+                raise
+            record_upstream(upstream, response.status_code)
+            if response.status_code not in RETRY_STATUSES or attempt == STATUS_RETRIES:
+                break
+            delay = retry_after_seconds(response)
+            if delay is None and response.status_code == 429:
+                delay = RATE_LIMITED_BACKOFF
+            elif delay is None:
+                delay = random.uniform(0, BACKOFF_FACTOR * 2 ** attempt)
+            if response.status_code == 429 and block(upstream, delay):
+                continue  # the next acquire() waits the block out with everyone else, or gives up
+            if delay > MAX_RETRY_SLEEP:
+                break
+            time.sleep(delay)
+        s.set(status=response.status_code, attempts=attempt + 1)
+        return response
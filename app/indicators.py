@@ -0,0 +1,383 @@
+import math
+import threading
+
+import numpy as np
+
+# NumPy technical indicators shared by the detail pages.
+#
+# The batch functions compute a whole column at once (matching pandas rolling/ewm
+# with min_periods=window and adjust=False). The streaming classes keep rolling
+# state so appending one candle costs O(1) instead of recomputing the full frame;
+# follow() keeps an engine per page across reruns and feeds it new candles.
+
+
+def _as_float_array(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def rolling_mean(values, window):
+    """Simple moving average; NaN until a full window of finite values is available."""
+    x = _as_float_array(values)
+    valid = np.isfinite(x)
+    finite = x[valid]
+    shift = finite[0] if finite.size else 0.0  # keeps the running sums small
+
+    def windowed(a):
+        c = np.concatenate(([0.0], np.cumsum(a)))
+        out = np.full(x.shape, np.nan)
+        if x.size >= window:
+            out[window - 1:] = c[window:] - c[:-window]
+        return out
+
+    count = windowed(valid.astype(np.float64))
+    total = windowed(np.where(valid, x - shift, 0.0))
+    return np.where(count == window, total / window + shift, np.nan)
+
+
+def rolling_std(values, window, ddof=1, chunk_rows=65536):
+    """Rolling sample standard deviation (ddof=1, like pandas).
+
+    Uses strided window views, evaluated in row chunks to bound memory, rather than
+    running sums of squares, which lose precision on long trending price series.
+    """
+    x = _as_float_array(values)
+    out = np.full(x.shape, np.nan)
+    if x.size < window or window <= ddof:
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(x, window)
+    for start in range(0, windows.shape[0], chunk_rows):
+        block = windows[start:start + chunk_rows]
+        out[window - 1 + start:window - 1 + start + block.shape[0]] = block.std(axis=1, ddof=ddof)
+    return out
+
+
+def ema(values, span):
+    """Exponential moving average with alpha = 2 / (span + 1), adjust=False.
+
+    NaNs are handled like pandas' ewm (ignore_na=False): a NaN position repeats the
+    previous value, and the next observation is weighted by how many steps it is
+    from the last one. Leading NaNs stay NaN.
+    """
+    x = _as_float_array(values)
+    missing = np.isnan(x)
+    if x.size and not missing.any():
+        return _constant_scan(x, 2.0 / (span + 1.0))
+    out = np.full(x.shape, np.nan)
+    observed = np.flatnonzero(~missing)
+    if observed.size == 0:
+        return out
+    xs = x[observed]
+    steps = np.diff(observed)
+    if (steps == 1).all():
+        smoothed = _constant_scan(xs, 2.0 / (span + 1.0))
+    else:
+        weights = _observation_weight(2.0 / (span + 1.0), steps)
+        smoothed = np.empty(xs.shape)
+        smoothed[0] = xs[0]
+        smoothed[1:] = _linear_scan(1.0 - weights, weights * xs[1:], xs[0])
+    # Every position reads the value at the last observation up to it
+    rank = np.zeros(x.size, dtype=np.intp)
+    rank[observed] = np.arange(observed.size)
+    out[observed[0]:] = smoothed[np.maximum.accumulate(rank[observed[0]:])]
+    return out
+
+
+def _observation_weight(alpha, steps):
+    """Weight of an observation ``steps`` after the previous one (pandas' ewm rule)."""
+    old = (1.0 - alpha) ** steps
+    # pandas uses 1 - old as the new weight when com == 1, i.e. alpha == 0.5
+    new = 1.0 - old if alpha == 0.5 else alpha
+    return new / (old + new)
+
+
+def _constant_scan(x, alpha):
+    """EMA of a gap-free array, evaluated block-wise with cumulative sums instead of a
+    Python loop per value; the block length keeps the decay factors within float64 range."""
+    out = np.empty_like(x)
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[:] = x
+        return out
+
+    block = int(min(1024, max(1, 27.0 / -math.log(decay))))  # decay ** -block <= ~5e11
+    powers = decay ** np.arange(1, block + 1)
+    inverse = decay ** -np.arange(0, block)
+
+    prev = x[0]
+    start = 1
+    out[0] = prev
+    while start < x.size:
+        chunk = x[start:start + block]
+        n = chunk.size
+        # y[i] = decay^(i+1) * prev + alpha * sum_k decay^(i-k) * x[k]
+        acc = np.cumsum(chunk * inverse[:n]) * (powers[:n] / decay)
+        out[start:start + n] = powers[:n] * prev + alpha * acc
+        prev = out[start + n - 1]
+        start += n
+    return out
+
+
+def _linear_scan(a, b, y0):
+    """y[i] = a[i] * y[i-1] + b[i] with y[-1] = y0, for 0 <= a <= 1.
+
+    For series with gaps, where the decay varies per observation. Evaluated
+    block-wise like _constant_scan; a block ends before its cumulative decay
+    passes e**-27, which keeps the rescaling factors within float64 range.
+    """
+    out = np.empty(b.shape)
+    log_decay = np.cumsum(np.log(np.maximum(a, 1e-300)))
+    total_decay = -log_decay  # non-decreasing, for searchsorted
+    start, prev, base = 0, y0, 0.0
+    while start < b.size:
+        end = max(start + 1, int(np.searchsorted(total_decay, 27.0 - base, side="right")))
+        # y[i] = P[i] * (prev + sum_k b[k] / P[k]), P = decay since the block start
+        decay = np.exp(log_decay[start:end] - base)
+        out[start:end] = decay * (prev + np.cumsum(b[start:end] / decay))
+        prev, base, start = out[end - 1], log_decay[end - 1], end
+    return out
+
+
+def log_returns(close):
+    """Log returns with a leading NaN, aligned to ``close``."""
+    x = _as_float_array(close)
+    out = np.full(x.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[1:] = np.diff(np.log(x))
+    return out
+
+
+def annualized_volatility(returns, window, periods_per_year=365):
+    """Rolling standard deviation of returns scaled to a yearly figure."""
+    return rolling_std(returns, window) * math.sqrt(periods_per_year)
+
+
+def bollinger_bands(close, window=20, num_std=2):
+    """Return (sma, std, upper, lower) arrays."""
+    sma = rolling_mean(close, window)
+    std = rolling_std(close, window)
+    return sma, std, sma + std * num_std, sma - std * num_std
+
+
+class RollingStats:
+    """Mean and sample std of the last ``window`` values, O(1) per update."""
+
+    def __init__(self, window):
+        self.window = window
+        self._buffer = np.full(window, np.nan)
+        self._pos = 0
+        self._count = 0
+        self._shift = None
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def _resync(self):
+        """Recompute the sums from the buffer around a fresh shift (amortized O(1))."""
+        finite = self._buffer[np.isfinite(self._buffer)]
+        self._shift = float(finite.mean()) if finite.size else None
+        centered = finite - (self._shift or 0.0)
+        self._count = int(finite.size)
+        self._sum = float(centered.sum())
+        self._sum_sq = float((centered * centered).sum())
+
+    def update(self, value):
+        value = float(value)
+        old = self._buffer[self._pos]
+        if not math.isnan(old):
+            self._count -= 1
+            self._sum -= old - self._shift
+            self._sum_sq -= (old - self._shift) ** 2
+        self._buffer[self._pos] = value
+        self._pos = (self._pos + 1) % self.window
+        if not math.isnan(value):
+            if self._shift is None:
+                self._shift = value
+            self._count += 1
+            self._sum += value - self._shift
+            self._sum_sq += (value - self._shift) ** 2
+        if self._pos == 0:
+            self._resync()  # once per window, so rounding error never accumulates
+        return self.mean, self.std
+
+    def preview(self, value):
+        """(mean, std) as if ``value`` were the next update, without applying it."""
+        value = float(value)
+        count, total, total_sq, shift = self._count, self._sum, self._sum_sq, self._shift
+        old = self._buffer[self._pos]
+        if not math.isnan(old):
+            count -= 1
+            total -= old - shift
+            total_sq -= (old - shift) ** 2
+        if not math.isnan(value):
+            shift = value if shift is None else shift
+            count += 1
+            total += value - shift
+            total_sq += (value - shift) ** 2
+        return self._mean(count, total, shift), self._std(count, total, total_sq)
+
+    def _mean(self, count, total, shift):
+        if count < self.window:
+            return math.nan
+        return total / self.window + shift
+
+    def _std(self, count, total, total_sq):
+        if count < self.window or self.window < 2:
+            return math.nan
+        var = (total_sq - total * total / self.window) / (self.window - 1)
+        return math.sqrt(max(var, 0.0))
+
+    @property
+    def mean(self):
+        return self._mean(self._count, self._sum, self._shift)
+
+    @property
+    def std(self):
+        return self._std(self._count, self._sum, self._sum_sq)
+
+
+class StreamingEMA:
+    """Exponential moving average updated one value at a time (adjust=False, NaNs as in ema())."""
+
+    def __init__(self, span, value=None):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = None if value is None or math.isnan(value) else value
+        self._steps = 1  # steps since the last observation, for the next one's weight
+
+    def _next(self, x):
+        if math.isnan(x):
+            return self.value, self._steps + 1
+        if self.value is None:
+            return x, 1
+        return self.value + _observation_weight(self.alpha, self._steps) * (x - self.value), 1
+
+    def update(self, x):
+        self.value, self._steps = self._next(float(x))
+        return math.nan if self.value is None else self.value
+
+    def preview(self, x):
+        """The value ``update(x)`` would return, without applying it."""
+        value = self._next(float(x))[0]
+        return math.nan if value is None else value
+
+
+class IndicatorEngine:
+    """Indicator columns for a close series, kept current as candles are appended.
+
+    ``IndicatorEngine(close, sma_windows=(7, 14), ema_spans=(9, 21), bollinger_window=20,
+    vol_window=30)`` computes every column in one vectorized pass; ``append(close)``
+    then updates them all in O(1) and returns the latest values.
+    """
+
+    def __init__(self, close, sma_windows=(), ema_spans=(), bollinger_window=None,
+                 num_std=2, vol_window=None, periods_per_year=365):
+        close = _as_float_array(close)
+        self.num_std = num_std
+        self.periods_per_year = periods_per_year
+        self.columns = {}
+        self._sma = {}
+        self._ema = {}
+        self._bollinger = None
+        self._vol = None
+        self._last_close = close[-1] if close.size else None
+
+        for w in sma_windows:
+            self.columns[f"sma_{w}"] = rolling_mean(close, w)
+            self._sma[w] = self._seed(RollingStats(w), close[-w:])
+        observed = np.flatnonzero(~np.isnan(close))
+        for span in ema_spans:
+            values = ema(close, span)
+            self.columns[f"ema_{span}"] = values
+            state = self._ema[span] = StreamingEMA(span, values[-1] if values.size else None)
+            if observed.size:
+                state._steps = close.size - observed[-1]  # trailing NaNs widen the next step
+        if bollinger_window:
+            sma, std, upper, lower = bollinger_bands(close, bollinger_window, num_std)
+            self.columns.update({"bb_sma": sma, "bb_std": std, "bb_upper": upper, "bb_lower": lower})
+            self._bollinger = self._seed(RollingStats(bollinger_window), close[-bollinger_window:])
+        if vol_window:
+            returns = log_returns(close)
+            self.columns["log_return"] = returns
+            self.columns["volatility"] = annualized_volatility(returns, vol_window, periods_per_year)
+            self._vol = self._seed(RollingStats(vol_window), returns[-vol_window:])
+
+    @staticmethod
+    def _seed(stats, values):
+        for v in values:
+            stats.update(v)
+        return stats
+
+    def append(self, close):
+        """Fold one new close into every indicator and return the latest values."""
+        close = float(close)
+        latest = {}
+        for w, stats in self._sma.items():
+            latest[f"sma_{w}"] = stats.update(close)[0]
+        for span, state in self._ema.items():
+            latest[f"ema_{span}"] = state.update(close)
+        if self._bollinger is not None:
+            sma, std = self._bollinger.update(close)
+            latest.update({
+                "bb_sma": sma,
+                "bb_std": std,
+                "bb_upper": sma + std * self.num_std,
+                "bb_lower": sma - std * self.num_std,
+            })
+        if self._vol is not None:
+            ret = math.log(close / self._last_close) if self._last_close else math.nan
+            latest["log_return"] = ret
+            latest["volatility"] = self._vol.update(ret)[1] * math.sqrt(self.periods_per_year)
+        self._last_close = close
+        return latest
+
+    def preview(self, close):
+        """The values ``append(close)`` would return, without changing any state.
+
+        For the forming candle, e.g. at the latest live price.
+        """
+        close = float(close)
+        latest = {f"sma_{w}": stats.preview(close)[0] for w, stats in self._sma.items()}
+        latest.update({f"ema_{span}": state.preview(close) for span, state in self._ema.items()})
+        if self._bollinger is not None:
+            sma, std = self._bollinger.preview(close)
+            latest.update({
+                "bb_sma": sma,
+                "bb_std": std,
+                "bb_upper": sma + std * self.num_std,
+                "bb_lower": sma - std * self.num_std,
+            })
+        if self._vol is not None:
+            ret = math.log(close / self._last_close) if self._last_close else math.nan
+            latest["log_return"] = ret
+            latest["volatility"] = self._vol.preview(ret)[1] * math.sqrt(self.periods_per_year)
+        return latest
+
+
+# key -> (config, last closed candle time, engine); see follow()
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def follow(key, close, **config):
+    """IndicatorEngine over the closed candles of ``close``, kept across reruns and sessions.
+
+    ``close`` is a Series indexed by candle time whose last row is the forming
+    candle, which is left out (pass its price to ``preview``). Candles after the
+    ones the engine has seen are appended in O(1) each; any other change (another
+    range, a backfill, a revised candle) rebuilds it. ``config`` is passed to
+    IndicatorEngine.
+    """
+    closed = close.iloc[:-1]
+    settings = tuple(sorted(config.items()))
+    with _engines_lock:
+        entry = _engines.get(key)
+        if entry is not None and entry[0] == settings and len(closed):
+            _, last_ts, engine = entry
+            pos = closed.index.searchsorted(last_ts)
+            if pos < len(closed) and closed.index[pos] == last_ts and closed.iloc[pos] == engine._last_close:
+                for value in closed.iloc[pos + 1:].to_numpy(dtype=np.float64):
+                    engine.append(value)
+                _engines[key] = (settings, closed.index[-1], engine)
+                return engine
+        engine = IndicatorEngine(closed.to_numpy(dtype=np.float64), **config)
+        if len(closed):
+            _engines[key] = (settings, closed.index[-1], engine)
+        return engine
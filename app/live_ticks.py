@@ -0,0 +1,200 @@
+import contextlib
+import importlib.util
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import streamlit as st
+
+# Live prices from Kraken's public websocket ticker (v2). A daemon thread keeps
+# one connection per process and appends every tick to a per-asset ring buffer;
+# the price cards and metrics read the latest tick from inside st.fragment
+# sections that rerun on a timer, so live updates never rerun the whole script.
+#
+# Needs the optional `websockets` package; without it (or with
+# CRYPTO_LIVE_TICKS=0) the pages show the polled quotes and nothing reruns.
+# CRYPTO_TICKER_WS points the feed elsewhere, e.g. at mocks/kraken_ws.py.
+KRAKEN_WS_URL = "wss://ws.kraken.com/v2"
+KRAKEN_SYMBOLS = {
+    "bitcoin": "BTC/USD",
+    "ethereum": "ETH/USD",
+    "ripple": "XRP/USD",
+    "solana": "SOL/USD",
+}
+TICK_BUFFER_SIZE = 2048
+# How often the live sections rerun, and when a tick is too old to show
+LIVE_REFRESH_SECONDS = 2
+STALE_TICK_SECONDS = 60
+# The connection is closed when no page has read a price for this long
+FEED_IDLE_SECONDS = 300
+RECONNECT_MAX_SECONDS = 30
+
+logger = logging.getLogger(__name__)
+
+
+class TickBuffer:
+    """Fixed-size ring buffer of (epoch seconds, price) ticks."""
+
+    def __init__(self, size=TICK_BUFFER_SIZE):
+        self._ticks = deque(maxlen=size)
+
+    def append(self, ts, price):
+        self._ticks.append((ts, price))
+
+    def latest(self):
+        """Return (ts, price) of the newest tick, or None."""
+        try:
+            return self._ticks[-1]
+        except IndexError:
+            return None
+
+
+class TickerFeed:
+    """Websocket ticker subscription feeding one TickBuffer per asset."""
+
+    def __init__(self, url, symbols=KRAKEN_SYMBOLS, idle_after=FEED_IDLE_SECONDS):
+        self.url = url
+        self.symbols = dict(symbols)
+        self.idle_after = idle_after
+        self.buffers = {crypto_id: TickBuffer() for crypto_id in self.symbols}
+        self.change_pct = {}
+        self._by_symbol = {symbol: crypto_id for crypto_id, symbol in self.symbols.items()}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_read = 0.0
+
+    def _handle(self, message):
+        if message.get("channel") != "ticker":
+            return
+        now = time.time()
+        for tick in message.get("data", []):
+            crypto_id = self._by_symbol.get(tick.get("symbol"))
+            if crypto_id is None or tick.get("last") is None:
+                continue
+            self.buffers[crypto_id].append(now, float(tick["last"]))
+            if tick.get("change_pct") is not None:
+                self.change_pct[crypto_id] = float(tick["change_pct"])
+
+    def _stop_if_idle(self):
+        """True once no page has read a price for idle_after seconds; the feed
+        thread then exits, and the next read starts a new one."""
+        with self._lock:
+            if time.monotonic() - self._last_read <= self.idle_after:
+                return False
+            if self._thread is threading.current_thread():
+                self._thread = None
+            return True
+
+    def _run(self):
+        from websockets.sync.client import connect
+
+        ws = None
+        delay = 1
+        try:
+            # A single idleness check per message (or reconnect attempt): the
+            # first idle result ends the thread
+            while not self._stop_if_idle():
+                try:
+                    if ws is None:
+                        ws = connect(self.url, open_timeout=10)
+                        ws.send(json.dumps({
+                            "method": "subscribe",
+                            "params": {"channel": "ticker", "symbol": list(self.symbols.values())},
+                        }))
+                        delay = 1
+                    try:
+                        raw = ws.recv(timeout=30)
+                    except TimeoutError:
+                        continue  # Kraken sends heartbeats every second; just re-check idleness
+                    self._handle(json.loads(raw))
+                except Exception as exc:
+                    logger.warning("Ticker websocket dropped (%s), reconnecting in %ss", exc, delay)
+                    if ws is not None:
+                        with contextlib.suppress(Exception):
+                            ws.close()
+                        ws = None
+                    time.sleep(delay)
+                    delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+        finally:
+            if ws is not None:
+                with contextlib.suppress(Exception):
+                    ws.close()
+
+    def latest(self, crypto_id):
+        """Latest live quote ``{'price', 'change_pct', 'ts'}``, or None if none is fresh."""
+        with self._lock:
+            self._last_read = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ticker-feed", daemon=True)
+                self._thread.start()
+        buffer = self.buffers.get(crypto_id)
+        tick = buffer.latest() if buffer is not None else None
+        if tick is None or time.time() - tick[0] > STALE_TICK_SECONDS:
+            return None
+        return {'price': tick[1], 'change_pct': self.change_pct.get(crypto_id), 'ts': tick[0]}
+
+
+LIVE_TICKS_ENABLED = (os.environ.get("CRYPTO_LIVE_TICKS", "1") != "0"
+                      and importlib.util.find_spec("websockets") is not None)
+# Live sections only rerun on a timer when there is a feed to read
+LIVE_RUN_EVERY = LIVE_REFRESH_SECONDS if LIVE_TICKS_ENABLED else None
+
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def get_ticker_feed():
+    """Process-wide ticker feed, or None when live ticks are disabled."""
+    global _feed
+    if not LIVE_TICKS_ENABLED:
+        return None
+    with _feed_lock:
+        if _feed is None:
+            _feed = TickerFeed(os.environ.get("CRYPTO_TICKER_WS", KRAKEN_WS_URL))
+        return _feed
+
+
+def has_live_quote(crypto_id):
+    """True if crypto_id's price follows the live ticker (so is worth rerunning on a timer)."""
+    return LIVE_TICKS_ENABLED and crypto_id in KRAKEN_SYMBOLS
+
+
+def with_live_quote(coin):
+    """Copy of a quote dict with price and 24h change replaced by the latest tick."""
+    feed = get_ticker_feed()
+    live = feed.latest(coin['id']) if feed is not None else None
+    if live is None:
+        return coin
+    coin = dict(coin, current_price=live['price'])
+    if live['change_pct'] is not None:
+        coin['price_change_percentage_24h'] = live['change_pct']
+    return coin
+
+
+def _price_metric(coin, label):
+    change = coin.get('price_change_percentage_24h')
+    st.metric(
+        label,
+        f"${coin.get('current_price', 0):,.2f}",
+        delta=f"{change:.2f}%" if change is not None else None
+    )
+
+
+@st.fragment(run_every=LIVE_RUN_EVERY)
+def _live_price_fragment(coin, label):
+    _price_metric(with_live_quote(coin), label)
+
+
+def live_price_metric(coin, label="Current Price"):
+    """Price metric for a quote dict that follows the live ticker without a full rerun.
+
+    Coins without a live feed get a plain metric from the snapshot: no timer, and
+    no reason to start the websocket.
+    """
+    if has_live_quote(coin['id']):
+        _live_price_fragment(coin, label)
+    else:
+        _price_metric(coin, label)
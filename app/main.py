@@ -11,12 +11,11 @@ if parent_dir not in sys.path:
 
 # Import modules
 from app.st_theme import apply_crypto_theme
-from app.pages import landing_page
-
-from students.student_1_Agam import bitcoin_detail_page
-from students.student_2_Atyant import ethereum_detail_page
-from students.student_3_Vaibhav import xrp_detail_page
-
+from app.crypto_data import get_coin
+from app.pages import analytics_page, landing_page
+from app.page_registry import DETAIL_PAGES, get_detail_page
+from app.prefetch import wait_for_prefetch
+from app.metrics import span, start_metrics_server
 
 
 # Apply the beautiful crypto theme
@@ -30,29 +29,46 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Prometheus /metrics sidecar (once per process; CRYPTO_METRICS_PORT=0 disables it)
+start_metrics_server()
+
 def main():
     """Main application logic - routes to different pages"""
     # Initialize session state
     if 'page' not in st.session_state:
         st.session_state.page = "landing"
+
+    # ?coin=<id> deep-links to a detail page; the parameter is consumed so the
+    # detail page's back button returns to the landing page
+    coin_id = st.query_params.get("coin")
+    if coin_id:
+        del st.query_params["coin"]
+        coin = get_coin(coin_id)
+        if coin is not None:
+            st.session_state.selected_crypto = coin
+            st.session_state.page = "crypto_detail"
+        else:
+            st.warning(f"Unknown cryptocurrency: {coin_id}")
     
     # Page routing
     if st.session_state.page == "landing":
-        landing_page()
+        with span("page.landing"):
+            landing_page()
+    elif st.session_state.page == "analytics":
+        with span("page.analytics"):
+            analytics_page()
     elif st.session_state.page == "crypto_detail":
         # Route to specific crypto pages based on selected crypto
         if 'selected_crypto' in st.session_state:
             crypto_id = st.session_state.selected_crypto['id']
-            if crypto_id == 'bitcoin':
-                bitcoin_detail_page()
-            elif crypto_id == 'ethereum':
-                ethereum_detail_page()
-            elif crypto_id == 'ripple':  # XRP
-                xrp_detail_page()
-            elif crypto_id == 'solana':
-                solana_detail_page()
-            else:
-                st.error("Unknown cryptocurrency selected")
+            # Detail page modules are imported on first navigation
+            detail_page = get_detail_page(crypto_id)
+            # Reuse a background warm-up that is still running instead of refetching.
+            # Coins without their own page share one span name (bounded metric labels)
+            with span(f"page.{crypto_id if crypto_id in DETAIL_PAGES else 'other'}"):
+                with span("prefetch_wait", asset=crypto_id):
+                    wait_for_prefetch(crypto_id)
+                detail_page()
         else:
             st.error("No cryptocurrency selected")
 
@@ -0,0 +1,254 @@
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Timing spans and counters for the hot paths: every upstream call, DataFrame
+# transform and chart render runs inside a named span, so a slow page can be
+# pinned on CoinGecko, yfinance, Kraken, a render.com cold start or pandas.
+#
+# Spans feed a duration histogram and are written as one-line JSON logs (with
+# the cache hits/misses and upstream status codes seen inside them); all metrics
+# are served in Prometheus text format by a sidecar HTTP server on
+# CRYPTO_METRICS_PORT (default 9464, 0 turns it off) at /metrics.
+METRICS_PORT = int(os.environ.get("CRYPTO_METRICS_PORT", "9464"))
+# Spans at least this long are logged; 0 logs every span
+SPAN_LOG_MS = float(os.environ.get("CRYPTO_SPAN_LOG_MS", "500"))
+SPAN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    # Streamlit only configures its own loggers; span logs go to stderr as bare JSON
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets=SPAN_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """Thread-safe store of counters and histograms keyed by (name, labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._help = {}
+
+    def inc(self, name, help_text, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, help_text, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted({n for n, _ in self._counters}):
+                lines += [f"# HELP {name} {self._help[name]}", f"# TYPE {name} counter"]
+                for (n, labels), value in sorted(self._counters.items()):
+                    if n == name:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+            for name in sorted({n for n, _ in self._histograms}):
+                lines += [f"# HELP {name} {self._help[name]}", f"# TYPE {name} histogram"]
+                for (n, labels), h in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if n != name:
+                        continue
+                    # Already cumulative: each observation lands in every bucket above it
+                    for bound, count in zip(h.buckets, h.counts):
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', repr(float(bound))),))} {count}")
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h.count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {h.total}")
+                    lines.append(f"{name}_count{_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+registry = Registry()
+
+# Innermost open span of the current thread or task; asyncio.to_thread copies it,
+# so calls made through fetch_concurrently are attributed to the calling page
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed section; counts cache and upstream results recorded inside it."""
+
+    def __init__(self, name, attrs, parent):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex[:16]
+        self.cache = {}     # "hit"/"miss" -> count
+        self.upstream = {}  # upstream -> {status: count}
+        self._lock = threading.Lock()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def _add_cache(self, result):
+        # Roll up into every enclosing span, so the page span sees all of it
+        span = self
+        while span is not None:
+            with span._lock:
+                span.cache[result] = span.cache.get(result, 0) + 1
+            span = span.parent
+
+    def _add_upstream(self, upstream, status):
+        span = self
+        while span is not None:
+            with span._lock:
+                statuses = span.upstream.setdefault(upstream, {})
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            span = span.parent
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Time the enclosed block as span ``name``; ``attrs`` go to the log line only.
+
+    Yields the Span so callers can attach attributes found inside the block
+    (``s.set(rows=len(df))``).
+    """
+    parent = _current_span.get()
+    current = Span(name, attrs, parent)
+    token = _current_span.set(current)
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield current
+    except Exception as exc:
+        # st.rerun()/st.stop() raise BaseExceptions and pass through as "ok"
+        outcome = "error"
+        current.set(error=type(exc).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_span.reset(token)
+        registry.observe("crypto_span_seconds", "Duration of named hot-path spans.", elapsed,
+                         span=name, outcome=outcome)
+        if elapsed * 1000 >= SPAN_LOG_MS:
+            logger.info(json.dumps({
+                "event": "span",
+                "span": name,
+                "ms": round(elapsed * 1000, 1),
+                "outcome": outcome,
+                "trace": current.trace_id,
+                "parent": parent.name if parent is not None else None,
+                **current.attrs,
+                **({"cache": current.cache} if current.cache else {}),
+                **({"upstream": current.upstream} if current.upstream else {}),
+            }, default=str))
+
+
+def record_cache(cache, result):
+    """Count a lookup in ``cache``; result is "hit", "miss" or a finer hit kind."""
+    registry.inc("crypto_cache_requests_total", "Cache lookups by cache and result.", cache=cache, result=result)
+    current = _current_span.get()
+    if current is not None:
+        current._add_cache("miss" if result == "miss" else "hit")
+
+
+def upstream_name(url):
+    """Short label for the host of ``url``, e.g. api.coingecko.com -> coingecko."""
+    host = urlsplit(url).hostname or "unknown"
+    parts = host.split(".")
+    if host.endswith(".onrender.com"):
+        return f"onrender:{parts[0]}"
+    if len(parts) >= 2 and not host.replace(".", "").isdigit():
+        return parts[-2]
+    return host
+
+
+def record_upstream(upstream, status):
+    """Count an upstream answer; status is the HTTP code or the exception class name."""
+    registry.inc("crypto_upstream_requests_total", "Upstream HTTP requests by upstream and status.",
+                 upstream=upstream, status=status)
+    current = _current_span.get()
+    if current is not None:
+        current._add_upstream(upstream, status)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    """Serve /metrics on a daemon thread once per process; returns the server or None.
+
+    With several replicas on one host only the first gets the port; the others
+    log a warning and keep collecting (give each its own CRYPTO_METRICS_PORT).
+    """
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as exc:
+                logger.warning(json.dumps({"event": "metrics_server_unavailable", "port": port, "error": str(exc)}))
+                _server = False
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server or None
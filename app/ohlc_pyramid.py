@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+
+import pandas as pd
+
+from app.charting import CANDLES_PER_PIXEL, DEFAULT_CHART_WIDTH
+from app.history_store import get_history_store, sync_history
+from app.metrics import span
+from app.providers import ProviderError, load_candles
+
+# Multi-resolution OHLCV pyramid for zoomable charts. Every asset has one level
+# per candle length (1m, 5m, 1h, 1d), each a series in the history store.
+# Wherever a finer level reaches, a level's candles are roll-ups of it, so only
+# the minute level needs frequent upstream requests and new minutes flow up to
+# the forming 5m/1h/1d candles; further back each level keeps the provider's own
+# candles (Kraken keeps 720 per interval, yfinance intraday goes back 7-729 days).
+#
+# Chart queries read the coarsest level that still has a candle for every few
+# pixels of the chart, so a one-year view reads hours or days, never minutes,
+# and a one-day zoom gets minute candles.
+DAY = 86400
+LEVELS = (60, 300, 3600, DAY)  # candle length in seconds, finest first
+# How far back each level is kept
+RETENTION = {60: 2 * DAY, 300: 14 * DAY, 3600: 365 * DAY, DAY: 5 * 365 * DAY}
+# Upstream refresh per level: the minute level follows the market; coarser levels
+# are kept current by roll-ups and only go upstream to backfill and fill gaps
+LEVEL_REFRESH = {60: 60, 300: 900, 3600: 3600, DAY: 6 * 3600}
+# A pyramid is rolled up at most this often per process
+PYRAMID_REFRESH_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+
+_synced = {}  # crypto_id -> monotonic time of the last sync
+_sync_locks = {}
+_lock = threading.Lock()
+
+
+def level_series(crypto_id, seconds):
+    """History store series of one pyramid level.
+
+    A level can mix providers after a failover; candles are upserted by timestamp.
+    """
+    return f"pyramid:{crypto_id}:{seconds}"
+
+
+def rollup(frame, seconds, finer_seconds, now=None):
+    """Aggregate candles of ``finer_seconds`` into candles of ``seconds``.
+
+    Only buckets the finer candles fill without gaps are returned (the forming
+    last bucket up to its latest candle), so a partial roll-up never replaces a
+    complete upstream candle.
+    """
+    now = time.time() if now is None else now
+    frame = frame.dropna(subset=["open", "high", "low", "close"])
+    if frame.empty:
+        return frame.iloc[:0]
+    ts = frame.index.as_unit("s").asi8
+    buckets = ts // seconds * seconds
+    grouped = frame.groupby(buckets)
+    candles = grouped.agg(open=("open", "first"), high=("high", "max"), low=("low", "min"),
+                          close=("close", "last"), volume=("volume", "sum"))
+    # Kraken's extra columns: volume-weighted price and trade count
+    if "vwap" in frame.columns:
+        turnover = (frame["vwap"].astype("float64") * frame["volume"]).groupby(buckets).sum(min_count=1)
+        candles["vwap"] = turnover / candles["volume"].where(candles["volume"] > 0)
+    if "count" in frame.columns:
+        candles["count"] = frame["count"].groupby(buckets).sum(min_count=1)
+    stats = pd.Series(ts, index=buckets).groupby(level=0).agg(["min", "max", "size"])
+    starts = stats.index.to_numpy()
+    contiguous = (stats["min"].to_numpy() == starts) & (
+        stats["size"].to_numpy() == (stats["max"].to_numpy() - starts) // finer_seconds + 1)
+    full = stats["size"].to_numpy() == seconds // finer_seconds
+    forming = starts + seconds > now
+    candles = candles[contiguous & (full | forming)]
+    candles.index = pd.to_datetime(candles.index, unit="s", utc=True).rename("timestamp")
+    return candles
+
+
+def _sync_lock(crypto_id):
+    with _lock:
+        return _sync_locks.setdefault(crypto_id, threading.Lock())
+
+
+def sync_pyramid(crypto_id, force=False):
+    """Bring every level of crypto_id's pyramid up to date.
+
+    Runs at most once per PYRAMID_REFRESH_SECONDS per process; concurrent callers
+    wait for the running sync instead of starting their own.
+    """
+    with _sync_lock(crypto_id):
+        if not force and time.monotonic() - _synced.get(crypto_id, float("-inf")) < PYRAMID_REFRESH_SECONDS:
+            return
+        store = get_history_store()
+        now = time.time()
+        finer = None  # (seconds, frame) of the level below
+        with span("pyramid.sync", asset=crypto_id):
+            for seconds in LEVELS:
+                series = level_series(crypto_id, seconds)
+                start = now - RETENTION[seconds]
+                try:
+                    sync_history(series, start, lambda since, seconds=seconds: load_candles(crypto_id, seconds, since),
+                                 refresh_seconds=LEVEL_REFRESH[seconds])
+                except ProviderError:
+                    # Nothing stored and no provider; the roll-up below may still fill it
+                    logger.warning("No upstream candles for %s", series, exc_info=True)
+                if finer is not None and not finer[1].empty:
+                    with span("transform.pyramid_rollup", level=seconds):
+                        rolled = rollup(finer[1], seconds, finer[0], now)
+                    if not rolled.empty:
+                        store.write(series, rolled, start, checked=False)
+                store.prune(series, start)
+                finer = (seconds, store.read(series, start))
+        _synced[crypto_id] = time.monotonic()
+
+
+def choose_level(crypto_id, start_ts, end_ts, width_px=DEFAULT_CHART_WIDTH, candles_per_pixel=CANDLES_PER_PIXEL):
+    """Coarsest level with at least ``width_px * candles_per_pixel`` candles in the range.
+
+    Only levels whose stored candles reach back to start_ts count; if none has
+    enough candles the finest of those is used, and if none reaches that far the
+    coarsest level (the longest history).
+    """
+    store = get_history_store()
+    wanted = width_px * candles_per_pixel
+    covering = []
+    for seconds in LEVELS:
+        bounds = store.bounds(level_series(crypto_id, seconds))
+        if bounds is not None and bounds[0] <= start_ts + seconds:
+            covering.append(seconds)
+    for seconds in reversed(covering):
+        if (end_ts - start_ts) / seconds >= wanted:
+            return seconds
+    return covering[0] if covering else LEVELS[-1]
+
+
+def get_candles(crypto_id, start_ts, end_ts=None, width_px=DEFAULT_CHART_WIDTH, candles_per_pixel=CANDLES_PER_PIXEL):
+    """OHLCV candles for [start_ts, end_ts] from the level chosen by choose_level.
+
+    Returns ``(seconds, frame)``: the candle length and a frame of OHLCV columns
+    (plus vwap and count where Kraken filled them) indexed by UTC candle start.
+    """
+    sync_pyramid(crypto_id)
+    end_ts = time.time() if end_ts is None else end_ts
+    seconds = choose_level(crypto_id, start_ts, end_ts, width_px, candles_per_pixel)
+    with span("pyramid.read", asset=crypto_id, level=seconds) as s:
+        frame = get_history_store().read(level_series(crypto_id, seconds), start_ts // seconds * seconds, end_ts)
+        s.set(rows=len(frame))
+    return seconds, frame
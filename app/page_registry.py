@@ -0,0 +1,24 @@
+import importlib
+
+# Asset id -> (module, page function). Modules are imported on first navigation,
+# so opening the landing page never loads yfinance, plotly, altair or numpy.
+DETAIL_PAGES = {
+    "bitcoin": ("students.student_1_Agam", "bitcoin_detail_page"),
+    "ethereum": ("students.student_2_Atyant", "ethereum_detail_page"),
+    "ripple": ("students.student_3_Vaibhav", "xrp_detail_page"),
+    "solana": ("app.pages", "crypto_detail_page"),
+}
+# Every other coin of the landing page's universe
+GENERIC_DETAIL_PAGE = ("app.pages", "crypto_detail_page")
+
+
+def register_detail_page(crypto_id, module, function):
+    """Route ``crypto_id`` to ``module.function`` (imported lazily)."""
+    DETAIL_PAGES[crypto_id] = (module, function)
+
+
+def get_detail_page(crypto_id):
+    """Return the detail page function for an asset (the generic page if it has none of its own)."""
+    module, function = DETAIL_PAGES.get(crypto_id, GENERIC_DETAIL_PAGE)
+    # importlib caches modules in sys.modules, so only the first call pays the import
+    return getattr(importlib.import_module(module), function)
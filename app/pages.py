@@ -1,12 +1,17 @@
+import html
 import streamlit as st
-import requests
-import plotly.graph_objects as go
 from datetime import datetime
-from crypto_data import get_crypto_data, get_price_history, MAIN_CRYPTOS
-from st_theme import show_callout
+from app.crypto_data import (MAIN_CRYPTOS, MARKET_PAGES, MARKET_SORTS, PERIOD_DAYS, QUOTE_STALE_SECONDS, UNIVERSE_SIZE,
+                             get_coin, get_market_page, get_price_history, get_quote_snapshot, get_universe_ids,
+                             search_assets, yf_symbol_for)
+from app.st_theme import show_callout
+from app.prediction_client import PREDICTION_APIS, PredictionError, get_prediction_client
+from app.prefetch import prefetch_detail_pages
+from app.live_ticks import LIVE_RUN_EVERY, has_live_quote, live_price_metric, with_live_quote
+from app.metrics import span
 
 def landing_page():
-    """Main landing page with our four cryptocurrencies"""
+    """Main landing page: headline quotes, coin search and the paged coin grid"""
     
     st.markdown('<h1 class="main-header">🚀 Crypto Dashboard</h1>', unsafe_allow_html=True)
     
@@ -31,84 +36,280 @@ def landing_page():
     </div>
     """, unsafe_allow_html=True)
     
-    # Get crypto data
+    # Get crypto data - served from the background refresher's last good snapshot; never waits on CoinGecko
     with st.spinner("Loading cryptocurrency data..."):
-        crypto_data = get_crypto_data()
+        snapshot = get_quote_snapshot()
+    crypto_data = snapshot['data']
+    if snapshot['is_sample']:
+        st.warning("Using sample data - API unavailable")
+    elif snapshot['age'] > QUOTE_STALE_SECONDS:
+        st.caption(f"Prices are {snapshot['age'] / 60:.0f} minutes old - refreshing in the background")
     
     # Display crypto overview
-    st.subheader("📊 Top 4 Cryptocurrencies")
+    st.subheader("📊 Market Overview")
     
     # Create columns for metrics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         total_market_cap = sum([coin.get('market_cap', 0) for coin in crypto_data])
-        st.metric("Total Market Cap", f"${total_market_cap/1e12:.2f}T")
+        st.metric("Total Market Cap", f"${total_market_cap/1e12:.2f}T", help=_headline_help(crypto_data))
     
     with col2:
         avg_change = sum([coin.get('price_change_percentage_24h', 0) for coin in crypto_data]) / len(crypto_data)
-        st.metric("Avg 24h Change", f"{avg_change:.2f}%")
+        st.metric("Avg 24h Change", f"{avg_change:.2f}%", help=_headline_help(crypto_data))
     
     with col3:
-        st.metric("Cryptocurrencies", "4")
+        st.metric("Cryptocurrencies", f"{UNIVERSE_SIZE:,}", help="Coins you can browse and search below")
     
     with col4:
-        st.metric("Last Updated", datetime.now().strftime("%H:%M:%S"))
+        updated = datetime.fromtimestamp(snapshot['fetched_at']) if snapshot['fetched_at'] else None
+        st.metric("Last Updated", updated.strftime("%H:%M:%S") if updated else "N/A")
     
-    # Crypto selection grid - 2x2 layout
+    # Crypto selection grid - a page of the top coins
     st.subheader("🎯 Select a Cryptocurrency")
+
+    _asset_search()
     
-    # Create a 2x2 grid
-    row1_col1, row1_col2 = st.columns(2)
-    row2_col1, row2_col2 = st.columns(2)
+    _crypto_cards(crypto_data)
+
+    if st.button("📈 Cross-Asset Correlation & Beta", use_container_width=True):
+        st.session_state.page = "analytics"
+        st.rerun()
+
+    # Cards are on screen; warm each detail page's data while the user decides
+    prefetch_detail_pages([coin['id'] for coin in crypto_data])
+
+def _headline_help(crypto_data):
+    return "Across " + ", ".join(coin['name'] for coin in crypto_data)
+
+def _open_picked(key):
+    """Open the coin picked in the ``key`` widget (a search match or a card) and clear the pick"""
+    crypto_id = st.session_state[key]
+    st.session_state[key] = None
+    coin = get_coin(crypto_id) if crypto_id else None
+    if coin is not None:
+        st.session_state.selected_crypto = coin
+        st.session_state.page = "crypto_detail"
+
+def _asset_search():
+    """Search box over the whole coin universe; picking a match opens its page"""
+    query = st.text_input("🔎 Search coins", key="asset_search", placeholder="Symbol or name, e.g. BTC or ether")
+    if not query:
+        return
+    with span("transform.asset_search") as s:
+        results = search_assets(query)
+        s.set(results=len(results))
+    if not results:
+        st.caption("No matching coins")
+        return
+    labels = {coin['id']: f"{coin['symbol']} · {coin['name']}" for coin in results}
+    st.pills("Matches", list(labels), format_func=labels.get, key="asset_search_pick",
+             on_change=_open_picked, args=("asset_search_pick",), label_visibility="collapsed")
+
+def _format_price(price):
+    return f"${price:,.2f}" if price >= 1 else f"${price:.6g}"
+
+def _format_cap(cap):
+    for scale, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+        if cap >= scale:
+            return f"${cap / scale:.1f}{suffix}"
+    return f"${cap:,.0f}"
+
+# Shared by every card of a page, so each card only carries its own values
+CARD_CSS = """
+<style>
+.coin-grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(260px, 1fr)); gap: 1.5rem; margin: 1rem 0; }
+.coin-card {
+    background: rgba(255, 255, 255, 0.9);
+    padding: 1.5rem;
+    border-radius: 15px;
+    border-left: 6px solid #4a5568;
+    height: 100%;
+    box-shadow: 0 8px 25px rgba(0,0,0,0.15);
+    backdrop-filter: blur(10px);
+    transition: all 0.3s ease;
+}
+.coin-card:hover { transform: translateY(-5px); }
+.coin-card h3 { margin-bottom: 0.5rem; }
+.coin-card h4 { color: #2d3748; font-weight: bold; margin: 0.5rem 0; }
+.coin-card .change { font-weight: bold; margin: 0.5rem 0; }
+.coin-card .cap { color: #4a5568; font-size: 0.9em; margin: 0; }
+</style>
+"""
+
+def _coin_icon_html(coin):
+    """Escaped icon of a quote dict: our glyph, else CoinGecko's image, else nothing"""
+    if coin.get('icon'):
+        return html.escape(coin['icon'])
+    if coin.get('image'):
+        # Sized to the surrounding text, in a card title or a page header
+        return f'<img src="{html.escape(coin["image"])}" alt="" style="height: 1.2em; vertical-align: -0.15em;">'
+    return ""
+
+def _card_html(coin):
+    """One price card (display only; the picker under the grid opens the detail page)"""
+    price_change = coin.get('price_change_percentage_24h') or 0
+    change_color = "green" if price_change >= 0 else "red"
+    change_symbol = "↗️" if price_change >= 0 else "↘️"
+    # Names and image URLs come from CoinGecko; escape everything that isn't ours
+    name, symbol, color = html.escape(coin['name']), html.escape(coin['symbol']), html.escape(coin['color'])
+    icon = _coin_icon_html(coin)
+    rank = f"#{coin['rank']} · " if coin.get('rank') else ""
+    return (
+        f'<div class="coin-card" style="border-left-color: {color};">'
+        f'<h3 style="color: {color};">{icon} {name} ({symbol})</h3>'
+        f'<h4>{_format_price(coin.get("current_price") or 0)}</h4>'
+        f'<p class="change" style="color: {change_color};">{change_symbol} {price_change:.2f}%</p>'
+        f'<p class="cap">{rank}Market Cap: {_format_cap(coin.get("market_cap") or 0)}</p></div>'
+    )
+
+def _live_prices(crypto_data):
+    """Live price metrics of the ticker-backed coins; each reruns on its own timer.
+
+    The card grid is sent once per page run, so only these few values follow the
+    ticker between runs.
+    """
+    live = [coin for coin in crypto_data if has_live_quote(coin['id'])]
+    if not live:
+        return
+    for col, coin in zip(st.columns(len(live)), live):
+        with col:
+            live_price_metric(coin, label=f"{coin['symbol']} (live)")
+
+def _crypto_cards(crypto_data):
+    """Sorted, paged grid of price cards with one picker to open a coin.
+
+    A page of cards is one HTML block (CSS grid) and a single pills widget keyed
+    by coin id, so the number of elements and widgets doesn't grow with the page
+    size. Picking switches the page within the session.
+    """
+    _live_prices(crypto_data)
+
+    col_sort, col_page, col_info = st.columns([2, 1, 2])
+    with col_sort:
+        sort = st.selectbox("Sort by", list(MARKET_SORTS), key="market_sort")
+    with col_page:
+        page = st.number_input("Page", min_value=1, max_value=MARKET_PAGES, step=1, key="market_page")
+
+    with span("render.market_page", page=page, sort=sort) as s:
+        coins = get_market_page(page, sort)
+        if coins is None:
+            # CoinGecko is down or rate limited: the main coins still have live quotes
+            coins = crypto_data if page == 1 else []
+            st.caption("The full coin list is unavailable right now - showing the main cryptocurrencies")
+        with col_info:
+            st.caption(f"Page {page} of {MARKET_PAGES} · {UNIVERSE_SIZE} coins")
+        # Price and 24h change as of this run, from the live ticker where there is one
+        cards = "".join(_card_html(with_live_quote(coin)) for coin in coins)
+        st.markdown(f'{CARD_CSS}<div class="coin-grid">{cards}</div>', unsafe_allow_html=True)
+        if coins:
+            labels = {coin['id']: f"{coin['symbol']} · {coin['name']}" for coin in coins}
+            st.pills("View a cryptocurrency", list(labels), format_func=labels.get, key="market_pick",
+                     on_change=_open_picked, args=("market_pick",))
+        s.set(cards=len(coins))
+
+@st.fragment
+def _eth_prediction_panel():
+    """ETH prediction button and result; a click reruns only this panel"""
+    if st.button("🤖 Get ETH Prediction", type="primary", use_container_width=True):
+        with st.spinner("🔮 Generating prediction..."):
+            try:
+                result = get_prediction_client().predict("ethereum")
+                
+                prediction = result['raw']
+                pred_high = result['predicted_high']
+                latest_close = result['latest_close']
+                if pred_high is None:
+                    st.error("❌ The API response has no prediction")
+                    st.json(prediction)
+                    return
+                # The API may leave out the latest close
+                change = f"{(pred_high - latest_close) / latest_close * 100:+.2f}%" if latest_close else "N/A"
+                close = f"${latest_close:,.2f}" if latest_close else "N/A"
+                
+                # Display prediction in a nice box
+                st.markdown(f"""
+                <div style="
+                    background: linear-gradient(135deg, #4CAF50, #45a049);
+                    color: white;
+                    padding: 1.5rem;
+                    border-radius: 15px;
+                    text-align: center;
+                    margin: 1rem 0;
+                    box-shadow: 0 4px 15px rgba(76, 175, 80, 0.3);
+                ">
+                    <h3>🎯 Next-Day HIGH Prediction</h3>
+                    <h2>${pred_high:,.2f}</h2>
+                    <p>Expected change: {change}</p>
+                    <small>Current Close: {close}</small>
+                </div>
+                """, unsafe_allow_html=True)
+                
+                # Show additional details
+                with st.expander("📊 Prediction Details"):
+                    st.json(prediction)
+                        
+            except PredictionError:
+                st.error("❌ Prediction API not available")
+                st.info(f"💡 **The hosted API at {PREDICTION_APIS['ethereum']['base']} may be waking up. Try again in a few seconds.**")
+                    
+            except Exception as e:
+                st.error(f"❌ Could not connect to prediction API")
+                st.info("💡 **Check that the prediction API is reachable (set `ETH_PREDICTION_API` to use another deployment)**")
+
+@st.fragment
+def _price_history_panel(crypto):
+    """Period selector and price chart; changing the period reruns only this panel"""
+    # Chart dependencies are only imported once a detail page is opened
+    import plotly.graph_objects as go
+    from app.charting import downsample_frame, line_trace, target_points
+    from app.figure_cache import cached_figure
+    
+    # Time period selector
+    period = st.selectbox(
+        "Select Time Period",
+        ["7d", "30d", "90d", "1y"],
+        format_func=lambda x: {"7d": "7 Days", "30d": "30 Days", "90d": "90 Days", "1y": "1 Year"}[x]
+    )
     
-    cols = [row1_col1, row1_col2, row2_col1, row2_col2]
+    # Get and display price history
+    with st.spinner("Loading price history..."):
+        yf_symbol = yf_symbol_for(crypto)
+        price_data = get_price_history(yf_symbol, period)
     
-    for idx, coin in enumerate(crypto_data):
-        col = cols[idx]
+    if price_data is not None and not price_data.empty:
+        def build_price_chart():
+            chart_data = downsample_frame(price_data, ['Close'], target_points())
+            fig = go.Figure()
+            fig.add_trace(line_trace(
+                x=chart_data.index,
+                y=chart_data['Close'],
+                mode='lines',
+                name='Price',
+                line=dict(color=crypto['color'], width=3)
+            ))
         
-        with col:
-            # Create crypto card
-            price_change = coin.get('price_change_percentage_24h', 0)
-            change_color = "green" if price_change >= 0 else "red"
-            change_symbol = "↗️" if price_change >= 0 else "↘️"
-            
-            # Use the coin's actual color for the border and better styling
-            card_html = f"""
-            <div style="
-                background: rgba(255, 255, 255, 0.9);
-                padding: 1.5rem;
-                border-radius: 15px;
-                border-left: 6px solid {coin['color']};
-                margin: 1rem 0;
-                box-shadow: 0 8px 25px rgba(0,0,0,0.15);
-                backdrop-filter: blur(10px);
-                transition: all 0.3s ease;
-            " onmouseover="this.style.transform='translateY(-5px)'" onmouseout="this.style.transform='translateY(0)'">
-                <h3 style="color: {coin['color']}; margin-bottom: 0.5rem;">
-                    {coin['icon']} {coin['name']} ({coin['symbol']})
-                </h3>
-                <h4 style="color: #2d3748; font-weight: bold; margin: 0.5rem 0;">
-                    ${coin.get('current_price', 0):,.2f}
-                </h4>
-                <p style="color: {change_color}; font-weight: bold; margin: 0.5rem 0;">
-                    {change_symbol} {price_change:.2f}%
-                </p>
-                <p style="color: #4a5568; font-size: 0.9em; margin: 0;">
-                    Market Cap: ${coin.get('market_cap', 0)/1e9:.1f}B
-                </p>
-            </div>
-            """
-            st.markdown(card_html, unsafe_allow_html=True)
-            
-            if st.button(f"View {coin['name']}", key=f"btn_{coin['id']}", use_container_width=True, type="primary"):
-                st.session_state.selected_crypto = coin
-                st.session_state.page = "crypto_detail"
-                st.rerun()
+            fig.update_layout(
+                title=f"{crypto['name']} Price History ({period})",
+                xaxis_title="Date",
+                yaxis_title="Price (USD)",
+                hovermode='x unified',
+                height=500,
+                showlegend=False
+            )
+        
+            return fig
+        
+        with span("render.price_history", asset=crypto['id'], period=period):
+            fig = cached_figure(build_price_chart, crypto['id'], period, "price_line", price_data,
+                                color=crypto['color'])
+            st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.warning("Unable to load price history data.")
 
 def crypto_detail_page():
     """Detailed page for selected cryptocurrency"""
-    
     if 'selected_crypto' not in st.session_state:
         st.error("No cryptocurrency selected. Please go back to the landing page.")
         if st.button("← Back to Landing Page"):
@@ -126,18 +327,15 @@ def crypto_detail_page():
             st.rerun()
     
     with col2:
-        st.markdown(f'<h1 class="main-header">{crypto["icon"]} {crypto["name"]} ({crypto["symbol"]}) Analytics</h1>', 
-                   unsafe_allow_html=True)
+        # Any coin of the CoinGecko universe can get here: escape its upstream strings
+        st.markdown(f'<h1 class="main-header">{_coin_icon_html(crypto)} {html.escape(crypto["name"])} '
+                    f'({html.escape(crypto["symbol"])}) Analytics</h1>', unsafe_allow_html=True)
     
     # Main metrics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric(
-            "Current Price", 
-            f"${crypto.get('current_price', 'N/A'):,.2f}",
-            delta=f"{crypto.get('price_change_percentage_24h', 0):.2f}%"
-        )
+        live_price_metric(crypto)
     
     with col2:
         market_cap = crypto.get('market_cap', 0)
@@ -170,85 +368,17 @@ def crypto_detail_page():
             """)
         
         with col2:
-            if st.button("🤖 Get ETH Prediction", type="primary", use_container_width=True):
-                with st.spinner("🔮 Generating prediction..."):
-                    try:
-                        response = requests.get("http://localhost:8000/predict/ETH", timeout=10)
-                        
-                        if response.status_code == 200:
-                            prediction = response.json()
-                            pred_high = prediction.get('pred_high_next', 0)
-                            latest_close = prediction.get('latest_close', 0)
-                            change_pct = ((pred_high - latest_close) / latest_close * 100)
-                            
-                            # Display prediction in a nice box
-                            st.markdown(f"""
-                            <div style="
-                                background: linear-gradient(135deg, #4CAF50, #45a049);
-                                color: white;
-                                padding: 1.5rem;
-                                border-radius: 15px;
-                                text-align: center;
-                                margin: 1rem 0;
-                                box-shadow: 0 4px 15px rgba(76, 175, 80, 0.3);
-                            ">
-                                <h3>🎯 Next-Day HIGH Prediction</h3>
-                                <h2>${pred_high:,.2f}</h2>
-                                <p>Expected change: {change_pct:+.2f}%</p>
-                                <small>Current Close: ${latest_close:,.2f}</small>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            # Show additional details
-                            with st.expander("📊 Prediction Details"):
-                                st.json(prediction)
-                                
-                        else:
-                            st.error("❌ Prediction API not available")
-                            st.info("💡 **Start the API:** `uvicorn app.main:app --reload --port 8000`")
-                            
-                    except Exception as e:
-                        st.error(f"❌ Could not connect to prediction API")
-                        st.info("💡 **Make sure your FastAPI server is running on port 8000**")
+            _eth_prediction_panel()
     
     # Price chart
     st.markdown("---")
     st.subheader("📈 Price History")
     
-    # Time period selector
-    period = st.selectbox(
-        "Select Time Period",
-        ["7d", "30d", "90d", "1y"],
-        format_func=lambda x: {"7d": "7 Days", "30d": "30 Days", "90d": "90 Days", "1y": "1 Year"}[x]
-    )
-    
-    # Get and display price history
-    with st.spinner("Loading price history..."):
-        yf_symbol = MAIN_CRYPTOS[crypto['id']]['yf_symbol']
-        price_data = get_price_history(yf_symbol, period)
-    
-    if price_data is not None and not price_data.empty:
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=price_data.index,
-            y=price_data['Close'],
-            mode='lines',
-            name='Price',
-            line=dict(color=crypto['color'], width=3)
-        ))
-        
-        fig.update_layout(
-            title=f"{crypto['name']} Price History ({period})",
-            xaxis_title="Date",
-            yaxis_title="Price (USD)",
-            hovermode='x unified',
-            height=500,
-            showlegend=False
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.warning("Unable to load price history data.")
+    _price_history_panel(crypto)
+
+    st.markdown("---")
+    st.subheader("🧪 Strategy Backtest")
+    backtest_panel(crypto)
     
     # Crypto information section
     st.markdown("---")
@@ -331,11 +461,16 @@ def crypto_detail_page():
     
     with col2:
         market_cap = crypto.get('market_cap', 0)
-        st.metric(
-            "Market Cap Rank",
-            f"#{['bitcoin', 'ethereum', 'ripple', 'solana'].index(crypto['id']) + 1}",
-            help="Rank among our tracked cryptocurrencies"
-        )
+        # CoinGecko's rank when the coin was opened from the market list
+        rank = crypto.get('rank')
+        if rank:
+            rank_label, rank_help = f"#{rank}", "Rank by market cap on CoinGecko"
+        elif crypto['id'] in MAIN_CRYPTOS:
+            rank_label, rank_help = f"#{list(MAIN_CRYPTOS).index(crypto['id']) + 1}", "Rank among our tracked cryptocurrencies"
+        else:
+            # CoinGecko reports no rank for some coins in the universe
+            rank_label, rank_help = "N/A", "CoinGecko has no market cap rank for this coin"
+        st.metric("Market Cap Rank", rank_label, help=rank_help)
     
     with col3:
         change_24h = crypto.get('price_change_percentage_24h', 0)
@@ -343,4 +478,192 @@ def crypto_detail_page():
             "24h Performance",
             "Bullish" if change_24h > 0 else "Bearish",
             f"{change_24h:+.2f}%"
-        )
\ No newline at end of file
+        )
+# Analytics page universes: label -> number of top coins (the main four need no market list)
+ANALYTICS_UNIVERSES = {"Top 4": len(MAIN_CRYPTOS),
+                       **{f"Top {n}": n for n in (25, 100) if n < UNIVERSE_SIZE},
+                       f"Top {UNIVERSE_SIZE}": UNIVERSE_SIZE}
+ANALYTICS_PERIODS = ["30d", "90d", "1y"]
+# Tick labels are dropped above this many assets (hover still names both)
+HEATMAP_MAX_LABELS = 50
+# The covariance table shows the top assets only
+COVARIANCE_TABLE_SIZE = 25
+
+def _analytics_universe(label):
+    """Asset ids of a universe option, or the main four if the market list is unavailable"""
+    size = ANALYTICS_UNIVERSES[label]
+    if size <= len(MAIN_CRYPTOS):
+        return list(MAIN_CRYPTOS)
+    crypto_ids = get_universe_ids(size)
+    if crypto_ids is None:
+        st.warning("Market list unavailable - showing the top 4 instead")
+        return list(MAIN_CRYPTOS)
+    # Beta is measured against Bitcoin, so it is always included
+    return crypto_ids if "bitcoin" in crypto_ids else ["bitcoin", *crypto_ids[:-1]]
+
+def analytics_page():
+    """Correlation, beta and covariance across a universe of coins"""
+    import plotly.graph_objects as go
+    from app.analytics import DEFAULT_BENCHMARK, PERIODS_PER_YEAR, cross_asset_stats
+    from app.charting import line_trace
+    from app.figure_cache import cached_figure
+
+    col1, col2 = st.columns([1, 4])
+    with col1:
+        if st.button("← Back to Landing"):
+            st.session_state.page = "landing"
+            st.rerun()
+    with col2:
+        st.markdown('<h1 class="main-header">📈 Cross-Asset Analytics</h1>', unsafe_allow_html=True)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        universe = st.selectbox("Universe", list(ANALYTICS_UNIVERSES), key="analytics_universe")
+    with col2:
+        period = st.selectbox("History", ANALYTICS_PERIODS, index=1, key="analytics_period",
+                              format_func=lambda x: {"30d": "30 Days", "90d": "90 Days", "1y": "1 Year"}[x])
+    with col3:
+        max_window = min(90, PERIOD_DAYS[period])
+        window = st.slider("Window (days)", 10, max_window, min(30, max_window), step=5, key="analytics_window")
+
+    crypto_ids = _analytics_universe(universe)
+    with st.spinner(f"Loading {len(crypto_ids)} price histories..."):
+        closes, stats = cross_asset_stats(period, crypto_ids, window)
+    if not stats:
+        st.warning("Unable to load price history data.")
+        return
+    missing = len(crypto_ids) - closes.shape[1]
+    if missing:
+        st.caption(f"{missing} coins without price history are left out")
+
+    symbols = {crypto_id: (get_coin(crypto_id) or {}).get('symbol', crypto_id) for crypto_id in closes.columns}
+    corr = stats["correlation"]
+    labels = [symbols[crypto_id] for crypto_id in corr.columns]
+
+    st.subheader(f"🔗 Correlation of Daily Returns (last {window} days)")
+
+    def build_heatmap():
+        fig = go.Figure(go.Heatmap(
+            z=corr.to_numpy(dtype="float32"), x=labels, y=labels,
+            zmin=-1, zmax=1, colorscale="RdBu", colorbar=dict(title="ρ"),
+            hovertemplate="%{y} / %{x}: %{z:.2f}<extra></extra>",
+        ))
+        show_labels = len(labels) <= HEATMAP_MAX_LABELS
+        fig.update_layout(height=700, xaxis=dict(showticklabels=show_labels),
+                          yaxis=dict(showticklabels=show_labels, autorange="reversed"))
+        return fig
+
+    with span("render.correlation_heatmap", assets=len(labels)):
+        st.plotly_chart(cached_figure(build_heatmap, universe, period, "correlation_heatmap", corr, window=window),
+                        use_container_width=True)
+
+    if "rolling_beta" not in stats:
+        st.info("Bitcoin history is unavailable, so beta cannot be computed.")
+    else:
+        benchmark = symbols.get(DEFAULT_BENCHMARK, "BTC")
+        st.subheader(f"📐 Beta and Correlation vs {benchmark}")
+        summary = stats["rolling_beta"].iloc[-1].to_frame(f"Beta vs {benchmark}")
+        summary[f"Correlation vs {benchmark}"] = stats["rolling_correlation"].iloc[-1]
+        summary["Annualized Volatility"] = stats["volatility"]
+        summary.index = [symbols[crypto_id] for crypto_id in summary.index]
+        st.dataframe(summary.sort_values(f"Beta vs {benchmark}", ascending=False).round(3),
+                     height=320, use_container_width=True)
+
+        statistic = st.radio("Rolling statistic", ["Correlation", "Beta"], horizontal=True, key="analytics_rolling")
+        rolling = stats["rolling_correlation" if statistic == "Correlation" else "rolling_beta"]
+        others = [crypto_id for crypto_id in rolling.columns if crypto_id != DEFAULT_BENCHMARK]
+        picked = st.multiselect("Coins", others, default=others[:3], format_func=symbols.get,
+                                key="analytics_rolling_coins")
+        if picked:
+            def build_rolling_chart():
+                fig = go.Figure()
+                for crypto_id in picked:
+                    fig.add_trace(line_trace(x=rolling.index, y=rolling[crypto_id], mode='lines',
+                                             name=symbols[crypto_id]))
+                fig.update_layout(title=f"{window}-day rolling {statistic.lower()} vs {benchmark}",
+                                  xaxis_title="Date", yaxis_title=statistic, hovermode='x unified', height=400)
+                return fig
+
+            with span("render.rolling_benchmark", assets=len(picked)):
+                st.plotly_chart(cached_figure(build_rolling_chart, ",".join(picked), period, f"rolling_{statistic}",
+                                              rolling[picked], window=window), use_container_width=True)
+
+    with st.expander("🧮 Return Covariance Matrix"):
+        top = list(stats["covariance"].columns[:COVARIANCE_TABLE_SIZE])
+        covariance = stats["covariance"].loc[top, top] * PERIODS_PER_YEAR
+        covariance.index = covariance.columns = [symbols[crypto_id] for crypto_id in top]
+        st.caption(f"Annualized covariance of daily log returns over the last {window} days"
+                   + (f" (top {COVARIANCE_TABLE_SIZE} of {len(labels)} coins)" if len(labels) > len(top) else ""))
+        st.dataframe(covariance.round(5), use_container_width=True)
+
+# Backtest candle lengths (OHLC pyramid levels)
+BACKTEST_RESOLUTIONS = {"1 Minute": 60, "5 Minutes": 300, "1 Hour": 3600, "1 Day": 86400}
+
+@st.fragment
+def backtest_panel(crypto):
+    """Backtest the EMA crossover or Bollinger signal on this coin's stored candles"""
+    if not st.toggle("Run a backtest on stored candles", key=f"backtest_{crypto['id']}"):
+        return
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    from app.backtest import DEFAULT_COST_BPS, STRATEGIES, backtest
+    from app.charting import downsample_frame, line_trace, target_points
+    from app.ohlc_pyramid import RETENTION
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        strategy = st.selectbox("Strategy", list(STRATEGIES), key="backtest_strategy")
+        allow_short = st.checkbox("Allow short positions", key="backtest_short")
+    with col2:
+        resolution = st.selectbox("Candles", list(BACKTEST_RESOLUTIONS), index=2, key="backtest_resolution")
+        seconds = BACKTEST_RESOLUTIONS[resolution]
+        max_days = RETENTION[seconds] // 86400
+        days = st.slider("History (days)", 1, max_days, min(90, max_days), key=f"backtest_days_{seconds}")
+    with col3:
+        if strategy == "EMA crossover":
+            fast = st.number_input("Fast EMA", 2, 200, 9, key="backtest_fast")
+            slow = st.number_input("Slow EMA", 3, 500, 21, key="backtest_slow")
+            params = dict(fast=int(fast), slow=int(max(slow, fast + 1)))
+        else:
+            window = st.number_input("Band window", 5, 500, 20, key="backtest_window")
+            num_std = st.number_input("Band width (std)", 0.5, 5.0, 2.0, step=0.5, key="backtest_std")
+            params = dict(window=int(window), num_std=float(num_std))
+        cost_bps = st.number_input("Cost per trade (bps)", 0.0, 100.0, float(DEFAULT_COST_BPS), key="backtest_cost")
+
+    with st.spinner("Loading candles..."):
+        try:
+            frame, stats = backtest(crypto['id'], strategy, seconds, days, cost_bps, allow_short=allow_short, **params)
+        except Exception as e:
+            st.error(f"Backtest failed: {e}")
+            return
+    if frame.empty:
+        st.warning("No stored candles for this coin at this resolution.")
+        return
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("Strategy Return", f"{stats['total_return']:+.1%}",
+                  f"{stats['total_return'] - stats['buy_hold_return']:+.1%} vs hold")
+    with col2:
+        st.metric("Sharpe", f"{stats['sharpe']:.2f}")
+    with col3:
+        st.metric("Max Drawdown", f"{stats['max_drawdown']:.1%}")
+    with col4:
+        st.metric("Turnover / Year", f"{stats['turnover']:.1f}x")
+    with col5:
+        st.metric("Trades", f"{stats['trades']:,}")
+    st.caption(f"{stats['bars']:,} candles, in the market {stats['exposure']:.0%} of the time")
+
+    with span("render.backtest", asset=crypto['id'], rows=len(frame)):
+        chart = downsample_frame(frame, ['equity', 'buy_hold', 'drawdown'], target_points())
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.7, 0.3], vertical_spacing=0.05)
+        fig.add_trace(line_trace(x=chart.index, y=chart['equity'], mode='lines', name=strategy,
+                                 line=dict(color=crypto['color'])), row=1, col=1)
+        fig.add_trace(line_trace(x=chart.index, y=chart['buy_hold'], mode='lines', name='Buy & hold',
+                                 line=dict(color='gray', dash='dot')), row=1, col=1)
+        fig.add_trace(line_trace(x=chart.index, y=chart['drawdown'], mode='lines', name='Drawdown', fill='tozeroy',
+                                 line=dict(color='firebrick')), row=2, col=1)
+        fig.update_layout(height=550, hovermode='x unified')
+        fig.update_yaxes(title_text="Equity (×)", row=1, col=1)
+        fig.update_yaxes(title_text="Drawdown", tickformat=".0%", row=2, col=1)
+        st.plotly_chart(fig, use_container_width=True)
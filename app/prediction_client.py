@@ -0,0 +1,264 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from app.http_client import PREDICTION_TIMEOUT, http_get
+from app.metrics import record_cache, span
+
+# One entry per asset: base URL (overridable per deployment), candidate predict routes
+# tried in order until one exists, optional health route and the response parser.
+# Routes are formatted with {date} (UTC prediction day) and {days} (history window).
+PREDICTION_APIS = {
+    "bitcoin": {
+        "base": os.environ.get("BTC_PREDICTION_API", "https://bitcoin-prediction-api-rrfq.onrender.com"),
+        "routes": ["/predict/Bitcoin?date={date}"],
+        "health": "/health/",
+    },
+    "ethereum": {
+        "base": os.environ.get("ETH_PREDICTION_API", "https://student-api-25156985.onrender.com"),
+        "routes": ["/predict/ETH"],
+        "health": None,
+    },
+    "ripple": {
+        "base": os.environ.get("XRP_PREDICTION_API", "https://at3-fastapi.onrender.com"),
+        "routes": ["/predict/?days={days}", "/predict/ripple/?days={days}"],
+        "health": None,
+    },
+}
+
+RESULT_TTL = 3600      # a next-day prediction doesn't change within the hour
+FAILURE_TTL = 30       # short negative cache so a down API isn't hammered by every session
+HEALTH_TTL = 60
+# Cached results and failures (LRU): base URLs can come from user input, and a
+# new prediction day adds keys every day
+RESULT_CACHE_SIZE = 256
+
+
+class PredictionError(Exception):
+    """Prediction API answered with a non-200 status."""
+
+    def __init__(self, message, status_code=None, text=""):
+        super().__init__(message)
+        self.status_code = status_code
+        self.text = text
+
+
+class PredictionRouteNotFound(PredictionError):
+    """None of the candidate predict routes exist on the API."""
+
+
+def _parse_bitcoin(payload):
+    prediction = payload["prediction"]
+    return {
+        "predicted_high": prediction["Predicted_high"],
+        "prediction_day": prediction["prediction_day_date"],
+    }
+
+
+def _parse_ethereum(payload):
+    return {
+        "predicted_high": payload.get("pred_high_next"),
+        "latest_close": payload.get("latest_close"),
+    }
+
+
+def _parse_ripple(payload):
+    return {
+        "predicted_high": payload.get("predicted_high_usd", None),
+        "as_of": payload.get("as_of", ""),
+        "prediction_day": payload.get("prediction_day", ""),
+    }
+
+
+PARSERS = {"bitcoin": _parse_bitcoin, "ethereum": _parse_ethereum, "ripple": _parse_ripple}
+
+
+def _fresh(error):
+    """A new exception equal to ``error`` (same type, message and attributes).
+
+    Cached and shared failures are re-raised as copies, so threads never raise
+    one instance (and rewrite its traceback) concurrently.
+    """
+    return copy.copy(error)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise _fresh(call.error)
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class PredictionClient:
+    """Single entry point for the BTC, ETH and XRP next-day HIGH prediction APIs.
+
+    Results are cached per (asset, API, prediction day, window), discovered routes
+    are cached per (asset, API), and identical in-flight requests from different
+    sessions share one upstream call.
+    """
+
+    def __init__(self, apis=PREDICTION_APIS):
+        self.apis = apis
+        self._lock = threading.Lock()
+        self._results = OrderedDict()   # key -> (expires_at, result or exception), LRU first
+        self._routes = {}    # (asset, base) -> route template
+        self._flight = SingleFlight()
+
+    def _base(self, asset, base_url):
+        return (base_url or self.apis[asset]["base"]).rstrip("/")
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._results[key]
+                return None
+            self._results.move_to_end(key)
+            return entry
+
+    def _remember(self, key, value, ttl):
+        with self._lock:
+            self._results[key] = (time.time() + ttl, value)
+            self._results.move_to_end(key)
+            while len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+
+    def predict(self, asset, base_url=None, days=None):
+        """Return a normalized prediction dict for ``asset``.
+
+        Keys: asset, predicted_high, latest_close, prediction_day, as_of, raw.
+        Values the API did not return are None (or "" for the dates).
+        Raises PredictionError for non-200 answers and requests exceptions for
+        network failures.
+        """
+        base = self._base(asset, base_url)
+        day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        key = ("predict", asset, base, day, days)
+
+        entry = self._cached(key)
+        record_cache("prediction", "miss" if entry is None else "hit")
+        if entry is None:
+            try:
+                with span(f"prediction.{asset}", days=days):
+                    result = self._flight.do(key, lambda: self._fetch_prediction(asset, base, day, days))
+            except Exception as e:
+                self._remember(key, e, FAILURE_TTL)
+                raise
+            self._remember(key, result, RESULT_TTL)
+            return result
+
+        if isinstance(entry[1], Exception):
+            raise _fresh(entry[1])
+        return entry[1]
+
+    def _fetch_prediction(self, asset, base, day, days):
+        routes = self.apis[asset]["routes"]
+        known = self._routes.get((asset, base))
+        candidates = [known] if known else routes
+
+        for route in candidates:
+            url = base + route.format(date=day, days=days)
+            response = http_get(url, timeout=PREDICTION_TIMEOUT)
+            if response.status_code in (404, 405):
+                self._routes.pop((asset, base), None)
+                if len(candidates) > 1:
+                    continue  # route not served by this API, try the next one
+            else:
+                self._routes[(asset, base)] = route
+            if response.status_code != 200:
+                raise PredictionError(
+                    f"Prediction API returned status {response.status_code}",
+                    status_code=response.status_code,
+                    text=response.text,
+                )
+            payload = response.json()
+            result = {
+                "asset": asset,
+                "predicted_high": None,
+                "latest_close": None,
+                "prediction_day": "",
+                "as_of": "",
+                "raw": payload,
+            }
+            result.update(PARSERS[asset](payload))
+            return result
+
+        tried = ", ".join(r.split("?")[0] for r in routes)
+        raise PredictionRouteNotFound(f"Prediction endpoint not found (tried {tried})", status_code=404)
+
+    def is_healthy(self, asset, base_url=None):
+        """True if the asset's API answers its health route (cached briefly)."""
+        health = self.apis[asset]["health"]
+        if health is None:
+            return True
+        base = self._base(asset, base_url)
+        key = ("health", asset, base)
+
+        entry = self._cached(key)
+        record_cache("prediction_health", "miss" if entry is None else "hit")
+        if entry is not None:
+            return entry[1]
+
+        def check():
+            try:
+                return http_get(base + health, timeout=PREDICTION_TIMEOUT).status_code == 200
+            except Exception:
+                return False
+
+        # A sleeping render.com service shows up as a long span here
+        with span(f"prediction_health.{asset}") as s:
+            healthy = self._flight.do(key, check)
+            s.set(healthy=healthy)
+        # Only trust a healthy answer for the full TTL; retry a sleeping API sooner
+        self._remember(key, healthy, HEALTH_TTL if healthy else FAILURE_TTL)
+        return healthy
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_prediction_client():
+    """Process-wide PredictionClient instance."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = PredictionClient()
+        return _client
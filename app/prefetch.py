@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from app.rate_limit import background_priority
+
+# Background warm-up of the detail pages. Once the landing page has rendered its
+# cards, the data each detail page loads first (default-period history, Kraken
+# OHLC, prediction API health) is fetched on a small shared pool, so clicking
+# "View ..." renders from the caches instead of starting a cold fetch chain.
+# Pages that show get_price_history share one batched history download.
+PREFETCH_WORKERS = 3
+# A page is not warmed again within this many seconds (below the data cache TTLs)
+PREFETCH_INTERVAL = 120
+# Longest a detail page waits for its own in-flight warm-up before fetching itself
+PREFETCH_WAIT_SECONDS = 15
+
+logger = logging.getLogger(__name__)
+
+
+class _PrefetchThreadFilter(logging.Filter):
+    """Drop Streamlit's "missing ScriptRunContext" warning for prefetch workers.
+
+    The workers deliberately run without a session context: a cached function
+    called there must not draw its spinner into whichever run scheduled it.
+    """
+
+    def filter(self, record):
+        return not record.threadName.startswith("prefetch")
+
+
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(_PrefetchThreadFilter())
+
+_executor = None
+_lock = threading.Lock()
+_scheduled = {}  # crypto_id -> (started_at, [futures])
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+        return _executor
+
+
+def _warm_tasks(crypto_id):
+    """Zero-argument callables that load what the detail page for crypto_id needs first.
+
+    Arguments match the page defaults so the page hits the same cache entries.
+    """
+    from app.prediction_client import PREDICTION_APIS, get_prediction_client
+
+    tasks = []
+    if crypto_id == "bitcoin":
+        from students.student_1_Agam import DEFAULT_DAYS, get_btc_data
+        tasks.append(lambda: get_btc_data(DEFAULT_DAYS))
+    elif crypto_id == "ripple":
+        from students.student_3_Vaibhav import DEFAULT_DAYS, fetch_xrp_coingecko
+        tasks.append(lambda: fetch_xrp_coingecko(DEFAULT_DAYS))
+    # Other pages' default-period history comes from _warm_histories
+
+    if PREDICTION_APIS.get(crypto_id, {}).get("health"):
+        tasks.append(lambda: get_prediction_client().is_healthy(crypto_id))
+    return tasks
+
+
+def _run(crypto_id, task):
+    try:
+        # Queued behind requests from pages people are looking at
+        with background_priority():
+            task()
+    except Exception:
+        # The page fetches again (and reports the error) when it is opened
+        logger.warning("Prefetch for %s failed", crypto_id, exc_info=True)
+
+
+def _batched(crypto_ids):
+    """The ids among crypto_ids whose detail page loads get_price_history."""
+    from app.crypto_data import MAIN_CRYPTOS
+
+    return [c for c in crypto_ids if c in MAIN_CRYPTOS and c not in ("bitcoin", "ripple")]
+
+
+def _warm_histories(crypto_ids):
+    from app.crypto_data import DEFAULT_PERIOD, get_price_history_batch
+
+    _run(",".join(crypto_ids), lambda: get_price_history_batch(DEFAULT_PERIOD, crypto_ids))
+    return []  # nothing further to wait for, like _warm's per-task futures
+
+
+def _warm(crypto_id):
+    executor = _get_executor()
+    try:
+        tasks = _warm_tasks(crypto_id)
+    except Exception:
+        logger.warning("Prefetch for %s could not start", crypto_id, exc_info=True)
+        return []
+    return [executor.submit(_run, crypto_id, task) for task in tasks]
+
+
+def prefetch_detail_pages(crypto_ids):
+    """Warm the detail pages for crypto_ids in the background; returns immediately.
+
+    Pages that are already being warmed, or were warmed in the last
+    PREFETCH_INTERVAL seconds, are skipped, so landing page reruns don't queue
+    duplicate work.
+    """
+    now = time.monotonic()
+    executor = _get_executor()
+    with _lock:
+        due = []
+        for crypto_id in crypto_ids:
+            started, _ = _scheduled.get(crypto_id, (None, []))
+            if started is not None and now - started < PREFETCH_INTERVAL:
+                continue
+            # Reserve the slot now; the module imports in _warm_tasks run on the pool
+            _scheduled[crypto_id] = (now, [])
+            due.append(crypto_id)
+
+    batched = _batched(due)
+    history = executor.submit(_warm_histories, batched) if batched else None
+    for crypto_id in due:
+        futures = [executor.submit(_warm, crypto_id)]
+        if crypto_id in batched:
+            futures.append(history)
+        with _lock:
+            _scheduled[crypto_id] = (now, futures)
+
+
+def wait_for_prefetch(crypto_id, timeout=PREFETCH_WAIT_SECONDS):
+    """Block until an in-flight warm-up of crypto_id finishes (or timeout passes).
+
+    Called before rendering a detail page so it reuses the warm-up's results
+    instead of sending the same requests a second time.
+    """
+    with _lock:
+        _, futures = _scheduled.get(crypto_id, (None, []))
+    if not futures:
+        return
+    deadline = time.monotonic() + timeout
+    done, _ = wait(futures, timeout=timeout)
+    # Outer futures resolve to the per-task futures they submitted
+    inner = [f for outer in done if outer.exception() is None for f in outer.result()]
+    if inner:
+        wait(inner, timeout=max(0.0, deadline - time.monotonic()))
@@ -0,0 +1,566 @@
+import os
+import threading
+import time
+
+from app.http_client import http_get
+from app.metrics import record_upstream, registry, span
+from app.rate_limit import RateLimitTimeout, acquire, block
+
+# Market data providers behind one router. Each provider declares which assets
+# and candle columns it serves; the router keeps a latency average and a circuit
+# breaker per provider and sends each request to the fastest healthy provider
+# that can answer it, falling through to the next one on failure. A provider
+# whose breaker is open is skipped without a request, so a down upstream costs
+# one timeout per cooldown instead of one per rerun.
+#
+# pandas (and yfinance) are imported inside the fetchers so the landing page,
+# which only needs quotes, doesn't load them.
+
+# REST base URLs (overridable, e.g. for mocks/http_upstream.py)
+COINGECKO_API = os.environ.get("COINGECKO_API", "https://api.coingecko.com/api/v3")
+KRAKEN_API = os.environ.get("KRAKEN_API", "https://api.kraken.com")
+
+# Shorter than the http_client default: there is another provider to try
+PROVIDER_TIMEOUT = (4, 12)
+
+# Latency (seconds) assumed for a provider with no recent measurement, so an
+# untried or long-unused provider is ranked by its position in PROVIDERS
+ASSUMED_LATENCY = 1.0
+LATENCY_ALPHA = 0.3          # weight of the newest sample in the moving average
+LATENCY_MEMORY_SECONDS = 600  # measurements older than this are forgotten
+
+# Breaker: opens after this many consecutive failures, stays open for the
+# cooldown (doubling on each failed trial, up to the max), then lets one trial through
+BREAKER_FAILURES = 3
+BREAKER_COOLDOWN = 30
+BREAKER_MAX_COOLDOWN = 600
+
+# yfinance doesn't expose Retry-After; back off this long after it reports a rate limit
+YFINANCE_RATE_LIMITED_BACKOFF = 60
+# yfinance interval names, and how far back it serves intraday candles (seconds)
+YFINANCE_INTERVALS = {60: "1m", 300: "5m", 3600: "1h", 86400: "1d"}
+YFINANCE_LOOKBACK = {60: 7 * 86400, 300: 59 * 86400, 3600: 729 * 86400}
+
+# Candle columns in app.history_store.CANDLE_COLUMNS that each provider fills
+OHLCV = ("open", "high", "low", "close", "volume")
+
+
+class ProviderError(Exception):
+    """A provider answered, but not with usable data."""
+
+
+class NoProviderAvailable(ProviderError):
+    """Every provider that serves the request failed or has an open breaker."""
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open trial -> closed or open again."""
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN, max_cooldown=BREAKER_MAX_COOLDOWN):
+        self.failures = failures
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """Whether a request may go out now: "closed", "trial" if it claimed the
+        half-open trial slot, else False."""
+        state = self.state
+        if state == "closed":
+            return "closed"
+        if state == "half_open" and not self.trial_running:
+            self.trial_running = True
+            return "trial"
+        return False
+
+    def success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.cooldown = self.base_cooldown
+
+    def failure(self):
+        """Record a failure; returns True if this failure opened the breaker."""
+        self.consecutive_failures += 1
+        if self.trial_running:
+            # The trial failed: back off for longer
+            self.trial_running = False
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self.opened_at = time.monotonic()
+            return False
+        if self.opened_at is None and self.consecutive_failures >= self.failures:
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+
+class ProviderStats:
+    """Moving-average latency, error rate and breaker of one provider."""
+
+    def __init__(self):
+        self.latency = None
+        self.error_rate = 0.0
+        self.updated_at = 0.0
+        self.breaker = CircuitBreaker()
+
+    def expected_latency(self):
+        if self.latency is None or time.monotonic() - self.updated_at > LATENCY_MEMORY_SECONDS:
+            return ASSUMED_LATENCY
+        return self.latency
+
+    def record(self, seconds, ok):
+        sample = seconds if self.latency is None else LATENCY_ALPHA * seconds + (1 - LATENCY_ALPHA) * self.latency
+        self.latency = sample
+        self.error_rate = LATENCY_ALPHA * (0.0 if ok else 1.0) + (1 - LATENCY_ALPHA) * self.error_rate
+        self.updated_at = time.monotonic()
+
+
+# ---------- Providers ----------
+
+class CoinGeckoProvider:
+    name = "coingecko"
+    columns = ("close", "volume", "market_cap")
+    ids = {"bitcoin": "bitcoin", "ethereum": "ethereum", "ripple": "ripple", "solana": "solana"}
+
+    def asset_id(self, crypto_id, symbol):
+        return crypto_id  # app ids are CoinGecko ids
+
+    def series(self, crypto_id):
+        return f"coingecko:{self.ids[crypto_id]}:1d"
+
+    def quotes(self, crypto_ids):
+        """{crypto_id: {'price', 'change_24h', 'market_cap'}} for the ids this provider knows."""
+        params = {
+            'ids': ','.join(self.ids[c] for c in crypto_ids if c in self.ids),
+            'vs_currencies': 'usd',
+            'include_24hr_change': 'true',
+            'include_market_cap': 'true'
+        }
+        response = http_get(f"{COINGECKO_API}/simple/price", params=params, timeout=PROVIDER_TIMEOUT)
+        if response.status_code != 200:
+            raise ProviderError(f"CoinGecko quote request failed ({response.status_code})")
+        data = response.json()
+        return {
+            crypto_id: {
+                'price': data[self.ids[crypto_id]].get('usd', 0),
+                'change_24h': data[self.ids[crypto_id]].get('usd_24h_change', 0),
+                'market_cap': data[self.ids[crypto_id]].get('usd_market_cap'),
+            }
+            for crypto_id in crypto_ids if self.ids.get(crypto_id) in data
+        }
+
+    def markets(self, page, per_page, order="market_cap_desc", ids=None):
+        """One page of /coins/markets, sorted server-side by ``order``, optionally limited to ``ids``."""
+        params = {
+            'vs_currency': 'usd',
+            'order': order,
+            'per_page': per_page,
+            'page': page,
+        }
+        if ids:
+            params['ids'] = ','.join(ids)
+        response = http_get(f"{COINGECKO_API}/coins/markets", params=params, timeout=PROVIDER_TIMEOUT)
+        if response.status_code != 200:
+            raise ProviderError(f"CoinGecko markets request failed ({response.status_code})")
+        return [
+            {
+                'id': row['id'],
+                'symbol': (row.get('symbol') or '').upper(),
+                'name': row.get('name') or row['id'],
+                'image': row.get('image'),
+                'price': row.get('current_price') or 0,
+                'change_24h': row.get('price_change_percentage_24h') or 0,
+                'market_cap': row.get('market_cap') or 0,
+                'rank': row.get('market_cap_rank'),
+            }
+            for row in response.json()
+        ]
+
+    def daily(self, crypto_id, since):
+        """Daily close/volume/market cap since `since` (UTC seconds), indexed by UTC day."""
+        import pandas as pd
+
+        url = f"{COINGECKO_API}/coins/{self.ids[crypto_id]}/market_chart/range"
+        params = {"vs_currency": "usd", "from": str(int(since)), "to": str(int(time.time()))}
+        r = http_get(url, params=params, timeout=PROVIDER_TIMEOUT)
+        r.raise_for_status()
+        data = r.json()
+
+        with span("transform.coingecko_daily", points=len(data.get("prices", []))):
+            prices = pd.DataFrame(data.get("prices", []), columns=["ts", "price"])
+            caps   = pd.DataFrame(data.get("market_caps", []), columns=["ts", "market_cap"])
+            vols   = pd.DataFrame(data.get("total_volumes", []), columns=["ts", "volume"])
+
+            if prices.empty:
+                return pd.DataFrame(columns=["close", "volume", "market_cap"])
+
+            df = prices.merge(caps, on="ts", how="left").merge(vols, on="ts", how="left")
+            df["timestamp"] = pd.to_datetime(df["ts"], unit="ms", utc=True)
+            df = df.set_index("timestamp").sort_index()
+
+            # last value of each UTC day; the current day is re-fetched until it closes
+            return pd.DataFrame({
+                "close":      df["price"].resample("1D").last(),
+                "volume":     df["volume"].resample("1D").last(),
+                "market_cap": df["market_cap"].resample("1D").last(),
+            }).dropna(subset=["close"])
+
+
+class KrakenProvider:
+    name = "kraken"
+    columns = OHLCV + ("vwap", "count")
+    pairs = {"bitcoin": "XXBTZUSD", "ethereum": "XETHZUSD", "ripple": "XXRPZUSD", "solana": "SOLUSD"}
+    ids = pairs
+
+    def asset_id(self, crypto_id, symbol):
+        return None  # pair names aren't derivable from the symbol (XBT, XXRPZUSD, ...)
+
+    def series(self, crypto_id):
+        return f"kraken:{self.pairs[crypto_id]}:1440"
+
+    def quotes(self, crypto_ids):
+        """Last trade and change since today's UTC open; Kraken has no market cap."""
+        pairs = [self.pairs[c] for c in crypto_ids if c in self.pairs]
+        response = http_get(f"{KRAKEN_API}/0/public/Ticker", params={"pair": ",".join(pairs)}, timeout=PROVIDER_TIMEOUT)
+        data = response.json()
+        if response.status_code != 200 or data.get("error"):
+            raise ProviderError(f"Kraken ticker request failed ({response.status_code}: {data.get('error')})")
+        out = {}
+        for crypto_id in crypto_ids:
+            tick = data["result"].get(self.pairs.get(crypto_id))
+            if tick is None:
+                continue
+            last, open_ = float(tick["c"][0]), float(tick["o"])
+            out[crypto_id] = {
+                'price': last,
+                'change_24h': (last / open_ - 1) * 100 if open_ else 0,
+                'market_cap': None,
+            }
+        return out
+
+    def daily(self, crypto_id, since):
+        """Daily OHLC candles after `since` (UTC seconds), indexed by UTC day."""
+        return self.candles(crypto_id, 86400, since)
+
+    def candles(self, crypto_id, interval, since):
+        """OHLC candles of ``interval`` seconds after `since`; Kraken keeps the last 720."""
+        import pandas as pd
+
+        pair = self.pairs[crypto_id]
+        # Kraken returns candles after `since`; step back one second so the
+        # still-forming candle stored at `since` is refreshed too
+        response = http_get(f"{KRAKEN_API}/0/public/OHLC",
+                            params={"pair": pair, "interval": interval // 60, "since": int(since) - 1},
+                            timeout=PROVIDER_TIMEOUT)
+        data = response.json()
+        if data.get("error"):
+            raise ProviderError(f"Kraken OHLC request failed: {data['error']}")
+        with span("transform.kraken_ohlc"):
+            df = pd.DataFrame(data['result'][pair],
+                              columns=['timestamp', 'open', 'high', 'low', 'close', 'vwap', 'volume', 'count'])
+            df['timestamp'] = pd.to_datetime(df['timestamp'].astype(int), unit='s', utc=True)
+            return df.set_index('timestamp').astype(float)
+
+
+class YFinanceProvider:
+    name = "yfinance"
+    columns = OHLCV
+    ids = {"bitcoin": "BTC-USD", "ethereum": "ETH-USD", "ripple": "XRP-USD", "solana": "SOL-USD"}
+
+    def asset_id(self, crypto_id, symbol):
+        return None  # SYMBOL-USD may be another asset on Yahoo (symbols aren't unique)
+
+    def series(self, crypto_id):
+        return f"yfinance:{self.ids[crypto_id]}:1d"
+
+    def daily(self, crypto_id, since):
+        """Daily yfinance candles starting at `since` (UTC seconds)."""
+        return self.candles(crypto_id, 86400, since)
+
+    def candles(self, crypto_id, interval, since):
+        """yfinance candles of ``interval`` seconds starting at `since` (UTC seconds).
+
+        Intraday intervals only reach YFINANCE_LOOKBACK back; earlier starts are clipped.
+        """
+        from datetime import datetime, timezone
+
+        import yfinance as yf
+
+        since = max(since, time.time() - YFINANCE_LOOKBACK.get(interval, time.time()))
+        start = datetime.fromtimestamp(since, tz=timezone.utc)
+        # yfinance uses its own HTTP session, so it is rate limited and timed here
+        # rather than in http_get
+        acquire("yfinance")
+        with span("http.yfinance", symbol=self.ids[crypto_id]) as s:
+            try:
+                hist = yf.Ticker(self.ids[crypto_id]).history(start=start, interval=YFINANCE_INTERVALS[interval])
+            except Exception as exc:
+                record_upstream("yfinance", type(exc).__name__)
+                if "RateLimit" in type(exc).__name__:  # yfinance.exceptions.YFRateLimitError
+                    block("yfinance", YFINANCE_RATE_LIMITED_BACKOFF)
+                raise
+            record_upstream("yfinance", "ok" if not hist.empty else "empty")
+            s.set(rows=len(hist))
+        # yfinance logs errors and returns an empty frame; two candles back must have data
+        if hist.empty and time.time() - since > 2 * interval:
+            raise ProviderError(f"yfinance returned no candles for {self.ids[crypto_id]}")
+        return hist.rename(columns=str.lower)
+
+    def daily_batch(self, since_by_id):
+        """{crypto_id: daily candles} for several assets from one yf.download call.
+
+        Every asset is downloaded from the earliest ``since``; the extra candles are
+        simply rewritten in the store.
+        """
+        from datetime import datetime, timezone
+
+        import yfinance as yf
+
+        symbols = {self.ids[crypto_id]: crypto_id for crypto_id in since_by_id}
+        since = min(since_by_id.values())
+        acquire("yfinance")
+        with span("http.yfinance", symbols=len(symbols)) as s:
+            try:
+                frame = yf.download(list(symbols), start=datetime.fromtimestamp(since, tz=timezone.utc),
+                                    interval="1d", group_by="ticker", progress=False)
+            except Exception as exc:
+                record_upstream("yfinance", type(exc).__name__)
+                if "RateLimit" in type(exc).__name__:
+                    block("yfinance", YFINANCE_RATE_LIMITED_BACKOFF)
+                raise
+            record_upstream("yfinance", "ok" if frame is not None and not frame.empty else "empty")
+            s.set(rows=0 if frame is None else len(frame))
+
+        out = {}
+        with span("transform.yfinance_split", symbols=len(symbols)):
+            tickers = set(frame.columns.get_level_values(0)) if frame is not None and not frame.empty else set()
+            for symbol, crypto_id in symbols.items():
+                if symbol in tickers:
+                    part = frame[symbol].dropna(how="all")
+                    if not part.empty:
+                        out[crypto_id] = part.rename(columns=str.lower)
+        if not out and time.time() - since > 2 * 86400:
+            raise ProviderError(f"yfinance returned no candles for {', '.join(symbols)}")
+        return out
+
+
+# Tie-break order for providers without recent latency measurements
+PROVIDERS = [CoinGeckoProvider(), KrakenProvider(), YFinanceProvider()]
+
+
+def register_asset(crypto_id, symbol):
+    """Let the providers serve an asset outside MAIN_CRYPTOS (CoinGecko id, ticker symbol)."""
+    for provider in PROVIDERS:
+        provider_id = provider.asset_id(crypto_id, symbol)
+        if provider_id is not None and crypto_id not in provider.ids:
+            # Replaced rather than mutated, so concurrent readers see old or new
+            provider.ids = {**provider.ids, crypto_id: provider_id}
+
+
+class ProviderRouter:
+    """Ranks providers by expected latency and skips those with an open breaker."""
+
+    def __init__(self, providers=PROVIDERS):
+        self.providers = list(providers)
+        self._lock = threading.Lock()
+        self._stats = {p.name: ProviderStats() for p in self.providers}
+
+    def candidates(self, capability, crypto_ids, needs=()):
+        """Providers with ``capability`` ("quotes", "markets", "daily", "daily_batch" or "candles") for all
+        of crypto_ids and the ``needs`` columns, fastest first; providers with an
+        open breaker are left out."""
+        serving = [
+            p for p in self.providers
+            if hasattr(p, capability) and all(c in p.ids for c in crypto_ids) and set(needs) <= set(p.columns)
+        ]
+        with self._lock:
+            ranked = sorted(serving, key=lambda p: (self._stats[p.name].expected_latency(), self.providers.index(p)))
+            return [p for p in ranked if self._stats[p.name].breaker.state != "open"]
+
+    def call(self, provider, fn):
+        """Run ``fn()`` against ``provider``, recording its latency and outcome.
+
+        Raises ProviderError without calling ``fn`` while the breaker is open, or
+        while another request holds the half-open trial.
+        """
+        with self._lock:
+            granted = self._stats[provider.name].breaker.allow()
+        if not granted:
+            raise ProviderError(f"{provider.name} circuit breaker is open")
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except RateLimitTimeout:
+            # Our own queue was full; says nothing about the provider's health.
+            # Give the trial slot back if this call held it, for the next request
+            if granted == "trial":
+                with self._lock:
+                    self._stats[provider.name].breaker.trial_running = False
+            raise
+        except Exception:
+            with self._lock:
+                stats = self._stats[provider.name]
+                stats.record(time.perf_counter() - start, ok=False)
+                opened = stats.breaker.failure()
+            if opened:
+                registry.inc("crypto_provider_breaker_opened_total", "Circuit breaker openings by provider.",
+                             provider=provider.name)
+            raise
+        with self._lock:
+            stats = self._stats[provider.name]
+            stats.record(time.perf_counter() - start, ok=True)
+            stats.breaker.success()
+        return result
+
+    def snapshot(self):
+        """{provider: {'latency', 'error_rate', 'breaker'}} for display and debugging."""
+        with self._lock:
+            return {
+                name: {'latency': s.latency, 'error_rate': s.error_rate, 'breaker': s.breaker.state}
+                for name, s in self._stats.items()
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Process-wide ProviderRouter instance."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ProviderRouter()
+        return _router
+
+
+def _failover(capability, crypto_ids, needs, attempt):
+    """Call ``attempt(provider)`` on each candidate in turn until one succeeds."""
+    candidates = get_router().candidates(capability, crypto_ids, needs)
+    errors = []
+    for provider in candidates:
+        try:
+            return attempt(provider)
+        except Exception as exc:
+            errors.append(f"{provider.name}: {exc}")
+            registry.inc("crypto_provider_failures_total", "Requests a provider could not serve.",
+                         capability=capability, provider=provider.name)
+    raise NoProviderAvailable(
+        f"No provider could serve {capability}" + (f" for {', '.join(crypto_ids)}" if crypto_ids else "")
+        + (f" ({'; '.join(errors)})" if errors else "")
+    )
+
+
+def fetch_quotes(crypto_ids):
+    """Quotes from the fastest healthy quote provider: {crypto_id: {'price', 'change_24h', 'market_cap'}}.
+
+    ``market_cap`` is None when the provider doesn't report it.
+    """
+    router = get_router()
+    crypto_ids = list(crypto_ids)
+
+    def attempt(provider):
+        quotes = router.call(provider, lambda: provider.quotes(crypto_ids))
+        if not quotes:
+            raise ProviderError(f"{provider.name} returned no quotes")
+        return quotes
+
+    return _failover("quotes", crypto_ids, (), attempt)
+
+
+def fetch_markets(page, per_page, order="market_cap_desc", ids=None):
+    """One page of the whole coin universe; only CoinGecko lists it, so there is no fallback."""
+    router = get_router()
+
+    def attempt(provider):
+        with span(f"provider.{provider.name}", page=page):
+            return router.call(provider, lambda: provider.markets(page, per_page, order, ids))
+
+    return _failover("markets", [], (), attempt)
+
+
+def load_daily_history(crypto_id, start_ts, needs=("close",)):
+    """Daily candles for crypto_id since start_ts from the fastest healthy provider.
+
+    Each provider keeps its own series in the local history store, so only candles
+    newer than the stored ones are fetched. A provider that fails with nothing
+    stored hands over to the next one; if it has stored candles, those are served
+    (and the failure counts toward its breaker, so later requests go elsewhere).
+    """
+    from app.history_store import sync_history
+
+    router = get_router()
+
+    def attempt(provider):
+        with span(f"provider.{provider.name}", asset=crypto_id):
+            frame = sync_history(provider.series(crypto_id), start_ts,
+                                 lambda since: router.call(provider, lambda: provider.daily(crypto_id, since)))
+        if frame.empty:
+            raise ProviderError(f"{provider.name} has no candles for {crypto_id}")
+        return frame
+
+    return _failover("daily", [crypto_id], needs, attempt)
+
+
+def load_candles(crypto_id, interval, since):
+    """OHLCV candles of ``interval`` seconds after ``since`` from the fastest healthy provider.
+
+    Not stored: the caller (app.ohlc_pyramid) passes this to sync_history itself.
+    """
+    router = get_router()
+
+    def attempt(provider):
+        with span(f"provider.{provider.name}", asset=crypto_id, interval=interval):
+            return router.call(provider, lambda: provider.candles(crypto_id, interval, since))
+
+    return _failover("candles", [crypto_id], OHLCV, attempt)
+
+
+def load_daily_history_batch(crypto_ids, start_ts, needs=("close",)):
+    """{crypto_id: daily candles since start_ts} for several assets at once.
+
+    Uses one request to the fastest healthy provider with a multi-asset endpoint
+    (yfinance's download) for the assets such a provider knows; the others, and
+    any it can't serve, are loaded one by one through load_daily_history,
+    concurrently. Assets no provider could serve are left out.
+    """
+    from app.async_fetch import fetch_concurrently
+    from app.history_store import sync_history_batch
+
+    router = get_router()
+    crypto_ids = list(crypto_ids)
+    batched = [crypto_id for crypto_id in crypto_ids
+               if any(hasattr(p, "daily_batch") and crypto_id in p.ids for p in router.providers)]
+
+    def attempt(provider):
+        with span(f"provider.{provider.name}", assets=len(batched)):
+            frames = sync_history_batch(
+                {crypto_id: provider.series(crypto_id) for crypto_id in batched}, start_ts,
+                lambda since_by_id: router.call(provider, lambda: provider.daily_batch(since_by_id)),
+            )
+        return {crypto_id: frame for crypto_id, frame in frames.items() if not frame.empty}
+
+    try:
+        frames = _failover("daily_batch", batched, needs, attempt) if batched else {}
+    except NoProviderAvailable:
+        frames = {}
+
+    missing = [crypto_id for crypto_id in crypto_ids if crypto_id not in frames]
+    if missing:
+        results = fetch_concurrently(**{
+            crypto_id: (lambda crypto_id=crypto_id: load_daily_history(crypto_id, start_ts, needs))
+            for crypto_id in missing
+        })
+        frames.update({crypto_id: frame for crypto_id, frame in results.items() if not isinstance(frame, Exception)})
+    return frames
@@ -0,0 +1,174 @@
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from app.metrics import registry
+
+# Process-wide token buckets, one per upstream (labels from app.metrics.upstream_name).
+# Every outbound call takes a token before it is sent; when a bucket is empty,
+# callers queue and are served interactive-first, so page requests overtake
+# background prefetch and refresh work. A 429 empties the bucket and blocks it
+# for the Retry-After period, so the whole process backs off, not just the
+# request that was rejected.
+#
+# upstream -> (sustained requests per second, burst). Upstreams not listed are
+# not limited. CRYPTO_RATE_LIMITS overrides entries, e.g. "coingecko=0.5:10,kraken=1:15".
+RATE_LIMITS = {
+    "coingecko": (10 / 60, 5),   # public API: ~10-30 calls/min depending on load
+    "kraken": (1.0, 15),         # public endpoints: counter of 15, decays 1/s
+    "yfinance": (0.5, 5),        # unofficial; Yahoo throttles bursts
+}
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Longest a request waits in the queue before giving up. Interactive requests
+# give up early so the provider router can try another source
+MAX_WAIT = {INTERACTIVE: 10, BACKGROUND: 120}
+# Retry-After values above this are capped (and longer outages left to the breakers)
+MAX_RETRY_AFTER = 300
+
+
+class RateLimitTimeout(requests.RequestException):
+    """No token within MAX_WAIT; handled like any other request failure.
+
+    Not counted against a provider's circuit breaker: the limit is our own.
+    """
+
+
+def _parse_limits(raw):
+    limits = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        name, _, spec = item.partition("=")
+        rate, _, burst = spec.partition(":")
+        limits[name.strip()] = (float(rate), int(burst or 1))
+    return limits
+
+
+RATE_LIMITS.update(_parse_limits(os.environ.get("CRYPTO_RATE_LIMITS", "")))
+
+_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+
+@contextlib.contextmanager
+def background_priority():
+    """Queue requests made inside the block behind interactive ones."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket with a priority queue of waiters and a Retry-After block."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=INTERACTIVE, timeout=None):
+        """Take one token, waiting behind higher-priority and earlier callers.
+
+        Returns the seconds waited; raises RateLimitTimeout after ``timeout``.
+        """
+        start = time.monotonic()
+        deadline = start + (timeout if timeout is not None else MAX_WAIT[priority])
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    first = self._waiters[0] == ticket
+                    if first and now >= self.blocked_until and self.tokens >= 1:
+                        self.tokens -= 1
+                        return now - start
+                    if now >= deadline or self.blocked_until > deadline:
+                        raise RateLimitTimeout(f"No request slot within {deadline - start:.0f}s")
+                    if first:
+                        # Sleep until the block lifts or the next token is due
+                        ready_at = max(self.blocked_until, now + (1 - self.tokens) / self.rate)
+                        self._cond.wait(min(ready_at, deadline) - now)
+                    else:
+                        self._cond.wait(deadline - now)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def block(self, seconds):
+        """Stop handing out tokens for ``seconds`` (a 429's Retry-After)."""
+        with self._cond:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self._cond.notify_all()
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _bucket(upstream):
+    with _buckets_lock:
+        if upstream not in _buckets and upstream in RATE_LIMITS:
+            _buckets[upstream] = TokenBucket(*RATE_LIMITS[upstream])
+        return _buckets.get(upstream)
+
+
+def acquire(upstream):
+    """Wait for a request slot to ``upstream`` at the caller's priority (no-op if unlimited)."""
+    bucket = _bucket(upstream)
+    if bucket is None:
+        return 0.0
+    priority = _priority.get()
+    waited = bucket.acquire(priority)
+    registry.observe("crypto_rate_limit_wait_seconds", "Time requests spent queued for a rate-limit token.",
+                     waited, upstream=upstream, priority="interactive" if priority == INTERACTIVE else "background")
+    return waited
+
+
+def block(upstream, seconds):
+    """Make every caller of ``upstream`` wait ``seconds`` before its next request.
+
+    Returns False if the upstream has no bucket (the caller has to wait itself).
+    """
+    bucket = _bucket(upstream)
+    if bucket is None:
+        return False
+    bucket.block(min(seconds, MAX_RETRY_AFTER))
+    registry.inc("crypto_rate_limited_total", "Responses that blocked an upstream's bucket.", upstream=upstream)
+    return True
+
+
+def retry_after_seconds(response):
+    """Seconds from a Retry-After header (delta or HTTP date), or None if absent/invalid."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
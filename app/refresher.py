@@ -0,0 +1,84 @@
+import logging
+import threading
+import time
+
+from app.metrics import span
+from app.rate_limit import background_priority
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRefresher:
+    """Stale-while-revalidate holder for one upstream value.
+
+    A daemon thread calls ``fetch()`` every ``refresh_after`` seconds (every
+    ``retry_after`` seconds after a failure) for as long as the value keeps being
+    read; it stops after ``idle_after`` seconds without readers and restarts on the
+    next read. Readers get the last good value immediately and never wait on the
+    upstream call, except for the very first load of the process. A failed refresh
+    keeps the previous value.
+
+    With ``timestamped=True``, ``fetch()`` returns ``(value, fetched_at)``: for
+    fetches served from a cache, where the value can be older than the call.
+    """
+
+    def __init__(self, fetch, refresh_after, retry_after=30, idle_after=900, name="refresher", timestamped=False):
+        self.fetch = fetch
+        self.timestamped = timestamped
+        self.refresh_after = refresh_after
+        self.retry_after = retry_after
+        self.idle_after = idle_after
+        self.name = name
+        self._lock = threading.Lock()
+        self._first_attempt = threading.Event()
+        self._thread = None
+        self._value = None
+        self._fetched_at = None
+        self._error = None
+        self._last_read = 0.0
+
+    def _refresh_once(self):
+        try:
+            with span(f"refresh.{self.name}"), background_priority():
+                value = self.fetch()
+            fetched_at = time.time()
+            if self.timestamped:
+                value, fetched_at = value
+        except Exception as exc:
+            logger.warning("%s: refresh failed, keeping last good value", self.name, exc_info=True)
+            with self._lock:
+                self._error = exc
+            self._first_attempt.set()
+            return False
+        with self._lock:
+            self._value = value
+            self._fetched_at = fetched_at
+            self._error = None
+        # Only after the value is stored, so a waiting first reader sees it
+        self._first_attempt.set()
+        return True
+
+    def _loop(self):
+        while True:
+            ok = self._refresh_once()
+            time.sleep(self.refresh_after if ok else self.retry_after)
+            with self._lock:
+                if time.monotonic() - self._last_read > self.idle_after:
+                    self._thread = None
+                    return
+
+    def get(self, first_load_timeout=10):
+        """Return ``(value, fetched_at, error)``; value is None until a fetch succeeds.
+
+        ``fetched_at`` is the epoch time of the value; ``error`` is the exception of
+        the latest refresh attempt if it failed.
+        """
+        with self._lock:
+            self._last_read = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+        if not self._first_attempt.is_set():
+            self._first_attempt.wait(first_load_timeout)
+        with self._lock:
+            return self._value, self._fetched_at, self._error
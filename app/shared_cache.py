@@ -0,0 +1,352 @@
+import contextlib
+import copy
+import functools
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.metrics import record_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only cover threads of this process
+    fcntl = None
+
+# Cache shared by every Streamlit process on a host (or on a shared volume).
+# st.cache_data is per process, so N replicas make N upstream calls per key;
+# with @shared_cache the first replica to miss fetches while the others wait on
+# a file lock and then read its result. DataFrames are stored one .npy file per
+# column and opened memory-mapped, so replicas share the pages in the OS page
+# cache instead of each holding a private copy.
+#
+# Cached DataFrames are immutable: their column arrays are read-only (datetimes
+# as int64 epoch values on disk) and each caller gets a shallow copy-on-write
+# view, so a cache hit costs no copy however many sessions read the entry.
+# Copy-on-write is always on in pandas >= 3; on pandas 2 it is switched on the
+# first time a frame is cached, since a shallow copy there writes through to the
+# shared arrays otherwise.
+#
+# Backend: CRYPTO_SHARED_CACHE=disk (default, directory CRYPTO_SHARED_CACHE_DIR,
+# default data/cache in the repository, wherever streamlit was started from) or
+# CRYPTO_SHARED_CACHE=memory (in-process stand-in for tests and single-process
+# runs). A network store can be plugged in with set_backend() by implementing
+# get/set/lock like the classes below.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+DEFAULT_CACHE_DIR = os.path.join(parent_dir, "data", "cache")
+# Entries each decorated function keeps in process (LRU) in front of the backend
+LOCAL_CACHE_SIZE = 256
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """In-process stand-in with the same interface as DiskBackend."""
+
+    def __init__(self):
+        self._items = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, key):
+        """Return ``(expires_at, value)`` or None if the key is missing or expired."""
+        entry = self._items.get(key)
+        if entry is None or entry[0] < time.time():
+            return None
+        return entry
+
+    def set(self, key, value, ttl):
+        self._items[key] = (time.time() + ttl, freeze(value))
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            yield
+
+
+def _frame_storable(frame):
+    """True if every column and the index can be written as a plain .npy array."""
+    import pandas as pd
+
+    if not isinstance(frame, pd.DataFrame) or not frame.columns.is_unique:
+        return False
+    index_ok = isinstance(frame.index, (pd.DatetimeIndex, pd.RangeIndex)) or frame.index.dtype.kind in "iuf"
+    return index_ok and all(dtype.kind in "biufM" for dtype in frame.dtypes)
+
+
+@functools.lru_cache(maxsize=1)
+def _enable_copy_on_write():
+    import pandas as pd
+
+    # pandas 3 deprecates the option (and warns on setting it); it is always on there
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+
+def freeze(value):
+    """``value`` with every NumPy-backed DataFrame column marked read-only.
+
+    No data is copied. Writing into the result raises; views of it (see
+    _private_view) copy on write instead. Other values are returned unchanged.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not isinstance(value, pd.DataFrame) or not value.columns.is_unique:
+        return value
+    _enable_copy_on_write()
+    columns = {}
+    for name in value.columns:
+        series = value[name]
+        if isinstance(series.dtype, np.dtype):
+            array = series.to_numpy(copy=False).view()
+            array.flags.writeable = False
+            columns[name] = array
+        else:
+            columns[name] = series  # extension arrays (tz-aware, nullable) have no read-only flag
+    return pd.DataFrame(columns, index=value.index, copy=False)
+
+
+class DiskBackend:
+    """Entries in a directory shared by processes, written atomically.
+
+    Each key has a small JSON pointer file naming its payload (a pickle, or a
+    directory of .npy columns for numeric DataFrames) and its expiry. Payloads are
+    written under a fresh name and the pointer is swapped with os.replace, so
+    readers never see a partial entry.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._thread_locks = {}
+        self._guard = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _read_pointer(self, key):
+        try:
+            with open(self._path(f"{key}.json")) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, key):
+        """Return ``(expires_at, value)`` or None if the key is missing or expired."""
+        pointer = self._read_pointer(key)
+        if pointer is None or pointer["expires_at"] < time.time():
+            return None
+        try:
+            if pointer["kind"] == "frame":
+                value = self._load_frame(self._path(pointer["payload"]), pointer)
+            else:
+                with open(self._path(pointer["payload"]), "rb") as fh:
+                    value = pickle.load(fh)
+            return pointer["expires_at"], value
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+            # Replaced and cleaned up by another process between the two reads
+            return None
+
+    def set(self, key, value, ttl):
+        payload = f"{key}-{uuid.uuid4().hex[:12]}"
+        pointer = {"expires_at": time.time() + ttl, "payload": payload}
+        if _frame_storable(value):
+            pointer.update(kind="frame", **self._save_frame(self._path(payload), value))
+        else:
+            pointer["kind"] = "pickle"
+            with open(self._path(payload), "wb") as fh:
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+        old = self._read_pointer(key)
+        tmp = self._path(f"{key}.json.{payload}.tmp")
+        with open(tmp, "w") as fh:
+            json.dump(pointer, fh)
+        os.replace(tmp, self._path(f"{key}.json"))
+        if old is not None:
+            # Readers that already mapped the old files keep them until they close
+            old_path = self._path(old["payload"])
+            if os.path.isdir(old_path):
+                shutil.rmtree(old_path, ignore_errors=True)
+            else:
+                with contextlib.suppress(OSError):
+                    os.remove(old_path)
+
+    @staticmethod
+    def _save_frame(path, frame):
+        import numpy as np
+        import pandas as pd
+
+        os.makedirs(path)
+        index = frame.index
+        if isinstance(index, pd.DatetimeIndex):
+            index_meta = {"type": "datetime", "tz": str(index.tz) if index.tz else None,
+                          "unit": index.unit if hasattr(index, "unit") else "ns"}
+            np.save(os.path.join(path, "index.npy"), index.asi8)
+        else:
+            index_meta = {"type": "values"}
+            np.save(os.path.join(path, "index.npy"), np.asarray(index))
+        index_meta["name"] = index.name
+        datetimes = {}
+        for i, column in enumerate(frame.columns):
+            values = frame[column]
+            if values.dtype.kind == "M":
+                # int64 epoch values in the column's own unit, like the index
+                stamps = pd.DatetimeIndex(values)
+                datetimes[str(i)] = {"tz": str(stamps.tz) if stamps.tz else None, "unit": stamps.unit}
+                np.save(os.path.join(path, f"c{i}.npy"), stamps.asi8)
+            else:
+                np.save(os.path.join(path, f"c{i}.npy"), values.to_numpy())
+        return {"columns": [str(c) for c in frame.columns], "index": index_meta, "datetimes": datetimes}
+
+    @staticmethod
+    def _load_frame(path, pointer):
+        import numpy as np
+        import pandas as pd
+
+        meta = pointer["index"]
+        raw_index = np.load(os.path.join(path, "index.npy"), mmap_mode="r")
+        if meta["type"] == "datetime":
+            index = pd.DatetimeIndex(np.asarray(raw_index).view(f"M8[{meta['unit']}]"), name=meta["name"])
+            if meta["tz"]:
+                index = index.tz_localize("UTC").tz_convert(meta["tz"])
+        else:
+            index = pd.Index(np.asarray(raw_index), name=meta["name"])
+        columns = {}
+        for i, name in enumerate(pointer["columns"]):
+            values = np.load(os.path.join(path, f"c{i}.npy"), mmap_mode="r")
+            stamps = pointer.get("datetimes", {}).get(str(i))
+            if stamps is not None:
+                values = pd.DatetimeIndex(values.view(f"M8[{stamps['unit']}]"))
+                if stamps["tz"]:
+                    values = values.tz_localize("UTC").tz_convert(stamps["tz"])
+            columns[name] = values
+        # copy=False keeps each column backed by its read-only memory map
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        with self._guard:
+            thread_lock = self._thread_locks.setdefault(key, threading.Lock())
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._path(f"{key}.lock"), "a") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Process-wide backend chosen by CRYPTO_SHARED_CACHE."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if os.environ.get("CRYPTO_SHARED_CACHE", "disk") == "memory":
+                _backend = MemoryBackend()
+            else:
+                _backend = DiskBackend(os.environ.get("CRYPTO_SHARED_CACHE_DIR", DEFAULT_CACHE_DIR))
+        return _backend
+
+
+def set_backend(backend):
+    """Replace the backend (e.g. with MemoryBackend() in tests)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _cache_key(fn, args, kwargs):
+    raw = repr((fn.__module__, fn.__qualname__, args, sorted(kwargs.items())))
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _private_view(value):
+    """Give each caller its own object so cached values can't be mutated in place."""
+    import pandas as pd
+
+    if isinstance(value, pd.DataFrame):
+        _enable_copy_on_write()  # also for frames read back from another process's entry
+        # Shallow: columns stay shared (read-only or memory-mapped) and pandas
+        # copies a column on first write; new columns stay private
+        return value.copy(deep=False)
+    return copy.deepcopy(value)
+
+
+def shared_cache(ttl):
+    """Cache a function's result for ``ttl`` seconds across all processes.
+
+    Arguments must have stable reprs (they form the key). Misses for the same key
+    are single-flight across processes: one caller runs the function while the
+    rest wait for its result. Exceptions are not cached.
+    """
+    def decorator(fn):
+        # key -> (expires_at, value), least recently used first; saves re-reading
+        # the backend on reruns
+        local = OrderedDict()
+        local_lock = threading.Lock()
+
+        def remember(key, entry):
+            with local_lock:
+                local[key] = entry
+                local.move_to_end(key)
+                while len(local) > LOCAL_CACHE_SIZE:
+                    local.popitem(last=False)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = _cache_key(fn, args, kwargs)
+            with local_lock:
+                entry = local.get(key)
+                if entry is not None:
+                    local.move_to_end(key)
+            result = "local_hit"
+            if entry is None or entry[0] < time.time():
+                backend = get_backend()
+                entry = backend.get(key)
+                result = "shared_hit"
+                if entry is None:
+                    with backend.lock(key):
+                        entry = backend.get(key)  # filled while we waited for the lock
+                        if entry is None:
+                            result = "miss"
+                            entry = (time.time() + ttl, freeze(fn(*args, **kwargs)))
+                            try:
+                                backend.set(key, entry[1], ttl)
+                            except (OSError, pickle.PicklingError, TypeError):
+                                logger.warning("Could not store %s in the shared cache", fn.__qualname__,
+                                               exc_info=True)
+                remember(key, entry)
+            record_cache(fn.__qualname__, result)
+            return _private_view(entry[1])
+
+        def prime(value, *args, **kwargs):
+            """Store ``value`` as the result for these arguments (e.g. from a batch load)."""
+            key = _cache_key(fn, args, kwargs)
+            value = freeze(value)
+            try:
+                get_backend().set(key, value, ttl)
+            except (OSError, pickle.PicklingError, TypeError):
+                logger.warning("Could not store %s in the shared cache", fn.__qualname__, exc_info=True)
+            remember(key, (time.time() + ttl, value))
+
+        wrapper.clear_local = local.clear
+        wrapper.prime = prime
+        return wrapper
+    return decorator
@@ -1,23 +1,26 @@
 # st_theme.py
-import streamlit as st
 import base64
+import hashlib
+import os
+import re
+import tomllib
+from functools import lru_cache
 
-LOGO_PATH = "./assets/logo.png"  # adjust if different
+import streamlit as st
 
-def set_page_theme(title="Segmenta Pro", icon="🧩", spin_logo=False):
-    """Apply custom theme, branding, and CSS for the Segmenta app."""
-    st.set_page_config(page_title=title, page_icon=icon, layout="wide")
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
 
-    # --- Load logo ---
-    try:
-        logo_b64 = base64.b64encode(open(LOGO_PATH, "rb").read()).decode()
-    except Exception:
-        logo_b64 = ""
+LOGO_PATH = "./assets/logo.png"  # adjust if different
+THEMES_DIR = os.path.join(parent_dir, "themes")
+# Served by Streamlit at app/static/ when server.enableStaticServing is on
+STATIC_DIR = os.path.join(current_dir, "static")
+STATIC_URL = "app/static"
+
+FONTS_IMPORT = "@import url('https://fonts.googleapis.com/css2?family=Material+Symbols+Rounded:opsz,wght,FILL,GRAD@20..48,100..700,0..1,-50..200');"
 
-    st.markdown("""
-    <link rel="stylesheet"
-          href="https://fonts.googleapis.com/css2?family=Material+Symbols+Rounded:opsz,wght,FILL,GRAD@20..48,100..700,0..1,-50..200" />
-    <style>
+# --- Segmenta styles (set_page_theme) ---
+MATERIAL_SYMBOL_CSS = """
     .material-symbol {
       font-family: 'Material Symbols Rounded';
       font-weight: 400;
@@ -28,42 +31,35 @@ def set_page_theme(title="Segmenta Pro", icon="🧩", spin_logo=False):
       vertical-align: middle;
       color: #FF9E6B; /* Orange accent or your custom color */
     }
-    </style>
-    """, unsafe_allow_html=True)
+    
+"""
 
-    # --- Branding block ---
-    st.markdown(f"""
-    <style>
-    .brand {{
+BRAND_CSS = """
+    .brand {
       display:flex;align-items:center;gap:8px;line-height:1;
-    }}
-    .brand img.logo {{
+    }
+    .brand img.logo {
       height:116px;width:auto;display:block;margin:0;
       transform-origin:50% 50%;
       filter: drop-shadow(0 6px 12px rgba(0,0,0,0.25));
-    }}          
-    .brand img.logo.spin {{
+    }          
+    .brand img.logo.spin {
       animation:spin 1s linear infinite;
-    }}
-    @keyframes spin {{from{{transform:rotate(0)}}to{{transform:rotate(360deg)}}}}
-    .brand h1{{
+    }
+    @keyframes spin {from{transform:rotate(0)}to{transform:rotate(360deg)}}
+    .brand h1{
       margin:0;
       font-family:'Calibre Light','Calibre',ui-sans-serif,system-ui,-apple-system,'Segoe UI',Roboto,Helvetica,Arial,sans-serif;
       font-weight:300;
       font-size:clamp(28px,5vw,56px);
       color:#0F172A;
       text-shadow:0 1px 0 rgba(255,255,255,.6),0 8px 24px rgba(15,23,42,.15);
-    }}
-    </style>
-    <div class="brand">
-      <img class="logo {'spin' if spin_logo else ''}" src="data:image/png;base64,{logo_b64}" />
-      <h1>{title}</h1>
-    </div>
-    """, unsafe_allow_html=True)
+    }
+    
+"""
 
-    # --- Global card-like shadow for blocks (tables, charts, figures) ---
-    st.markdown("""
-    <style>
+# --- Global card-like shadow for blocks (tables, charts, figures) ---
+CARD_CSS = """
     /* Tables */
     .stDataFrame, .stTable {
         box-shadow: 0 6px 18px rgba(0,0,0,0.12);
@@ -101,12 +97,11 @@ def set_page_theme(title="Segmenta Pro", icon="🧩", spin_logo=False):
       margin: 12px 0;
       box-shadow: 0 10px 28px rgba(8, 47, 73, 0.16);
     }
-    </style>
-    """, unsafe_allow_html=True)
+    
+"""
 
-    # --- Gradient button (as before) ---
-    st.markdown("""
-    <style>
+# --- Gradient button (as before) ---
+BUTTON_CSS = """
     .stButton > button {
         background: linear-gradient(90deg, #6366F1, #3B82F6);
         color: white;
@@ -124,12 +119,11 @@ def set_page_theme(title="Segmenta Pro", icon="🧩", spin_logo=False):
         box-shadow: 0 6px 16px rgba(0,0,0,0.25);
         transform: translateY(-2px);
     }
-    </style>
-    """, unsafe_allow_html=True)
+    
+"""
 
-    # --- Background & sidebar (frosted glass aesthetic) ---
-    st.markdown("""
-    <style>
+# --- Background & sidebar (frosted glass aesthetic) ---
+GLASS_CSS = """
 /* 🌅 Frosty orange–blue gradient background */
 .stApp {
   background:
@@ -175,19 +169,11 @@ def set_page_theme(title="Segmenta Pro", icon="🧩", spin_logo=False):
       border-radius: 10px;
       padding: 6px;
     }
-    </style>
-    """, unsafe_allow_html=True)
-
-
-def show_callout(message: str):
-    """Render a message inside a styled callout box."""
-    st.markdown(f"<div class='callout'>{message}</div>", unsafe_allow_html=True)
-
+    
+"""
 
-def apply_crypto_theme():
-    """Apply the crypto dashboard theme with glass effects"""
-    st.markdown("""
-    <style>
+# --- Crypto dashboard styles (apply_crypto_theme) ---
+CRYPTO_CSS = """
     /* Beautiful background */
     .stApp {
       background:
@@ -277,6 +263,136 @@ def apply_crypto_theme():
       box-shadow: 0 10px 28px rgba(8, 47, 73, 0.16);
       backdrop-filter: blur(10px);
     }
-    </style>
+    
+"""
+
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from a stylesheet."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def load_themes():
+    """Read the [theme] tables of every TOML file in themes/, keyed by theme name."""
+    themes = {}
+    for filename in sorted(os.listdir(THEMES_DIR)):
+        if filename.endswith("_theme.toml"):
+            with open(os.path.join(THEMES_DIR, filename), "rb") as f:
+                themes[filename[: -len("_theme.toml")]] = tomllib.load(f).get("theme", {})
+    return themes
+
+
+def _theme_variables(theme):
+    names = {
+        "primaryColor": "--primary-color",
+        "backgroundColor": "--background-color",
+        "secondaryBackgroundColor": "--secondary-background-color",
+        "textColor": "--text-color",
+    }
+    return "".join(f"{var}:{theme[key]};" for key, var in names.items() if key in theme)
+
+
+@lru_cache(maxsize=None)
+def compile_theme_bundle(name, active_theme="crypto"):
+    """Compile one minified, content-hashed stylesheet for a page style.
+
+    The bundle holds CSS variables for every theme in themes/ (``:root`` for the
+    active one, ``.theme-<name>`` for the others) followed by the inline styles.
+    Returns ``(css, filename)``; compiled once per process.
+    """
+    themes = load_themes()
+    parts = [FONTS_IMPORT] if name == "segmenta" else []
+    if active_theme in themes:
+        parts.append(f":root{{{_theme_variables(themes[active_theme])}}}")
+    parts.extend(f".theme-{theme}{{{_theme_variables(values)}}}" for theme, values in themes.items())
+    if name == "segmenta":
+        parts.extend([MATERIAL_SYMBOL_CSS, BRAND_CSS, CARD_CSS, BUTTON_CSS, GLASS_CSS])
+    else:
+        parts.append(CRYPTO_CSS)
+
+    css = minify_css("\n".join(parts))
+    digest = hashlib.sha256(css.encode()).hexdigest()[:12]
+    return css, f"{name}-{digest}.css"
+
+
+@lru_cache(maxsize=None)
+def _publish(filename, css):
+    """Write the bundle under app/static once; False if the folder isn't writable."""
+    path = os.path.join(STATIC_DIR, filename)
+    try:
+        if not os.path.exists(path):
+            os.makedirs(STATIC_DIR, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(css)
+            os.replace(tmp_path, path)
+        return True
+    except OSError:
+        return False
+
+
+@lru_cache(maxsize=1)
+def _serves_css():
+    """Whether this Streamlit serves app/static/*.css as text/css.
+
+    The Tornado server of older releases sends files outside a short extension
+    whitelist as text/plain with nosniff, which browsers refuse as a stylesheet;
+    the Starlette server sends the type guessed from the extension.
+    """
+    try:
+        from streamlit.web.server.app_static_file_handler import SAFE_APP_STATIC_FILE_EXTENSIONS
+    except ImportError:
+        return True
+    return ".css" in SAFE_APP_STATIC_FILE_EXTENSIONS
+
+
+def inject_theme_bundle(name, active_theme="crypto"):
+    """Reference the compiled stylesheet from the page.
+
+    Streamlit drops elements that a rerun doesn't re-emit, so something has to be
+    sent on every rerun. With static serving enabled (and a server that sends .css
+    as text/css) that is a ~100 byte <link> to the content-hashed file, which the
+    browser caches; otherwise the minified bundle is inlined.
+    """
+    css, filename = compile_theme_bundle(name, active_theme)
+    if st.get_option("server.enableStaticServing") and _serves_css() and _publish(filename, css):
+        st.markdown(f'<link rel="stylesheet" href="{STATIC_URL}/{filename}">', unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
+
+
+@lru_cache(maxsize=1)
+def _logo_b64():
+    try:
+        return base64.b64encode(open(LOGO_PATH, "rb").read()).decode()
+    except Exception:
+        return ""
+
+
+def set_page_theme(title="Segmenta Pro", icon="🧩", spin_logo=False):
+    """Apply custom theme, branding, and CSS for the Segmenta app."""
+    st.set_page_config(page_title=title, page_icon=icon, layout="wide")
+
+    inject_theme_bundle("segmenta")
+
+    # --- Branding block ---
+    st.markdown(f"""
+    <div class="brand">
+      <img class="logo {'spin' if spin_logo else ''}" src="data:image/png;base64,{_logo_b64()}" />
+      <h1>{title}</h1>
+    </div>
     """, unsafe_allow_html=True)
 
+
+def show_callout(message: str):
+    """Render a message inside a styled callout box."""
+    st.markdown(f"<div class='callout'>{message}</div>", unsafe_allow_html=True)
+
+
+def apply_crypto_theme():
+    """Apply the crypto dashboard theme with glass effects"""
+    inject_theme_bundle("crypto")
@@ -0,0 +1,88 @@
+"""Cold-start import benchmark for the dashboard.
+
+Each measurement runs in a fresh interpreter so nothing is cached in sys.modules:
+
+    python benchmarks/import_time.py                  # report
+    python benchmarks/import_time.py --max-landing-ms 1500 --repeat 5   # fail if slower
+
+Reports the time to import what the landing page needs (app.main's imports), the
+extra time to open each detail page for the first time, and which heavy libraries
+each step loads.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "yfinance", "plotly.graph_objects", "altair"]
+
+# Measured inside the child interpreter; prints one JSON line
+_PROBE = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+import logging
+logging.disable(logging.WARNING)
+t0 = time.perf_counter()
+import streamlit
+t1 = time.perf_counter()
+import app.st_theme, app.pages, app.page_registry
+t2 = time.perf_counter()
+before = set(sys.modules)
+page = {page!r}
+if page:
+    from app.page_registry import get_detail_page
+    get_detail_page(page)
+t3 = time.perf_counter()
+heavy = {heavy!r}
+print(json.dumps({{
+    "streamlit_ms": (t1 - t0) * 1000,
+    "landing_ms": (t2 - t1) * 1000,
+    "page_ms": (t3 - t2) * 1000,
+    "landing_heavy": [m for m in heavy if m in before],
+    "page_heavy": [m for m in heavy if m in sys.modules and m not in before],
+}}))
+"""
+
+
+def measure(page, repeat):
+    runs = []
+    for _ in range(repeat):
+        code = _PROBE.format(root=ROOT, page=page, heavy=HEAVY_MODULES)
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "streamlit_ms": statistics.median(r["streamlit_ms"] for r in runs),
+        "landing_ms": statistics.median(r["landing_ms"] for r in runs),
+        "page_ms": statistics.median(r["page_ms"] for r in runs),
+        "landing_heavy": runs[-1]["landing_heavy"],
+        "page_heavy": runs[-1]["page_heavy"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per measurement (median reported)")
+    parser.add_argument("--max-landing-ms", type=float, default=None,
+                        help="exit non-zero if the landing imports take longer than this")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from app.page_registry import DETAIL_PAGES
+
+    landing = measure(None, args.repeat)
+    print(f"streamlit import           {landing['streamlit_ms']:8.1f} ms")
+    print(f"landing page imports       {landing['landing_ms']:8.1f} ms  heavy: {', '.join(landing['landing_heavy']) or '-'}")
+    for crypto_id in DETAIL_PAGES:
+        result = measure(crypto_id, args.repeat)
+        print(f"first open: {crypto_id:<14} {result['page_ms']:8.1f} ms  heavy: {', '.join(result['page_heavy']) or '-'}")
+
+    if args.max_landing_ms is not None and landing["landing_ms"] > args.max_landing_ms:
+        print(f"FAIL: landing imports took {landing['landing_ms']:.1f} ms > {args.max_landing_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Headless page-render benchmark.
+
+Drives app/main.py with Streamlit's AppTest through the landing page, each detail
+page and its main interactions, against the local mock upstream
+(mocks/http_upstream.py) started in-process:
+
+    python benchmarks/page_render.py --runs 20
+    python benchmarks/page_render.py --latency-ms 200 --jitter-ms 100 --fail-rate 0.1
+    python benchmarks/page_render.py --runs 30 --json results.json --max-p95-ms 800
+
+For every step it reports the first (cold cache) run, p50/p95/p99 of the
+remaining runs, the bytes of ForwardMsgs sent to the browser and the peak Python
+memory allocated while the step ran (tracemalloc, measured in a separate pass so
+it doesn't slow the timed runs).
+
+AppTest always reruns the whole script, so interaction timings are for a full
+rerun: an upper bound on the fragment-scoped reruns a browser session triggers.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_SCRIPT = os.path.join(ROOT, "app", "main.py")
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def _open_detail(crypto_id):
+    def step(at):
+        from app.crypto_data import get_crypto_data
+
+        coin = next(c for c in get_crypto_data() if c["id"] == crypto_id)
+        at.session_state.selected_crypto = coin
+        at.session_state.page = "crypto_detail"
+        at.run()
+    return step
+
+
+def _open_page(page):
+    def step(at):
+        at.session_state.page = page
+        at.run()
+    return step
+
+
+def _select(label, option):
+    def step(at):
+        next(w for w in at.selectbox if w.label == label).select(option).run()
+    return step
+
+
+def _set_number(label, value):
+    def step(at):
+        next(w for w in at.number_input if w.label == label).set_value(value).run()
+    return step
+
+
+def _type(label, text):
+    def step(at):
+        next(w for w in at.text_input if w.label == label).input(text).run()
+    return step
+
+
+def _click(label):
+    def step(at):
+        next(w for w in at.button if w.label == label).click().run()
+    return step
+
+
+def _toggle(label):
+    def step(at):
+        next(w for w in at.toggle if w.label == label).set_value(True).run()
+    return step
+
+
+def _slide(label, value):
+    def step(at):
+        next(w for w in at.slider if w.label == label).set_value(value).run()
+    return step
+
+
+# page -> ordered (step name, action); each run replays the steps in a fresh session
+SCENARIOS = {
+    "landing": [
+        ("render", lambda at: at.run()),
+        ("rerun", lambda at: at.run()),
+        ("page 2", _set_number("Page", 2)),
+        ("search", _type("🔎 Search coins", "sol")),
+    ],
+    "bitcoin": [
+        ("open", _open_detail("bitcoin")),
+        ("range 7 days", _select("Select Data Range", "Daily (7 days)")),
+        ("range 24 hours", _select("Select Data Range", "24 Hours")),
+        ("prediction", _click("Get Prediction")),
+        ("backtest", _toggle("Run a backtest on stored candles")),
+    ],
+    "ethereum": [
+        ("open", _open_detail("ethereum")),
+        ("period 30d", _select("Select Time Period", "30d")),
+        ("prediction", _click("Get ETH Prediction")),
+    ],
+    "ripple": [
+        ("open", _open_detail("ripple")),
+        ("window 180 days", _slide("History window (days)", 180)),
+        ("prediction", _click("Get Prediction")),
+    ],
+    "solana": [
+        ("open", _open_detail("solana")),
+        ("period 90d", _select("Select Time Period", "90d")),
+    ],
+    "analytics": [
+        ("open", _open_page("analytics")),
+        ("universe top 100", _select("Universe", "Top 100")),
+        ("window 20 days", _slide("Window (days)", 20)),
+    ],
+}
+
+
+class ByteCounter:
+    """Counts the serialized size of every ForwardMsg the script enqueues."""
+
+    def __init__(self):
+        from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+
+        self.total = 0
+        original = ForwardMsgQueue.enqueue
+
+        def enqueue(queue, msg):
+            self.total += msg.ByteSize()
+            return original(queue, msg)
+
+        ForwardMsgQueue.enqueue = enqueue
+
+
+def run_scenario(steps, runs, counter, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    samples = {name: {"times": [], "bytes": [], "errors": 0} for name, _ in steps}
+    for _ in range(runs):
+        at = AppTest.from_file(MAIN_SCRIPT, default_timeout=timeout)
+        for name, action in steps:
+            before = counter.total
+            start = time.perf_counter()
+            action(at)
+            samples[name]["times"].append((time.perf_counter() - start) * 1000)
+            samples[name]["bytes"].append(counter.total - before)
+            samples[name]["errors"] += len(at.exception)
+    return samples
+
+
+def peak_memory(steps, timeout):
+    """Peak traced allocation (bytes) per step, from one extra warm session."""
+    from streamlit.testing.v1 import AppTest
+
+    peaks = {}
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=timeout)
+    tracemalloc.start()
+    try:
+        for name, action in steps:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            action(at)
+            peaks[name] = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def summarize(samples, peaks):
+    rows = {}
+    for name, data in samples.items():
+        times = data["times"]
+        warm = times[1:] or times
+        rows[name] = {
+            "cold_ms": times[0],
+            "p50_ms": percentile(warm, 50),
+            "p95_ms": percentile(warm, 95),
+            "p99_ms": percentile(warm, 99),
+            "bytes": int(statistics.median(data["bytes"])),
+            "peak_mem_bytes": peaks.get(name, 0),
+            "errors": data["errors"],
+        }
+    return rows
+
+
+def configure_environment(args):
+    """Start the mock upstream and point the app at it before any app module is imported."""
+    sys.path.insert(0, ROOT)
+    # AppTest sets session state from the main thread, which Streamlit warns about on every call
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(lambda record: False)
+    from mocks.http_upstream import MockConfig, patch_yfinance, service_env, start_server
+
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.fail_rate)
+    server, base_url = start_server(config)
+    workdir = tempfile.mkdtemp(prefix="page-bench-")
+    os.environ.update(service_env(base_url))
+    os.environ.update({
+        "CRYPTO_HISTORY_DB": os.path.join(workdir, "history.sqlite3"),
+        "CRYPTO_SHARED_CACHE": "memory",
+        "CRYPTO_LIVE_TICKS": "0",
+        "CRYPTO_METRICS_PORT": "0",
+    })
+    patch_yfinance(base_url)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="sessions per page (first one is cold)")
+    parser.add_argument("--pages", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="mock upstream latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of upstream requests answered with 503")
+    parser.add_argument("--timeout", type=float, default=120.0, help="AppTest timeout per run, seconds")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="exit non-zero if any step's p95 exceeds this")
+    args = parser.parse_args()
+
+    server = configure_environment(args)
+    counter = ByteCounter()
+    results = {}
+    for page in args.pages:
+        steps = SCENARIOS[page]
+        samples = run_scenario(steps, args.runs, counter, args.timeout)
+        results[page] = summarize(samples, peak_memory(steps, args.timeout))
+
+    header = f"{'page / step':<28}{'cold':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'bytes':>11}{'peak mem':>11}{'errors':>8}"
+    print(header)
+    print("-" * len(header))
+    for page, rows in results.items():
+        for name, row in rows.items():
+            print(f"{page + ' / ' + name:<28}{row['cold_ms']:>8.0f}ms{row['p50_ms']:>7.0f}ms{row['p95_ms']:>7.0f}ms"
+                  f"{row['p99_ms']:>7.0f}ms{row['bytes'] / 1024:>9.1f}KB{row['peak_mem_bytes'] / 2**20:>9.1f}MB"
+                  f"{row['errors']:>8}")
+    print(f"\nupstream requests: {dict(sorted(server.config.requests.items()))}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"config": vars(args), "results": results, "upstream_requests": server.config.requests}, fh, indent=2)
+
+    if args.max_p95_ms is not None:
+        slow = [(page, name, row["p95_ms"]) for page, rows in results.items() for name, row in rows.items()
+                if row["p95_ms"] > args.max_p95_ms]
+        if slow:
+            for page, name, p95 in slow:
+                print(f"FAIL: {page} / {name} p95 {p95:.0f}ms > {args.max_p95_ms:.0f}ms")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""Local stand-in for the HTTP APIs the dashboard calls.
+
+Serves CoinGecko, Kraken, the three prediction APIs and a yfinance history
+endpoint under one port, with synthetic but deterministic prices:
+
+    python mocks/http_upstream.py --port 8700 --latency-ms 150 --fail-rate 0.05
+
+Then point the app at it:
+
+    COINGECKO_API=http://localhost:8700/coingecko KRAKEN_API=http://localhost:8700/kraken \\
+    BTC_PREDICTION_API=http://localhost:8700/btc ETH_PREDICTION_API=http://localhost:8700/eth \\
+    XRP_PREDICTION_API=http://localhost:8700/xrp streamlit run app/main.py
+
+yfinance has no base URL setting, so patch_yfinance() swaps yf.Ticker and
+yf.download for clients of the /yfinance routes (the page benchmark does this in-process). Latency and
+failure rates can be set per service (the first path segment), e.g.
+``--service-latency kraken=800 --service-fail-rate eth=1``, and a service can be
+rate limited like CoinGecko's free tier (429 with Retry-After), e.g.
+``--service-rate-limit coingecko=0.5``.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DAY = 86400
+START_PRICES = {"bitcoin": 65000.0, "ethereum": 3200.0, "ripple": 0.55, "solana": 150.0}
+YF_SYMBOLS = {"BTC-USD": "bitcoin", "ETH-USD": "ethereum", "XRP-USD": "ripple", "SOL-USD": "solana"}
+KRAKEN_PAIRS = {"XXBTZUSD": "bitcoin", "XETHZUSD": "ethereum", "XXRPZUSD": "ripple", "SOLUSD": "solana"}
+SUPPLY = {"bitcoin": 19.7e6, "ethereum": 120e6, "ripple": 55e9, "solana": 460e6}
+# /coins/markets lists the four real assets plus synthetic coins up to this many
+MARKET_UNIVERSE = 300
+# Synthetic coins have yfinance daily history too (for multi-asset downloads)
+YF_SYMBOLS.update({f"MC{i}-USD": f"mockcoin-{i}" for i in range(len(START_PRICES) + 1, MARKET_UNIVERSE + 1)})
+
+
+def price_at(asset, ts):
+    """Deterministic synthetic price of ``asset`` at epoch second ``ts``."""
+    t = ts / DAY
+    if asset in START_PRICES:
+        wave = 0.15 * math.sin(t / 29) + 0.05 * math.sin(t / 3.7) + 0.01 * math.sin(t * 7.3)
+        return START_PRICES[asset] * (1 + wave)
+    # Synthetic coins: phase-shifted waves, so they are not all perfectly correlated
+    i = int(asset.rsplit("-", 1)[1])
+    wave = 0.15 * math.sin(t / 29 + i) + 0.05 * math.sin(t / (3 + i % 5)) + 0.01 * math.sin(t * 7.3 + i)
+    return 100.0 / i * (1 + wave)
+
+
+def candles(asset, since, now, step=DAY):
+    """(candle start, open, high, low, close, volume) for each ``step`` seconds from since to now."""
+    rows = []
+    start = int(since) // step * step
+    while start <= now:
+        rng = random.Random(f"{asset}:{start}" if step == DAY else f"{asset}:{step}:{start}")
+        open_, close = price_at(asset, start), price_at(asset, start + step)
+        high = max(open_, close) * (1 + rng.uniform(0, 0.02))
+        low = min(open_, close) * (1 - rng.uniform(0, 0.02))
+        rows.append((start, open_, high, low, close, rng.uniform(1e3, 5e4) * step / DAY))
+        start += step
+    return rows
+
+
+class MockConfig:
+    """Latency (ms), jitter (ms) and failure rate, with per-service overrides.
+
+    ``service_rate_limit`` maps a service to the requests per second it accepts
+    (burst of one second's worth); requests over it get a 429.
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, fail_rate=0.0, service_latency=None, service_fail_rate=None,
+                 service_rate_limit=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_rate = fail_rate
+        self.service_latency = dict(service_latency or {})
+        self.service_fail_rate = dict(service_fail_rate or {})
+        self.service_rate_limit = dict(service_rate_limit or {})
+        self.requests = {}
+        self.rejected = {}
+        self._allowance = {}  # service -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def delay(self, service):
+        base = self.service_latency.get(service, self.latency_ms)
+        return (base + random.uniform(0, self.jitter_ms)) / 1000
+
+    def fails(self, service):
+        return random.random() < self.service_fail_rate.get(service, self.fail_rate)
+
+    def count(self, service):
+        with self._lock:
+            self.requests[service] = self.requests.get(service, 0) + 1
+
+    def retry_after(self, service):
+        """Seconds to wait if this request is over the service's rate limit, else None."""
+        rate = self.service_rate_limit.get(service)
+        if not rate:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._allowance.get(service, (max(rate, 1.0), now))
+            tokens = min(max(rate, 1.0), tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._allowance[service] = (tokens - 1, now)
+                return None
+            self._allowance[service] = (tokens, now)
+            self.rejected[service] = self.rejected.get(service, 0) + 1
+            return math.ceil((1 - tokens) / rate)
+
+
+def _market_rows(now):
+    """Every coin of the synthetic universe, unsorted, as /coins/markets rows."""
+    rows = []
+    for asset in START_PRICES:
+        price = price_at(asset, now)
+        rows.append({"id": asset, "symbol": {"bitcoin": "btc", "ethereum": "eth", "ripple": "xrp", "solana": "sol"}[asset],
+                     "name": asset.capitalize(), "current_price": price, "market_cap": price * SUPPLY[asset],
+                     "total_volume": price * SUPPLY[asset] * 0.03,
+                     "price_change_percentage_24h": (price / price_at(asset, now - DAY) - 1) * 100})
+    for i in range(len(rows) + 1, MARKET_UNIVERSE + 1):
+        price = 100.0 / i * (1 + 0.05 * math.sin(now / DAY + i))
+        cap = 1e10 / i
+        rows.append({"id": f"mockcoin-{i}", "symbol": f"mc{i}", "name": f"Mock Coin {i}", "current_price": price,
+                     "market_cap": cap, "total_volume": cap * (0.01 + (i % 7) / 100),
+                     "price_change_percentage_24h": 5 * math.sin(i)})
+    return rows
+
+
+def _coingecko_markets(query, now):
+    rows = _market_rows(now)
+    for rank, row in enumerate(sorted(rows, key=lambda r: -r["market_cap"]), start=1):
+        row["market_cap_rank"], row["image"] = rank, None
+    if "ids" in query:
+        wanted = set(query["ids"][0].split(","))
+        rows = [row for row in rows if row["id"] in wanted]
+    order = query.get("order", ["market_cap_desc"])[0]
+    field, _, direction = order.rpartition("_")
+    if field not in ("market_cap", "volume", "id") or direction not in ("asc", "desc"):
+        return 400, {"error": "invalid order"}
+    key = {"market_cap": "market_cap", "volume": "total_volume", "id": "id"}[field]
+    rows.sort(key=lambda r: r[key], reverse=direction == "desc")
+    per_page = min(int(query.get("per_page", ["100"])[0]), 250)
+    page = int(query.get("page", ["1"])[0])
+    return 200, rows[(page - 1) * per_page:page * per_page]
+
+
+def _coingecko(path, query, now):
+    if path == "/coins/markets":
+        return _coingecko_markets(query, now)
+    if path == "/simple/price":
+        out = {}
+        for asset in query.get("ids", [""])[0].split(","):
+            if asset in START_PRICES:
+                price = price_at(asset, now)
+                out[asset] = {
+                    "usd": price,
+                    "usd_24h_change": (price / price_at(asset, now - DAY) - 1) * 100,
+                    "usd_market_cap": price * SUPPLY[asset],
+                }
+        return 200, out
+    parts = path.strip("/").split("/")
+    if len(parts) == 4 and parts[0] == "coins" and parts[2:] == ["market_chart", "range"] and parts[1] in START_PRICES:
+        asset = parts[1]
+        start, end = int(query["from"][0]), int(query["to"][0])
+        # Like CoinGecko: hourly points for ranges up to 90 days, daily beyond
+        step = 3600 if end - start <= 90 * DAY else DAY
+        stamps = range(start - start % step, end + 1, step)
+        return 200, {
+            "prices": [[t * 1000, price_at(asset, t)] for t in stamps],
+            "market_caps": [[t * 1000, price_at(asset, t) * SUPPLY[asset]] for t in stamps],
+            "total_volumes": [[t * 1000, price_at(asset, t) * 2e4] for t in stamps],
+        }
+    return 404, {"error": "not found"}
+
+
+def _kraken(path, query, now):
+    pairs = query.get("pair", [""])[0].split(",")
+    if any(pair not in KRAKEN_PAIRS for pair in pairs):
+        return 200, {"error": ["EQuery:Unknown asset pair"]}
+    if path == "/0/public/Ticker":
+        result = {}
+        for pair in pairs:
+            asset = KRAKEN_PAIRS[pair]
+            last = price_at(asset, now)
+            result[pair] = {"c": [f"{last:.5f}", "1.0"], "o": f"{price_at(asset, now // DAY * DAY):.5f}"}
+        return 200, {"error": [], "result": result}
+    if path != "/0/public/OHLC" or len(pairs) != 1:
+        return 404, {"error": ["EGeneral:Unknown method"]}
+    pair = pairs[0]
+    step = int(query.get("interval", ["1"])[0]) * 60
+    since = int(query.get("since", [now - 720 * step])[0])
+    # Kraken returns at most 720 candles, newest last
+    since = max(since, now - 719 * step)
+    rows = [
+        [start, f"{o:.5f}", f"{h:.5f}", f"{lo:.5f}", f"{c:.5f}", f"{(h + lo + c) / 3:.5f}", f"{v:.8f}", int(v)]
+        for start, o, h, lo, c, v in candles(KRAKEN_PAIRS[pair], since + 1, now, step)
+    ]
+    return 200, {"error": [], "result": {pair: rows, "last": rows[-1][0] if rows else since}}
+
+
+YF_INTERVALS = {"1m": 60, "5m": 300, "1h": 3600, "1d": DAY}
+
+
+def _yfinance_rows(asset, start, now, step=DAY):
+    return [{"ts": ts, "open": o, "high": h, "low": lo, "close": c, "volume": v}
+            for ts, o, h, lo, c, v in candles(asset, start, now, step)]
+
+
+def _yfinance(path, query, now):
+    start = int(float(query.get("start", [now - 30 * DAY])[0]))
+    if path == "/download":
+        # Multi-ticker download; unknown symbols are left out, like yfinance's failed tickers
+        symbols = [s for s in query.get("symbols", [""])[0].split(",") if s in YF_SYMBOLS]
+        return 200, {"symbols": {s: _yfinance_rows(YF_SYMBOLS[s], start, now) for s in symbols}}
+    asset = YF_SYMBOLS.get(query.get("symbol", [""])[0])
+    if path != "/history" or asset is None:
+        return 404, {"error": "unknown symbol"}
+    step = YF_INTERVALS.get(query.get("interval", ["1d"])[0])
+    if step is None:
+        return 400, {"error": "unsupported interval"}
+    return 200, {"rows": _yfinance_rows(asset, start, now, step)}
+
+
+def _prediction(service, path, query, now):
+    asset = {"btc": "bitcoin", "eth": "ethereum", "xrp": "ripple"}[service]
+    tomorrow = time.strftime("%Y-%m-%d", time.gmtime(now + DAY))
+    high = price_at(asset, now + DAY) * 1.01
+    if service == "btc" and path.rstrip("/") == "/health":
+        return 200, {"status": "ok"}
+    if service == "btc" and path == "/predict/Bitcoin":
+        return 200, {"prediction": {"prediction_day_date": query.get("date", [tomorrow])[0], "Predicted_high": high}}
+    if service == "eth" and path == "/predict/ETH":
+        return 200, {"pred_high_next": high, "latest_close": price_at(asset, now)}
+    if service == "xrp" and path == "/predict/":
+        return 200, {"predicted_high_usd": high, "as_of": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+                     "prediction_day": tomorrow}
+    return 404, {"detail": "Not Found"}
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            service, _, rest = url.path.lstrip("/").partition("/")
+            path, query, now = "/" + rest, parse_qs(url.query), int(time.time())
+            config.count(service)
+            time.sleep(config.delay(service))
+            headers = {}
+            retry_after = config.retry_after(service)
+            if retry_after is not None:
+                status, body = 429, {"status": {"error_code": 429, "error_message": "rate limited"}}
+                headers["Retry-After"] = str(retry_after)
+            elif config.fails(service):
+                status, body = 503, {"error": "injected failure"}
+            elif service == "coingecko":
+                status, body = _coingecko(path, query, now)
+            elif service == "kraken":
+                status, body = _kraken(path, query, now)
+            elif service == "yfinance":
+                status, body = _yfinance(path, query, now)
+            elif service in ("btc", "eth", "xrp"):
+                status, body = _prediction(service, path, query, now)
+            else:
+                status, body = 404, {"error": "unknown service"}
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+def start_server(config=None, host="127.0.0.1", port=0):
+    """Serve on a daemon thread; returns (server, base_url). port=0 picks a free port."""
+    config = config or MockConfig()
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, name="mock-upstream", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def service_env(base_url):
+    """Environment variables that point the app at a server started here."""
+    return {
+        "COINGECKO_API": f"{base_url}/coingecko",
+        "KRAKEN_API": f"{base_url}/kraken",
+        "BTC_PREDICTION_API": f"{base_url}/btc",
+        "ETH_PREDICTION_API": f"{base_url}/eth",
+        "XRP_PREDICTION_API": f"{base_url}/xrp",
+    }
+
+
+def patch_yfinance(base_url):
+    """Replace yfinance.Ticker and yfinance.download with clients of this server's /yfinance routes."""
+    import pandas as pd
+    import requests
+    import yfinance
+
+    class MockTicker:
+        def __init__(self, symbol):
+            self.symbol = symbol
+
+        def history(self, start=None, interval="1d", **kwargs):
+            params = {"symbol": self.symbol, "start": pd.Timestamp(start).timestamp(), "interval": interval}
+            response = requests.get(f"{base_url}/yfinance/history", params=params, timeout=30)
+            response.raise_for_status()
+            rows = response.json()["rows"]
+            frame = pd.DataFrame(rows, columns=["ts", "open", "high", "low", "close", "volume"])
+            frame.index = pd.to_datetime(frame.pop("ts"), unit="s", utc=True).rename("Date")
+            return frame.rename(columns=str.capitalize)
+
+    def mock_download(tickers, start=None, interval="1d", group_by="column", **kwargs):
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        params = {"symbols": ",".join(symbols), "start": pd.Timestamp(start).timestamp()}
+        response = requests.get(f"{base_url}/yfinance/download", params=params, timeout=30)
+        response.raise_for_status()
+        payload = response.json()["symbols"]
+        parts = {}
+        for symbol in symbols:
+            rows = payload.get(symbol, [])
+            frame = pd.DataFrame(rows, columns=["ts", "open", "high", "low", "close", "volume"])
+            frame.index = pd.to_datetime(frame.pop("ts"), unit="s", utc=True).rename("Date")
+            parts[symbol] = frame.rename(columns=str.capitalize)
+        # Failed tickers come back as all-NaN columns, as in yfinance
+        frame = pd.concat(parts, axis=1, names=["Ticker", "Price"]).sort_index()
+        return frame if group_by == "ticker" else frame.swaplevel(axis=1).sort_index(axis=1)
+
+    yfinance.Ticker = MockTicker
+    yfinance.download = mock_download
+
+
+def _service_values(pairs):
+    return {service: float(value) for service, value in (pair.split("=", 1) for pair in pairs)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--service-latency", action="append", default=[], metavar="SERVICE=MS")
+    parser.add_argument("--service-fail-rate", action="append", default=[], metavar="SERVICE=RATE")
+    parser.add_argument("--service-rate-limit", action="append", default=[], metavar="SERVICE=PER_SECOND")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.fail_rate,
+                        _service_values(args.service_latency), _service_values(args.service_fail_rate),
+                        _service_values(args.service_rate_limit))
+    server, base_url = start_server(config, args.host, args.port)
+    print(f"Mock upstream on {base_url}")
+    for name, value in service_env(base_url).items():
+        print(f"  {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Local stand-in for Kraken's v2 websocket ticker.
+
+Run it and point the app at it:
+
+    python mocks/kraken_ws.py --port 8765
+    CRYPTO_TICKER_WS=ws://localhost:8765 streamlit run app/main.py
+
+Answers the ticker subscription with a snapshot, then sends a random-walk
+update for every subscribed symbol each --interval seconds plus heartbeats,
+in the same message shapes as the real feed.
+"""
+import argparse
+import json
+import random
+import time
+
+from websockets.sync.server import serve
+
+START_PRICES = {"BTC/USD": 65000.0, "ETH/USD": 3200.0, "XRP/USD": 0.55, "SOL/USD": 150.0}
+
+
+def ticker(symbol, last, open_price):
+    spread = last * 0.0001
+    return {
+        "symbol": symbol,
+        "bid": round(last - spread, 6),
+        "ask": round(last + spread, 6),
+        "last": round(last, 6),
+        "change": round(last - open_price, 6),
+        "change_pct": round((last / open_price - 1) * 100, 2),
+    }
+
+
+def make_handler(interval):
+    def handler(ws):
+        request = json.loads(ws.recv())
+        symbols = [s for s in request["params"]["symbol"] if s in START_PRICES]
+        ws.send(json.dumps({"method": "subscribe", "success": True,
+                            "result": {"channel": "ticker", "symbol": symbols}}))
+        prices = {s: START_PRICES[s] for s in symbols}
+        ws.send(json.dumps({"channel": "ticker", "type": "snapshot",
+                            "data": [ticker(s, prices[s], START_PRICES[s]) for s in symbols]}))
+        while True:
+            time.sleep(interval)
+            for s in symbols:
+                prices[s] *= 1 + random.gauss(0, 0.0005)
+            ws.send(json.dumps({"channel": "heartbeat"}))
+            ws.send(json.dumps({"channel": "ticker", "type": "update",
+                                "data": [ticker(s, prices[s], START_PRICES[s]) for s in symbols]}))
+    return handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between ticker updates")
+    args = parser.parse_args()
+    with serve(make_handler(args.interval), args.host, args.port) as server:
+        print(f"Mock Kraken ticker on ws://{args.host}:{args.port}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
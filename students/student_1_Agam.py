@@ -1,32 +1,184 @@
 import streamlit as st
-import requests
 import pandas as pd
 import plotly.graph_objects as go
+import time
 from datetime import datetime, timedelta
+from app import indicators
+from app.async_fetch import fetch_concurrently
+from app.crypto_data import MAIN_CRYPTOS
+from app.charting import CANDLES_PER_PIXEL, aggregate_ohlc, downsample_frame, line_trace, target_points
+from app.figure_cache import cached_figure
+from app.live_ticks import LIVE_RUN_EVERY, live_price_metric, with_live_quote
+from app.metrics import span
+from app.pages import backtest_panel
+from app.prediction_client import get_prediction_client
+from app.providers import OHLCV, load_daily_history
+
+# Days loaded for the default "6 Months" range (also warmed by app.prefetch)
+DEFAULT_DAYS = 180
+KRAKEN_OHLC_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'vwap', 'volume', 'count']
+# Data range option -> (days shown, title suffix)
+DATA_RANGES = {
+    "24 Hours": (1, "(24 Hours)"),
+    "Daily (7 days)": (7, "(7 Days)"),
+    "6 Months": (DEFAULT_DAYS, "(6 Months)"),
+    "1 Year": (365, "(1 Year)"),
+}
+# Ranges read from the OHLC pyramid (minute candles for a day, hourly or daily for a year)
+PYRAMID_RANGES = {"24 Hours", "1 Year"}
 
 def get_btc_data(days):
     # Calculate timestamp for the specified days ago
     target_timestamp = int((datetime.now() - timedelta(days=days)).timestamp())
-    url = f"https://api.kraken.com/0/public/OHLC?pair=XXBTZUSD&interval=1440&since={target_timestamp}"
-    response = requests.get(url)
-    data = response.json()
-    # Parse OHLC data
-    ohlc = data['result']['XXBTZUSD']
-    df = pd.DataFrame(ohlc, columns=['timestamp', 'open', 'high', 'low', 'close', 'vwap', 'volume', 'count'])
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
-    df.set_index('timestamp', inplace=True)
-    df = df.astype(float)
+    # Served from the local history store; only newer candles are fetched from the
+    # fastest healthy OHLC provider (Kraken, else yfinance; vwap/count are Kraken-only)
+    df = load_daily_history("bitcoin", target_timestamp, needs=OHLCV)
+    df = df.reindex(columns=KRAKEN_OHLC_COLUMNS[1:])
+    df.index = df.index.tz_localize(None)
     return df
 
+def get_btc_candles(days):
+    """Last ``days`` of candles from the OHLC pyramid, at the coarsest level that fills the chart"""
+    from app.ohlc_pyramid import get_candles
+
+    _, df = get_candles("bitcoin", time.time() - days * 86400)
+    if df.empty:
+        raise ValueError("no candles stored or available upstream")
+    df = df.reindex(columns=KRAKEN_OHLC_COLUMNS[1:])
+    df.index = df.index.tz_localize(None)
+    return df
+
+def load_btc_range(data_range):
+    days = DATA_RANGES[data_range][0]
+    return get_btc_candles(days) if data_range in PYRAMID_RANGES else get_btc_data(days)
+
 def calculate_bollinger_bands(df, window=20):
-    df['SMA'] = df['close'].rolling(window=window).mean()
-    df['STD'] = df['close'].rolling(window=window).std()
-    df['Upper'] = df['SMA'] + (df['STD'] * 2)
-    df['Lower'] = df['SMA'] - (df['STD'] * 2)
+    df['SMA'], df['STD'], df['Upper'], df['Lower'] = indicators.bollinger_bands(df['close'], window)
     return df
 
 def calculate_ema(df, span):
-    return df['close'].ewm(span=span, adjust=False).mean()
+    return pd.Series(indicators.ema(df['close'], span), index=df.index)
+
+@st.fragment(run_every=LIVE_RUN_EVERY)
+def _btc_live_indicators(data_range, close):
+    """EMA and Bollinger values of the forming candle at the live price.
+
+    The engine holds the closed candles across reruns; candles that closed since
+    are appended in O(1) and each tick only previews the forming one.
+    """
+    engine = indicators.follow(("bitcoin", data_range), close, ema_spans=(9, 21), bollinger_window=20)
+    price = with_live_quote({'id': 'bitcoin', 'current_price': close.iloc[-1]})['current_price']
+    latest = engine.preview(price)
+    labels = {"ema_9": "EMA 9", "ema_21": "EMA 21", "bb_upper": "Upper Band", "bb_lower": "Lower Band"}
+    for col, (key, label) in zip(st.columns(4), labels.items()):
+        with col:
+            st.metric(label, f"${latest[key]:,.2f}" if pd.notna(latest[key]) else "N/A")
+
+@st.fragment
+def _btc_prediction_panel(api_awake):
+    """Prediction button and result; a click reruns only this panel"""
+    if api_awake:
+        if st.button("Get Prediction"):
+            try:
+                prediction = get_prediction_client().predict("bitcoin")
+                pred_date = prediction['prediction_day']
+                pred_high = prediction['predicted_high']
+                st.metric(label=f"Predicted High for {pred_date}", value=f"${pred_high}")
+            except Exception:
+                st.error("Failed to fetch prediction")
+    else:
+        st.warning("API is not awake. Waking up the API. Please try again in a minute.")
+
+@st.fragment
+def _btc_chart_panel(loaded_range, loaded_df):
+    """Range selector, price, OHLC and charts; changing the range reruns only this panel"""
+    # Data range selector
+    data_range = st.selectbox("Select Data Range", list(DATA_RANGES), index=2, key="btc_data_range")  # Default to 6 Months
+
+    days, title_suffix = DATA_RANGES[data_range]
+    # Six months opens zoomed to the last week
+    set_zoom = data_range == "6 Months"
+
+    # Reuse the candles loaded with the page; a changed range loads its own
+    df = loaded_df
+    if data_range != loaded_range:
+        try:
+            df = load_btc_range(data_range)
+        except Exception as e:
+            df = e
+    if isinstance(df, Exception):
+        st.error(f"Failed to load BTC data: {df}")
+        return
+    with span("transform.btc_ema", rows=len(df)):
+        df['EMA9'] = calculate_ema(df, 9)
+        df['EMA21'] = calculate_ema(df, 21)
+
+    # Display current price above the chart
+    current_price = df['close'].iloc[-1]
+    live_price_metric({'id': 'bitcoin', 'current_price': current_price}, label="Current BTC Price")
+    _btc_live_indicators(data_range, df['close'])
+
+
+    # OHLC Section
+    st.header("📈 Latest OHLC Values")
+    st.markdown("---")
+    latest = df.iloc[-1]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Open", f"${latest['open']:.2f}")
+    with col2:
+        st.metric("High", f"${latest['high']:.2f}")
+    with col3:
+        st.metric("Low", f"${latest['low']:.2f}")
+    with col4:
+        st.metric("Close", f"${latest['close']:.2f}")
+
+    # Charts Section
+    st.header("📊 Charts")
+    st.markdown("---")
+
+    # Graph 1: Candlestick with Volume
+    def build_candlestick():
+        # Merge candles only beyond what the initially visible range can display
+        visible_fraction = 7 / days if set_zoom else 1.0
+        candles = aggregate_ohlc(df, target_points(visible_fraction, points_per_pixel=CANDLES_PER_PIXEL))
+        fig1 = go.Figure()
+        fig1.add_trace(go.Candlestick(x=candles.index,
+                        open=candles['open'],
+                        high=candles['high'],
+                        low=candles['low'],
+                        close=candles['close'],
+                        name='Candlestick'))
+        fig1.add_trace(go.Bar(x=candles.index, y=candles['volume'], name='Volume', yaxis='y2', opacity=0.3))
+        fig1.update_layout(
+            title=dict(text=f'BTC Candlestick with Volume {title_suffix}', font=dict(size=24)),
+            yaxis_title='Price (USD)',
+            yaxis2=dict(title='Volume', overlaying='y', side='right'),
+            xaxis_title='Date',
+            hovermode='x unified'
+        )
+        if set_zoom:
+            # Set default zoom to last 7 days for 6 months data
+            end_date = df.index.max()
+            start_date = end_date - timedelta(days=7)
+            fig1.update_xaxes(range=[start_date, end_date])
+        return fig1
+
+    # Figures are reused across reruns until the candles change
+    with span("render.btc_candlestick", days=days):
+        st.plotly_chart(cached_figure(build_candlestick, "bitcoin", days, "candlestick", df))
+
+    # Graph 2: EMA Cross
+    def build_ema_cross():
+        ema_data = downsample_frame(df, ['EMA9', 'EMA21'], target_points())
+        fig2 = go.Figure()
+        fig2.add_trace(line_trace(x=ema_data.index, y=ema_data['EMA9'], mode='lines', name='EMA 9', line=dict(color='red')))
+        fig2.add_trace(line_trace(x=ema_data.index, y=ema_data['EMA21'], mode='lines', name='EMA 21', line=dict(color='darkblue')))
+        fig2.update_layout(title=dict(text='BTC EMA Crossover', font=dict(size=24)), xaxis_title='Date', yaxis_title='Price (USD)', hovermode='x unified')
+        return fig2
+
+    with span("render.btc_ema_cross", days=days):
+        st.plotly_chart(cached_figure(build_ema_cross, "bitcoin", days, "ema_cross", df))
 
 def bitcoin_detail_page():
     # Layout with back button on top left
@@ -49,100 +201,31 @@ def bitcoin_detail_page():
     
     st.markdown('<h1 class="big-title">BTC Dashboard</h1>', unsafe_allow_html=True)
 
+    # The data range selector is rendered further down; read its current value
+    # now so the Kraken fetch can run alongside the health check
+    data_range = st.session_state.get("btc_data_range", "6 Months")
+
     # Next Day High Prediction
     st.header("📈 Next Day High Prediction")
     st.markdown("---")
     with st.spinner("Waking up prediction API... Please wait for 2 min."):
         
-        health_response = requests.get("https://bitcoin-prediction-api-rrfq.onrender.com/health/")
+        results = fetch_concurrently(
+            api_awake=lambda: get_prediction_client().is_healthy("bitcoin"),
+            df=lambda: load_btc_range(data_range),
+        )
+        api_awake = results['api_awake'] is True
         
-        if health_response.status_code == 200:
+        if api_awake:
             st.success("API is awake and ready!")
-            api_awake = True
         else:
             st.error("Failed to wake up API. Prediction may not work.")
-            api_awake = False
 
-    if api_awake:
-        if st.button("Get Prediction"):
-            today = datetime.now().strftime('%Y-%m-%d')
-            response = requests.get(f"https://bitcoin-prediction-api-rrfq.onrender.com/predict/Bitcoin?date={today}")
-            if response.status_code == 200:
-                data = response.json()
-                pred_date = data['prediction']['prediction_day_date']
-                pred_high = data['prediction']['Predicted_high']
-                st.metric(label=f"Predicted High for {pred_date}", value=f"${pred_high}")
-            else:
-                st.error("Failed to fetch prediction")
-    else:
-        st.warning("API is not awake. Waking up the API. Please try again in a minute.")
-    
+    _btc_prediction_panel(api_awake)
 
-    # Data range selector
-    data_range = st.selectbox("Select Data Range", ["Daily (7 days)", "6 Months"], index=1)  # Default to 6 Months
+    _btc_chart_panel(data_range, results['df'])
 
-    if data_range == "Daily (7 days)":
-        days = 7
-        title_suffix = "(7 Days)"
-        set_zoom = False
-    else:
-        days = 180
-        title_suffix = "(6 Months)"
-        set_zoom = True
-
-    df = get_btc_data(days)
-    df['EMA9'] = calculate_ema(df, 9)
-    df['EMA21'] = calculate_ema(df, 21)
-
-    # Display current price above the chart
-    current_price = df['close'].iloc[-1]
-    st.write(f"**Current BTC Price: ${current_price:.2f}**")
-
-
-    # OHLC Section
-    st.header("📈 Latest OHLC Values")
+    # Backtest the EMA crossover and Bollinger signals plotted above
+    st.header("🧪 Strategy Backtest")
     st.markdown("---")
-    latest = df.iloc[-1]
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("Open", f"${latest['open']:.2f}")
-    with col2:
-        st.metric("High", f"${latest['high']:.2f}")
-    with col3:
-        st.metric("Low", f"${latest['low']:.2f}")
-    with col4:
-        st.metric("Close", f"${latest['close']:.2f}")
-
-    # Charts Section
-    st.header("📊 Charts")
-    st.markdown("---")
-
-    # Graph 1: Candlestick with Volume
-    fig1 = go.Figure()
-    fig1.add_trace(go.Candlestick(x=df.index,
-                    open=df['open'],
-                    high=df['high'],
-                    low=df['low'],
-                    close=df['close'],
-                    name='Candlestick'))
-    fig1.add_trace(go.Bar(x=df.index, y=df['volume'], name='Volume', yaxis='y2', opacity=0.3))
-    fig1.update_layout(
-        title=dict(text=f'BTC Candlestick with Volume {title_suffix}', font=dict(size=24)),
-        yaxis_title='Price (USD)',
-        yaxis2=dict(title='Volume', overlaying='y', side='right'),
-        xaxis_title='Date',
-        hovermode='x unified'
-    )
-    if set_zoom:
-        # Set default zoom to last 7 days for 6 months data
-        end_date = df.index.max()
-        start_date = end_date - timedelta(days=7)
-        fig1.update_xaxes(range=[start_date, end_date])
-    st.plotly_chart(fig1)
-
-    # Graph 2: EMA Cross
-    fig2 = go.Figure()
-    fig2.add_trace(go.Scatter(x=df.index, y=df['EMA9'], mode='lines', name='EMA 9', line=dict(color='red')))
-    fig2.add_trace(go.Scatter(x=df.index, y=df['EMA21'], mode='lines', name='EMA 21', line=dict(color='darkblue')))
-    fig2.update_layout(title=dict(text='BTC EMA Crossover', font=dict(size=24)), xaxis_title='Date', yaxis_title='Price (USD)', hovermode='x unified')
-    st.plotly_chart(fig2)
+    backtest_panel({'id': 'bitcoin', **MAIN_CRYPTOS['bitcoin']})
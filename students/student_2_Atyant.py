@@ -13,6 +13,111 @@ if parent_dir not in sys.path:
 # Now import from app directory
 from app.crypto_data import get_price_history, MAIN_CRYPTOS
 from app.st_theme import show_callout
+from app.charting import downsample_frame, line_trace, target_points
+from app.figure_cache import cached_figure
+from app.prediction_client import PREDICTION_APIS, PredictionError, get_prediction_client
+from app.live_ticks import live_price_metric
+from app.metrics import span
+
+@st.fragment
+def _eth_price_panel():
+    """Period selector and price chart; changing the period reruns only this panel"""
+    period = st.selectbox(
+        "Select Time Period",
+        ["7d", "30d", "90d", "1y"],
+        format_func=lambda x: {"7d": "7 Days", "30d": "30 Days", "90d": "90 Days", "1y": "1 Year"}[x]
+    )
+    
+    with st.spinner("Loading Ethereum price history..."):
+        price_data = get_price_history("ETH-USD", period)
+    
+    if price_data is not None and not price_data.empty:
+        def build_price_chart():
+            chart_data = downsample_frame(price_data, ['Close'], target_points())
+            fig = go.Figure()
+            fig.add_trace(line_trace(
+                x=chart_data.index,
+                y=chart_data['Close'],
+                mode='lines',
+                name='ETH Price',
+                line=dict(color='#627EEA', width=3)
+            ))
+        
+            fig.update_layout(
+                title=f"Ethereum Price History ({period})",
+                xaxis_title="Date",
+                yaxis_title="Price (USD)",
+                hovermode='x unified',
+                height=500,
+                showlegend=False
+            )
+        
+            return fig
+        
+        with span("render.price_history", asset="ethereum", period=period):
+            fig = cached_figure(build_price_chart, "ethereum", period, "price_line", price_data)
+            st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def _eth_prediction_panel():
+    """Prediction button and result; a click reruns only this panel"""
+    # Single line prediction button
+    if st.button("Get ETH Prediction", type="primary", use_container_width=True):
+        with st.spinner("Generating prediction..."):
+            try:
+                st.info("Connecting to: SUPER AI PREDICTION API")
+                result = get_prediction_client().predict("ethereum")
+                
+                prediction = result['raw']
+                st.success("API Response received successfully!")
+                pred_high = result['predicted_high']
+                latest_close = result['latest_close']
+                if pred_high is None:
+                    st.error("The API response has no prediction")
+                    st.json(prediction)
+                    return
+                # The API may leave out the latest close
+                change = f"{(pred_high - latest_close) / latest_close * 100:+.2f}%" if latest_close else "N/A"
+                close = f"${latest_close:,.2f}" if latest_close else "N/A"
+                
+                # Display prediction in a nice box
+                st.markdown(f"""
+                <div style="
+                    background: linear-gradient(135deg, #4CAF50, #45a049);
+                    color: white;
+                    padding: 1.5rem;
+                    border-radius: 15px;
+                    text-align: center;
+                    margin: 1rem 0;
+                    box-shadow: 0 4px 15px rgba(76, 175, 80, 0.3);
+                ">
+                    <h3>Next-Day HIGH Prediction</h3>
+                    <h2>${pred_high:,.2f}</h2>
+                    <p>Expected change: {change}</p>
+                    <small>Current Close: {close}</small>
+                </div>
+                """, unsafe_allow_html=True)
+                
+                # Show additional details
+                with st.expander("Prediction Details"):
+                    st.json(prediction)
+                    
+            except PredictionError as e:
+                st.error(f"API returned status code: {e.status_code}")
+                st.error(f"Response text: {e.text}")
+                st.info(f"**The hosted API at {PREDICTION_APIS['ethereum']['base']} may be waking up. Try again in a few seconds.**")
+            except requests.exceptions.Timeout:
+                st.error("Request timed out - API is taking too long to respond")
+                st.info("**Your Render service might be sleeping. Try again in a few seconds.**")
+            except requests.exceptions.ConnectionError:
+                st.error("Connection error - Cannot reach the API server")
+                st.info("**Check if your Render deployment is running**")
+            except requests.exceptions.RequestException as e:
+                st.error(f"Request error: {str(e)}")
+            except Exception as e:
+                st.error(f"Unexpected error: {str(e)}")
+                st.error(f"Error type: {type(e).__name__}")
+                st.info("**Check that the prediction API is reachable (set `ETH_PREDICTION_API` to use another deployment)**")
 
 def ethereum_detail_page():
     """Ethereum detailed page with ML prediction"""
@@ -41,10 +146,7 @@ def ethereum_detail_page():
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric(
-            "Current Price", 
-            f"${crypto.get('current_price', 0):,.2f}", delta=f"{crypto.get('price_change_percentage_24h', 0):.2f}%"
-        )
+        live_price_metric(crypto)
     
     with col2:
         market_cap = crypto.get('market_cap', 0)
@@ -75,95 +177,13 @@ def ethereum_detail_page():
     st.markdown("---")
     st.subheader("Ethereum Price History")
     
-    period = st.selectbox(
-        "Select Time Period",
-        ["7d", "30d", "90d", "1y"],
-        format_func=lambda x: {"7d": "7 Days", "30d": "30 Days", "90d": "90 Days", "1y": "1 Year"}[x]
-    )
-    
-    with st.spinner("Loading Ethereum price history..."):
-        price_data = get_price_history("ETH-USD", period)
-    
-    if price_data is not None and not price_data.empty:
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=price_data.index,
-            y=price_data['Close'],
-            mode='lines',
-            name='ETH Price',
-            line=dict(color='#627EEA', width=3)
-        ))
-        
-        fig.update_layout(
-            title=f"Ethereum Price History ({period})",
-            xaxis_title="Date",
-            yaxis_title="Price (USD)",
-            hovermode='x unified',
-            height=500,
-            showlegend=False
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+    _eth_price_panel()
     
     # AI PREDICTION SECTION
     st.markdown("---")
     st.subheader("Ethereum AI Price Prediction")
     
-    # Single line prediction button
-    if st.button("Get ETH Prediction", type="primary", use_container_width=True):
-        with st.spinner("Generating prediction..."):
-            try:
-                st.info("Connecting to: SUPER AI PREDICTION API")
-                response = requests.get("https://student-api-25156985.onrender.com/predict/ETH", timeout=60)
-                
-                st.info(f"Response status: {response.status_code}")
-                
-                if response.status_code == 200:
-                    prediction = response.json()
-                    st.success("API Response received successfully!")
-                    pred_high = prediction.get('pred_high_next', 0)
-                    latest_close = prediction.get('latest_close', 0)
-                    change_pct = ((pred_high - latest_close) / latest_close * 100)
-                    
-                    # Display prediction in a nice box
-                    st.markdown(f"""
-                    <div style="
-                        background: linear-gradient(135deg, #4CAF50, #45a049);
-                        color: white;
-                        padding: 1.5rem;
-                        border-radius: 15px;
-                        text-align: center;
-                        margin: 1rem 0;
-                        box-shadow: 0 4px 15px rgba(76, 175, 80, 0.3);
-                    ">
-                        <h3>Next-Day HIGH Prediction</h3>
-                        <h2>${pred_high:,.2f}</h2>
-                        <p>Expected change: {change_pct:+.2f}%</p>
-                        <small>Current Close: ${latest_close:,.2f}</small>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Show additional details
-                    with st.expander("Prediction Details"):
-                        st.json(prediction)
-                        
-                else:
-                    st.error(f"API returned status code: {response.status_code}")
-                    st.error(f"Response text: {response.text}")
-                    st.info("**Start the API:** `uvicorn app.main:app --reload --port 8000`")
-                    
-            except requests.exceptions.Timeout:
-                st.error("Request timed out - API is taking too long to respond")
-                st.info("**Your Render service might be sleeping. Try again in a few seconds.**")
-            except requests.exceptions.ConnectionError:
-                st.error("Connection error - Cannot reach the API server")
-                st.info("**Check if your Render deployment is running**")
-            except requests.exceptions.RequestException as e:
-                st.error(f"Request error: {str(e)}")
-            except Exception as e:
-                st.error(f"Unexpected error: {str(e)}")
-                st.error(f"Error type: {type(e).__name__}")
-                st.info("**Make sure your FastAPI server is running on port 8000**")
+    _eth_prediction_panel()
 
     # Ethereum Ecosystem
     st.markdown("---")
@@ -1,11 +1,84 @@
 import os
 import math
 import json
-import time
 import requests
-import numpy as np
 import pandas as pd
 import streamlit as st
+from app import indicators
+from app.charting import DEFAULT_CHART_WIDTH, downsample_frame, target_points
+from app.figure_cache import cached_vega_spec
+from app.metrics import span
+from app.providers import load_daily_history
+from app.shared_cache import shared_cache
+from app.prediction_client import (
+    PREDICTION_APIS,
+    PredictionError,
+    PredictionRouteNotFound,
+    get_prediction_client,
+)
+
+# ---------- Data fetch (CoinGecko, else Kraken or yfinance) ----------
+XRP_ID = "ripple"
+# Default history window of the sidebar slider (also warmed by app.prefetch)
+DEFAULT_DAYS = 90
+
+@shared_cache(ttl=300)
+def fetch_xrp_coingecko(days: int) -> pd.DataFrame:
+    """Return daily XRP df with ['timestamp','close','volume','marketCap'] ascending."""
+    start = pd.Timestamp.now(tz="UTC").normalize() - pd.Timedelta(days=days)
+    # Market cap is CoinGecko-only; it is NaN (shown as "—") when another provider answered
+    stored = load_daily_history(XRP_ID, start.timestamp(), needs=("close", "volume"))
+
+    daily = (stored.rename(columns={"market_cap": "marketCap"})
+                   .reindex(columns=["close","volume","marketCap"])
+                   .reset_index())
+
+    # ensure numeric
+    for c in ["close","volume","marketCap"]:
+        daily[c] = pd.to_numeric(daily[c], errors="coerce")
+
+    daily = daily.dropna(subset=["timestamp","close"]).sort_values("timestamp").reset_index(drop=True)
+    return daily[["timestamp","close","volume","marketCap"]]
+
+@st.fragment
+def _xrp_prediction_panel(api_base, days):
+    """Prediction button and result; a click reruns only this panel"""
+    def _debug_response(text):
+        try:
+            st.code(text[:2000], language="json")
+        except Exception:
+            st.text(text[:2000])
+
+    api_ok = False
+    if api_base:
+        # Routes (/predict/ or /predict/ripple/) are discovered and cached by the
+        # prediction client on the first click instead of being probed every rerun
+        if st.button("Get Prediction"):
+            with st.spinner("Calling FastAPI…"):
+                try:
+                    prediction = get_prediction_client().predict("ripple", base_url=api_base, days=days)
+                    pred_high = prediction["predicted_high"]
+                    as_of = prediction["as_of"]
+                    pred_day = prediction["prediction_day"]
+
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric(
+                        "Predicted Next-Day HIGH (USD)",
+                        f"${pred_high:,.6f}" if pred_high is not None else "—"
+                    )
+                    col2.metric("As of (UTC)", as_of.split("T")[0] if as_of else "—")
+                    col3.metric("Prediction Day", pred_day.split("T")[0] if pred_day else "—")
+
+                    with st.expander("Raw response"):
+                        st.json(prediction["raw"])
+                    api_ok = True
+                except PredictionRouteNotFound:
+                    st.error("Prediction endpoint not found (tried /predict/ and /predict/ripple/). Check your FastAPI routes.")
+                except PredictionError as e:
+                    st.error(f"Prediction failed ({e.status_code})")
+                    _debug_response(e.text)
+                except requests.RequestException as e:
+                    st.error(f"Could not reach FastAPI: {e}")
 
 def xrp_detail_page():
     # ---------- Page setup ----------
@@ -24,58 +97,16 @@ def xrp_detail_page():
     st.sidebar.header("Controls")
 
     # CoinGecko days (used by your FastAPI too)
-    days = st.sidebar.slider("History window (days)", min_value=30, max_value=365, value=90, step=10)
-
-    # FastAPI backend URL (try to read from secrets or env first)
-    default_api = (
-        #st.secrets.get("https://at3-fastapi.onrender.com", None)
-        #or os.environ.get("FASTAPI_URL", None)
-        #or "http://localhost:8000"
-        "https://at3-fastapi.onrender.com"
-    )
+    days = st.sidebar.slider("History window (days)", min_value=30, max_value=365, value=DEFAULT_DAYS, step=10)
+
+    # FastAPI backend URL (XRP_PREDICTION_API env var, else the hosted API)
+    default_api = PREDICTION_APIS["ripple"]["base"]
     api_base = st.sidebar.text_input("FastAPI URL", value=default_api, help="e.g., http://localhost:8000")
 
     st.sidebar.caption("Make sure your FastAPI is running and reachable from this machine.")
 
-    # ---------- Data fetch (CoinGecko) ----------
-    COINGECKO_BASE = "https://api.coingecko.com/api/v3"
-    XRP_ID = "ripple"
-
-    @st.cache_data(show_spinner=True, ttl=300)
-    def fetch_xrp_coingecko(days: int) -> pd.DataFrame:
-        """Return daily XRP df with ['timestamp','close','volume','marketCap'] ascending."""
-        url = f"{COINGECKO_BASE}/coins/{XRP_ID}/market_chart"
-        params = {"vs_currency": "usd", "days": str(days)}
-        r = requests.get(url, params=params, timeout=25)
-        r.raise_for_status()
-        data = r.json()
-
-        prices = pd.DataFrame(data.get("prices", []), columns=["ts", "price"])
-        caps   = pd.DataFrame(data.get("market_caps", []), columns=["ts", "marketCap"])
-        vols   = pd.DataFrame(data.get("total_volumes", []), columns=["ts", "volume"])
-
-        if prices.empty:
-            return pd.DataFrame(columns=["timestamp","close","volume","marketCap"])
-
-        df = prices.merge(caps, on="ts", how="left").merge(vols, on="ts", how="left")
-        df["timestamp"] = pd.to_datetime(df["ts"], unit="ms", utc=True)
-        df = df.set_index("timestamp").sort_index()
-
-        daily = pd.DataFrame({
-            "close":     df["price"].resample("1D").last(),
-            "volume":    df["volume"].resample("1D").last(),
-            "marketCap": df["marketCap"].resample("1D").last(),
-        }).dropna(subset=["close"]).reset_index()
-
-        # ensure numeric
-        for c in ["close","volume","marketCap"]:
-            daily[c] = pd.to_numeric(daily[c], errors="coerce")
-
-        daily = daily.dropna(subset=["timestamp","close"]).sort_values("timestamp").reset_index(drop=True)
-        return daily[["timestamp","close","volume","marketCap"]]
-
     # ---------- Load data ----------
-    with st.spinner("Fetching XRP data from CoinGecko..."):
+    with st.spinner("Fetching XRP data..."):
         try:
             df = fetch_xrp_coingecko(days)
         except Exception as e:
@@ -83,12 +114,16 @@ def xrp_detail_page():
             st.stop()
 
     if df.empty:
-        st.warning("No data returned from CoinGecko. Try a larger window or check network.")
+        st.warning("No data returned from the market data providers. Try a larger window or check network.")
         st.stop()
 
     # ---------- Derived metrics ----------
-    df["return"] = np.log(df["close"]).diff()
-    df["vol_30d"] = df["return"].rolling(30).std() * np.sqrt(365)  # ann. vol (approx)
+    with span("transform.xrp_metrics", rows=len(df)):
+        df["return"] = indicators.log_returns(df["close"])
+        df["vol_30d"] = indicators.annualized_volatility(df["return"], 30)  # ann. vol (approx)
+        # Add MAs
+        for w in [7, 14]:
+            df[f"ma_{w}"] = indicators.rolling_mean(df["close"], w)
     last_row = df.iloc[-1]
     prev_row = df.iloc[-2] if len(df) >= 2 else last_row
 
@@ -108,35 +143,35 @@ def xrp_detail_page():
 
     # ---------- Charts ----------
     import altair as alt
-    alt.data_transformers.disable_max_rows()
-
-    price_chart = (
-        alt.Chart(df)
-          .mark_line()
-          .encode(
-              x=alt.X("timestamp:T", title="Date"),
-              y=alt.Y("close:Q", title="Close (USD)"),
-              tooltip=[alt.Tooltip("timestamp:T", title="Date"), alt.Tooltip("close:Q", format="$.4f")]
-          )
-          .properties(height=320)
-    )
-
-    # Add MAs
-    for w in [7, 14]:
-        df[f"ma_{w}"] = df["close"].rolling(w).mean()
-
-    ma7 = alt.Chart(df).mark_line(opacity=0.7).encode(x="timestamp:T", y=alt.Y("ma_7:Q", title=""), color=alt.value("#888"))
-    ma14 = alt.Chart(df).mark_line(opacity=0.7).encode(x="timestamp:T", y=alt.Y("ma_14:Q", title=""), color=alt.value("#aaa"))
-
-    st.subheader("Price (Close) — with 7/14-day moving averages")
-    st.altair_chart(price_chart + ma7 + ma14, use_container_width=True)
-
-    colA, colB = st.columns(2)
-
-    with colA:
-        st.subheader("Volume (daily)")
-        vol_chart = (
-            alt.Chart(df)
+
+    price_cols = ["timestamp", "close", "ma_7", "ma_14"]
+    side_cols = ["timestamp", "volume", "marketCap"]
+
+    def build_price_chart():
+        # Ship only the plotted columns, downsampled to what the chart width can show
+        price_df = downsample_frame(df[price_cols], price_cols[1:], target_points(), x="timestamp")
+        price_chart = (
+            alt.Chart(price_df)
+              .mark_line()
+              .encode(
+                  x=alt.X("timestamp:T", title="Date"),
+                  y=alt.Y("close:Q", title="Close (USD)"),
+                  tooltip=[alt.Tooltip("timestamp:T", title="Date"), alt.Tooltip("close:Q", format="$.4f")]
+              )
+              .properties(height=320)
+        )
+
+        ma7 = alt.Chart(price_df).mark_line(opacity=0.7).encode(x="timestamp:T", y=alt.Y("ma_7:Q", title=""), color=alt.value("#888"))
+        ma14 = alt.Chart(price_df).mark_line(opacity=0.7).encode(x="timestamp:T", y=alt.Y("ma_14:Q", title=""), color=alt.value("#aaa"))
+        return price_chart + ma7 + ma14
+
+    def side_frame():
+        return downsample_frame(df[side_cols], side_cols[1:],
+                                target_points(width_px=DEFAULT_CHART_WIDTH // 2), x="timestamp")
+
+    def build_volume_chart():
+        return (
+            alt.Chart(side_frame())
               .mark_bar()
               .encode(
                   x=alt.X("timestamp:T", title="Date"),
@@ -145,12 +180,10 @@ def xrp_detail_page():
               )
               .properties(height=240)
         )
-        st.altair_chart(vol_chart, use_container_width=True)
 
-    with colB:
-        st.subheader("Market Cap (daily)")
-        mcap_chart = (
-            alt.Chart(df)
+    def build_mcap_chart():
+        return (
+            alt.Chart(side_frame())
               .mark_line()
               .encode(
                   x=alt.X("timestamp:T", title="Date"),
@@ -159,61 +192,29 @@ def xrp_detail_page():
               )
               .properties(height=240)
         )
-        st.altair_chart(mcap_chart, use_container_width=True)
+
+    # Vega-Lite specs are reused across reruns until the data changes
+    with span("render.xrp_charts", days=days):
+        st.subheader("Price (Close) — with 7/14-day moving averages")
+        st.vega_lite_chart(spec=cached_vega_spec(build_price_chart, XRP_ID, days, "price_ma", df[price_cols]),
+                           use_container_width=True)
+
+        colA, colB = st.columns(2)
+
+        with colA:
+            st.subheader("Volume (daily)")
+            st.vega_lite_chart(spec=cached_vega_spec(build_volume_chart, XRP_ID, days, "volume", df[side_cols]),
+                               use_container_width=True)
+
+        with colB:
+            st.subheader("Market Cap (daily)")
+            st.vega_lite_chart(spec=cached_vega_spec(build_mcap_chart, XRP_ID, days, "market_cap", df[side_cols]),
+                               use_container_width=True)
 
     st.divider()
 
     st.subheader("🔮 Next-Day HIGH Prediction (FastAPI)")
 
-    def _debug_response(resp):
-        try:
-            st.code(resp.text[:2000], language="json")
-        except Exception:
-            st.text(resp.text[:2000])
-
-    api_ok = False
-    if api_base:
-        try:
-            # Try both /predict/ and /predict/ripple/, and pass ?days= to match the sidebar
-            candidate_urls = [
-                f"{api_base.rstrip('/')}/predict/?days={days}",
-                f"{api_base.rstrip('/')}/predict/ripple/?days={days}",
-            ]
-            pred_url = None
-            for u in candidate_urls:
-                r = requests.get(u, timeout=60)
-                if r.status_code not in (404, 405):  # found a usable route
-                    pred_url = u
-                    break
-
-            if pred_url is None:
-                st.error("Prediction endpoint not found (tried /predict/ and /predict/ripple/). Check your FastAPI routes.")
-            else:
-                if st.button("Get Prediction"):
-                    with st.spinner("Calling FastAPI…"):
-                        resp = requests.get(pred_url, timeout=45)
-                        if resp.ok:
-                            payload = resp.json()
-                            # Only read the fields we actually want; use .get() to avoid KeyErrors
-                            pred_high = payload.get("predicted_high_usd", None)
-                            as_of = payload.get("as_of", "")
-                            pred_day = payload.get("prediction_day", "")
-
-                            col1, col2, col3 = st.columns(3)
-                            col1.metric(
-                                "Predicted Next-Day HIGH (USD)",
-                                f"${pred_high:,.6f}" if pred_high is not None else "—"
-                            )
-                            col2.metric("As of (UTC)", as_of.split("T")[0] if as_of else "—")
-                            col3.metric("Prediction Day", pred_day.split("T")[0] if pred_day else "—")
-
-                            with st.expander("Raw response"):
-                                st.json(payload)
-                        else:
-                            st.error(f"Prediction failed ({resp.status_code})")
-                            _debug_response(resp)
-            api_ok = True
-        except requests.RequestException as e:
-            st.error(f"Could not reach FastAPI: {e}")
+    _xrp_prediction_panel(api_base, days)
         
-    st.caption("Data: CoinGecko • Times are UTC • Educational use only, not financial advice.")
\ No newline at end of file
+    st.caption("Data: CoinGecko (Kraken / Yahoo Finance fallback) • Times are UTC • Educational use only, not financial advice.")
\ No newline at end of file
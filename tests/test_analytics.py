@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import analytics
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(0)
+    market = rng.normal(0, 0.03, size=400)
+    x = np.column_stack([market, 1.5 * market + rng.normal(0, 0.01, 400), rng.normal(0, 0.02, 400)])
+    x[rng.random(x.shape) < 0.1] = np.nan
+    x[:50, 2] = np.nan  # a late listing
+    return x
+
+
+def test_pairwise_covariance_matches_pandas(returns):
+    cov, var_row, var_col = analytics.pairwise_covariance(returns, min_obs=2)
+    frame = pd.DataFrame(returns)
+    np.testing.assert_allclose(cov, frame.cov(), rtol=1e-10)
+    # Variances over each pair's overlap, not over each column's own rows
+    both = frame[[0, 2]].dropna()
+    assert var_row[0, 2] == pytest.approx(both[0].var())
+    assert var_col[0, 2] == pytest.approx(both[2].var())
+    np.testing.assert_array_equal(var_col, var_row.T)
+
+
+def test_correlation_matrix_matches_pandas(returns):
+    corr = analytics.correlation_matrix(returns, min_obs=2)
+    np.testing.assert_allclose(corr, pd.DataFrame(returns).corr(), rtol=1e-10)
+
+
+def test_pairs_with_too_few_observations_are_nan(returns):
+    returns[:, 2] = np.nan
+    returns[:5, 2] = 0.01 * np.arange(5)
+    cov, _, _ = analytics.pairwise_covariance(returns, min_obs=10)
+    assert np.isnan(cov[2]).all() and np.isnan(cov[:, 2]).all()
+    assert np.isfinite(cov[:2, :2]).all()
+
+
+def test_rolling_benchmark_stats_match_pandas(returns):
+    corr, beta = analytics.rolling_benchmark_stats(returns, returns[:, 0], window=30, min_obs=10)
+    frame = pd.DataFrame(returns)
+    both = frame.notna() & frame[0].notna().to_numpy()[:, None]
+    for column in (1, 2):
+        x, y = frame[column].where(both[column]), frame[0].where(both[column])
+        expected_corr = x.rolling(30, min_periods=10).corr(y)
+        expected_beta = x.rolling(30, min_periods=10).cov(y) / y.rolling(30, min_periods=10).var()
+        # Only full windows are reported
+        assert np.isnan(corr[:29, column]).all() and np.isnan(beta[:29, column]).all()
+        np.testing.assert_allclose(corr[29:, column], expected_corr[29:], rtol=1e-8, atol=1e-12, equal_nan=True)
+        np.testing.assert_allclose(beta[29:, column], expected_beta[29:], rtol=1e-8, atol=1e-12, equal_nan=True)
+
+
+def test_align_closes_and_log_returns():
+    day = pd.date_range("2024-01-01", periods=3, freq="D", tz="UTC")
+    frames = {"a": pd.DataFrame({"Close": [1.0, 2.0, 4.0]}, index=day + pd.Timedelta(hours=5)),
+              "b": pd.DataFrame({"Close": [3.0, 6.0]}, index=day[1:]),
+              "empty": pd.DataFrame()}
+    closes = analytics.align_closes(frames)
+    assert list(closes.columns) == ["a", "b"]
+    assert list(closes.index) == list(day)
+    np.testing.assert_allclose(analytics.log_returns(closes.to_numpy()),
+                               [[np.log(2), np.nan], [np.log(2), np.log(2)]], equal_nan=True)
+
+
+def test_cross_asset_stats_come_from_the_fingerprinted_matrix(monkeypatch, returns):
+    from app import shared_cache
+
+    monkeypatch.setattr(shared_cache, "_backend", shared_cache.MemoryBackend())
+    day = pd.date_range("2024-01-01", periods=len(returns) + 1, freq="D", tz="UTC")
+    closes = pd.DataFrame(100 * np.exp(np.nancumsum(np.vstack([np.zeros(3), returns]), axis=0)),
+                          index=day, columns=["bitcoin", "b", "c"])
+    matrices = iter([closes, closes ** 2])  # new candles by the next rerun
+    monkeypatch.setattr(analytics, "get_close_matrix", lambda period, crypto_ids: next(matrices))
+
+    got, stats = analytics.cross_asset_stats("1y", ["bitcoin", "b", "c"], window=90)
+    assert got is closes
+    recent = analytics.log_returns(closes.to_numpy())[-90:]
+    np.testing.assert_allclose(stats["correlation"], analytics.correlation_matrix(recent), equal_nan=True)
+    assert stats["volatility"].index.tolist() == ["bitcoin", "b", "c"]
+    assert set(stats) == {"correlation", "covariance", "volatility", "rolling_correlation", "rolling_beta"}
+    # A new matrix is a new key: twice the log returns, four times the covariance
+    _, again = analytics.cross_asset_stats("1y", ["bitcoin", "b", "c"], window=90)
+    np.testing.assert_allclose(again["correlation"], stats["correlation"], equal_nan=True)
+    np.testing.assert_allclose(again["covariance"], 4 * stats["covariance"], equal_nan=True)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from app import backtest, indicators
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(0)
+    return 100 * np.exp(rng.normal(0, 0.01, size=2000).cumsum())
+
+
+def test_run_backtest_holds_each_position_over_the_next_bar():
+    close = [100.0, 110.0, 99.0, 99.0]
+    curves, stats = backtest.run_backtest(close, [1, 1, 0, 0], seconds=86400, cost_bps=10)
+    np.testing.assert_array_equal(curves["position"], [0, 1, 1, 0])
+    np.testing.assert_allclose(curves["return"], [0, 0.1 - 0.001, -0.1, -0.001])
+    np.testing.assert_allclose(curves["equity"], np.cumprod([1, 1.099, 0.9, 0.999]))
+    assert stats["trades"] == 2
+    assert stats["exposure"] == pytest.approx(0.5)
+    assert stats["buy_hold_return"] == pytest.approx(-0.01)
+    assert stats["max_drawdown"] == pytest.approx(1.099 * 0.9 * 0.999 / 1.099 - 1)
+
+
+def test_run_backtest_matches_a_bar_by_bar_loop(prices):
+    positions = backtest.ema_cross_positions(prices, allow_short=True)
+    curves, stats = backtest.run_backtest(prices, positions, seconds=3600, cost_bps=5)
+    equity, held, peak, worst = 1.0, 0.0, 1.0, 0.0
+    for i in range(1, prices.size):
+        target = positions[i - 1]
+        equity *= 1 + target * (prices[i] / prices[i - 1] - 1) - abs(target - held) * 5e-4
+        held = target
+        peak = max(peak, equity)
+        worst = min(worst, equity / peak - 1)
+    assert curves["equity"][-1] == pytest.approx(equity, rel=1e-10)
+    assert stats["max_drawdown"] == pytest.approx(worst, rel=1e-10)
+    assert stats["total_return"] == pytest.approx(equity - 1, rel=1e-10)
+
+
+def test_flat_strategy_returns_nothing(prices):
+    _, stats = backtest.run_backtest(prices, np.zeros(prices.size), seconds=86400)
+    assert stats["total_return"] == 0 and stats["trades"] == 0
+    assert np.isnan(stats["sharpe"])
+
+
+def test_ema_cross_positions_follow_the_emas_after_warmup(prices):
+    positions = backtest.ema_cross_positions(prices, fast=9, slow=21)
+    assert not positions[:20].any()
+    long = indicators.ema(prices, 9) > indicators.ema(prices, 21)
+    np.testing.assert_array_equal(positions[20:], long[20:].astype(float))
+    assert set(np.unique(backtest.ema_cross_positions(prices, allow_short=True)[20:])) == {-1.0, 1.0}
+
+
+def test_bollinger_positions_enter_below_the_band_and_exit_at_the_middle(prices):
+    positions = backtest.bollinger_positions(prices, window=20, num_std=2)
+    sma, _, _, lower = indicators.bollinger_bands(prices, 20, 2)
+    assert set(np.unique(positions)) <= {0.0, 1.0}
+    entries = np.flatnonzero(np.diff(positions, prepend=0) == 1)
+    exits = np.flatnonzero(np.diff(positions, prepend=0) == -1)
+    assert entries.size and (prices[entries] < lower[entries]).all()
+    # An exit is a close crossing the middle band
+    assert (np.sign(prices[exits] - sma[exits]) != np.sign(prices[exits - 1] - sma[exits - 1])).all()
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from app import charting
+
+
+@pytest.fixture
+def candles():
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(rng.normal(0, 0.01, size=1000).cumsum())
+    index = pd.date_range("2024-01-01", periods=close.size, freq="h", tz="UTC")
+    return pd.DataFrame({"open": np.roll(close, 1), "high": close * 1.01, "low": close * 0.99,
+                         "close": close, "volume": rng.random(close.size)}, index=index)
+
+
+def test_lttb_keeps_endpoints_and_the_spike():
+    y = np.sin(np.linspace(0, 20, 10_000))
+    y[4321] = 10.0
+    picked = charting.lttb_indices(np.arange(y.size), y, 200)
+    assert picked.size == 200
+    assert picked[0] == 0 and picked[-1] == y.size - 1
+    assert np.all(np.diff(picked) > 0)
+    assert 4321 in picked
+
+
+def test_lttb_skips_nan_and_returns_short_series_whole():
+    y = np.array([np.nan, 1.0, 2.0, np.nan, 3.0])
+    np.testing.assert_array_equal(charting.lttb_indices(np.arange(5), y, 10), [1, 2, 4])
+    y = np.where(np.arange(100) % 7 == 0, np.nan, np.arange(100.0))
+    picked = charting.lttb_indices(np.arange(100), y, 10)
+    assert picked.size == 10 and np.isfinite(y[picked]).all()
+    assert picked[0] == 1 and picked[-1] == 99
+
+
+def test_downsample_frame_respects_the_budget(candles):
+    out = charting.downsample_frame(candles, ["high", "low"], 100)
+    assert len(out) <= 100
+    assert out.index.is_monotonic_increasing
+    assert charting.downsample_frame(candles, ["close"], 5000) is candles
+
+
+def test_aggregate_ohlc_matches_pandas(candles):
+    out = charting.aggregate_ohlc(candles, 30)
+    assert len(out) == 30
+    buckets = np.repeat(np.arange(30), np.diff(np.linspace(0, len(candles), 31).astype(np.int64)))
+    grouped = candles.groupby(buckets)
+    expected = grouped.agg({"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"})
+    expected.index = candles.index[np.flatnonzero(np.diff(buckets, prepend=-1))]
+    pd.testing.assert_frame_equal(out, expected, check_freq=False)
+
+
+def test_aggregate_ohlc_leaves_small_frames_alone(candles):
+    assert charting.aggregate_ohlc(candles, len(candles)) is candles
+
+
+def test_line_trace_switches_to_webgl():
+    assert isinstance(charting.line_trace(np.arange(10), np.arange(10)), go.Scatter)
+    big = np.arange(charting.WEBGL_THRESHOLD + 1)
+    assert isinstance(charting.line_trace(big, big), go.Scattergl)
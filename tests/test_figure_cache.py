@@ -0,0 +1,27 @@
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from app.figure_cache import cached_figure
+
+
+def test_cached_figure_builds_once_and_returns_independent_figures():
+    data = pd.DataFrame({"price": np.linspace(1, 2, 50)})
+    calls = []
+
+    def build():
+        calls.append(1)
+        return go.Figure(go.Scatter(y=data["price"]), layout={"title": {"text": "price"}})
+
+    expected = json.loads(pio.to_json(build(), validate=False))
+    calls.clear()
+
+    first = cached_figure(build, "test", "1d", "line", data)
+    first.update_layout(title_text="changed")
+    second = cached_figure(build, "test", "1d", "line", data)
+    assert len(calls) == 1
+    assert second.layout.title.text == "price"
+    assert json.loads(pio.to_json(second, validate=False)) == expected
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+from app.history_store import HistoryStore
+
+
+def test_read_keeps_prices_float64_and_narrows_volume_and_count(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    index = pd.date_range("2024-01-01", periods=3, freq="D", tz="UTC")
+    close = [65000.12, 65123.45, 64999.99]
+    frame = pd.DataFrame({"open": close, "high": close, "low": close, "close": close,
+                          "volume": [1.5, 2.5, 3.5], "count": [10, 20, 30]}, index=index)
+    store.write("BTC", frame, index[0].timestamp())
+
+    stored = store.read("BTC")
+    assert stored["close"].dtype == np.float64
+    np.testing.assert_array_equal(stored["close"], close)
+    assert stored["volume"].dtype == np.float32
+    assert stored["count"].dtype == np.int32
+    assert "vwap" not in stored
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import indicators
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(0)
+    return 100 * np.exp(rng.normal(0, 0.01, size=3000).cumsum())
+
+
+@pytest.fixture
+def gappy(prices):
+    x = prices.copy()
+    x[np.random.default_rng(1).random(x.size) < 0.2] = np.nan
+    x[:3] = np.nan
+    x[-2:] = np.nan
+    return x
+
+
+@pytest.mark.parametrize("span", [1, 2, 3, 9, 21, 200])
+def test_ema_matches_pandas(prices, span):
+    expected = pd.Series(prices).ewm(span=span, adjust=False).mean()
+    np.testing.assert_allclose(indicators.ema(prices, span), expected, rtol=1e-10)
+
+
+def test_ema_skips_nan_like_pandas():
+    values = [1, 2, np.nan, 4, 5]
+    np.testing.assert_allclose(indicators.ema(values, 3), [1, 1.5, 1.5, 3.375, 4.1875])
+
+
+@pytest.mark.parametrize("span", [3, 9, 21])
+def test_ema_with_gaps_matches_pandas(gappy, span):
+    expected = pd.Series(gappy).ewm(span=span, adjust=False).mean()
+    np.testing.assert_allclose(indicators.ema(gappy, span), expected, rtol=1e-10, equal_nan=True)
+
+
+def test_ema_edge_cases():
+    assert indicators.ema([], 9).size == 0
+    assert np.isnan(indicators.ema([np.nan, np.nan], 9)).all()
+
+
+@pytest.mark.parametrize("window", [2, 7, 20])
+def test_rolling_mean_and_std_match_pandas(gappy, window):
+    series = pd.Series(gappy).rolling(window)
+    np.testing.assert_allclose(indicators.rolling_mean(gappy, window), series.mean(), rtol=1e-9, equal_nan=True)
+    # pandas keeps running sums for std, so it is the less exact of the two
+    np.testing.assert_allclose(indicators.rolling_std(gappy, window), series.std(), rtol=1e-7, equal_nan=True)
+
+
+def test_streaming_ema_matches_batch(gappy):
+    state = indicators.StreamingEMA(9)
+    streamed = [state.update(value) for value in gappy]
+    np.testing.assert_allclose(streamed, indicators.ema(gappy, 9), rtol=1e-10, equal_nan=True)
+
+
+def test_rolling_stats_match_batch(prices):
+    stats = indicators.RollingStats(20)
+    streamed = np.array([stats.update(value) for value in prices])
+    np.testing.assert_allclose(streamed[:, 0], indicators.rolling_mean(prices, 20), rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(streamed[:, 1], indicators.rolling_std(prices, 20), rtol=1e-9, equal_nan=True)
+
+
+def test_engine_append_matches_batch_and_preview(prices):
+    config = dict(sma_windows=(7,), ema_spans=(9, 21), bollinger_window=20, vol_window=30)
+    engine = indicators.IndicatorEngine(prices[:-1], **config)
+    preview = engine.preview(prices[-1])
+    appended = engine.append(prices[-1])
+    batch = indicators.IndicatorEngine(prices, **config).columns
+    for key, value in appended.items():
+        assert preview[key] == pytest.approx(value, nan_ok=True)
+        assert value == pytest.approx(batch[key][-1], rel=1e-8, nan_ok=True)
+
+
+def test_follow_appends_new_candles_and_rebuilds_on_other_history(prices):
+    index = pd.date_range("2024-01-01", periods=prices.size, freq="min")
+    close = pd.Series(prices, index=index)
+    engine = indicators.follow("test", close.iloc[:2000], ema_spans=(9,))
+    assert indicators.follow("test", close, ema_spans=(9,)) is engine
+    # The forming last candle is left out of the engine
+    assert engine.preview(prices[-1])["ema_9"] == pytest.approx(indicators.ema(prices, 9)[-1], rel=1e-10)
+    assert indicators.follow("test", close.iloc[:1000], ema_spans=(9,)) is not engine
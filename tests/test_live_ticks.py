@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from app import live_ticks
+from app.live_ticks import TickBuffer, TickerFeed
+
+
+def test_tick_buffer_keeps_the_newest_ticks():
+    buffer = TickBuffer(size=2)
+    assert buffer.latest() is None
+    for ts in range(3):
+        buffer.append(ts, 100.0 + ts)
+    assert buffer.latest() == (2, 102.0)
+
+
+def test_idle_feed_thread_exits_and_clears_itself(monkeypatch):
+    connects = []
+    monkeypatch.setattr("websockets.sync.client.connect", lambda *a, **k: connects.append(a))
+    feed = TickerFeed("ws://unused", idle_after=0)
+    feed._thread = threading.current_thread()
+    feed._run()  # nothing has read a price: returns without connecting
+    assert feed._thread is None
+    assert connects == []
+
+
+@pytest.mark.parametrize("owner", [None, threading.Thread(target=lambda: None)])
+def test_idle_check_leaves_another_threads_slot_alone(owner):
+    feed = TickerFeed("ws://unused", idle_after=0)
+    feed._thread = owner
+    assert feed._stop_if_idle()
+    assert feed._thread is owner
+
+
+def test_coin_without_live_feed_gets_a_plain_metric(monkeypatch):
+    metrics = []
+    monkeypatch.setattr(live_ticks.st, "metric", lambda *a, **k: metrics.append((a, k)))
+    monkeypatch.setattr(live_ticks, "_live_price_fragment", lambda *a: pytest.fail("fragment used"))
+    monkeypatch.setattr(live_ticks, "get_ticker_feed", lambda: pytest.fail("feed started"))
+    live_ticks.live_price_metric({'id': 'not-on-kraken', 'current_price': 2.5,
+                                  'price_change_percentage_24h': -1.0})
+    assert metrics == [(("Current Price", "$2.50"), {'delta': "-1.00%"})]
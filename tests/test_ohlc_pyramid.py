@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import ohlc_pyramid
+from app.history_store import HistoryStore
+
+T0 = 1_700_000_100  # a multiple of 300
+
+
+def _minutes(count, start=T0, skip=()):
+    ts = [start + 60 * i for i in range(count) if i not in skip]
+    close = 100.0 + np.arange(len(ts))
+    return pd.DataFrame({"open": close - 0.5, "high": close + 1, "low": close - 1, "close": close,
+                         "volume": np.ones(len(ts)), "vwap": close, "count": np.full(len(ts), 2)},
+                        index=pd.to_datetime(ts, unit="s", utc=True))
+
+
+def _starts(frame):
+    return frame.index.as_unit("s").asi8.tolist()
+
+
+def test_rollup_aggregates_full_buckets():
+    out = ohlc_pyramid.rollup(_minutes(10), 300, 60, now=T0 + 3600)
+    assert _starts(out) == [T0, T0 + 300]
+    first = out.iloc[0]
+    assert (first["open"], first["high"], first["low"], first["close"]) == (99.5, 105.0, 99.0, 104.0)
+    assert first["volume"] == 5 and first["count"] == 10
+    assert first["vwap"] == pytest.approx(102.0)
+
+
+def test_rollup_drops_gappy_and_partial_buckets_but_keeps_the_forming_one():
+    frame = _minutes(14, skip=(2,))  # a gap in the first bucket; the third has 4 of its 5 minutes
+    out = ohlc_pyramid.rollup(frame, 300, 60, now=T0 + 3600)
+    assert _starts(out) == [T0 + 300]
+    forming = ohlc_pyramid.rollup(frame, 300, 60, now=T0 + 14 * 60)
+    assert _starts(forming) == [T0 + 300, T0 + 600]
+
+
+def test_rollup_of_nothing_is_empty():
+    assert ohlc_pyramid.rollup(_minutes(0), 300, 60).empty
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    monkeypatch.setattr(ohlc_pyramid, "get_history_store", lambda: store)
+    return store
+
+
+def _stored(store, seconds, start, end):
+    ts = np.arange(start, end, seconds)
+    frame = pd.DataFrame({"close": np.ones(ts.size)}, index=pd.to_datetime(ts, unit="s", utc=True))
+    store.write(ohlc_pyramid.level_series("bitcoin", seconds), frame, start)
+
+
+def test_choose_level_picks_the_coarsest_level_with_enough_candles(store):
+    day = ohlc_pyramid.DAY
+    end = T0 + 400 * day
+    _stored(store, 60, end - 2 * day, end)
+    _stored(store, 3600, end - 365 * day, end)
+    _stored(store, day, T0, end)
+    choose = ohlc_pyramid.choose_level
+    # 400 candles per chart (1200px at 1/3 candle per pixel)
+    assert choose("bitcoin", end - 30 * day, end) == 3600
+    assert choose("bitcoin", end - 6 * 3600, end) == 60
+    assert choose("bitcoin", T0, end) == day  # only the daily level reaches back this far
+    assert choose("bitcoin", end - 3 * day, end) == 3600  # the minute level doesn't reach back 3 days
+
+
+def test_choose_level_without_history_uses_the_coarsest_level(store):
+    assert ohlc_pyramid.choose_level("bitcoin", T0, T0 + 86400) == ohlc_pyramid.LEVELS[-1]
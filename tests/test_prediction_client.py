@@ -0,0 +1,49 @@
+import pytest
+
+from app import prediction_client
+from app.prediction_client import PredictionClient, PredictionError
+
+
+class _Response:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.text = "" if payload is None else str(payload)
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+def test_missing_latest_close_is_none(monkeypatch):
+    monkeypatch.setattr(prediction_client, "http_get", lambda url, timeout: _Response(200, {"pred_high_next": 2500}))
+    result = PredictionClient().predict("ethereum")
+    assert result["predicted_high"] == 2500
+    assert result["latest_close"] is None
+
+
+def test_cached_failure_is_raised_as_a_new_exception(monkeypatch):
+    calls = []
+
+    def http_get(url, timeout):
+        calls.append(url)
+        return _Response(503)
+
+    monkeypatch.setattr(prediction_client, "http_get", http_get)
+    client = PredictionClient()
+    with pytest.raises(PredictionError) as first:
+        client.predict("ethereum")
+    with pytest.raises(PredictionError) as second:
+        client.predict("ethereum")
+    assert len(calls) == 1
+    assert second.value is not first.value
+    assert second.value.status_code == 503
+
+
+def test_results_are_bounded_lru(monkeypatch):
+    monkeypatch.setattr(prediction_client, "RESULT_CACHE_SIZE", 2)
+    monkeypatch.setattr(prediction_client, "http_get",
+                        lambda url, timeout: _Response(200, {"predicted_high_usd": 0.5}))
+    client = PredictionClient()
+    for days in (7, 14, 7, 30):
+        client.predict("ripple", base_url="http://api", days=days)
+    assert [key[-1] for key in client._results] == [7, 30]
@@ -0,0 +1,119 @@
+import pytest
+
+from app import providers
+from app.providers import CircuitBreaker, ProviderError, ProviderRouter
+from app.rate_limit import RateLimitTimeout
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(providers.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failures=3, cooldown=30)
+    assert not breaker.failure() and not breaker.failure()
+    assert breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_breaker_lets_one_trial_through_and_backs_off_when_it_fails(clock):
+    breaker = CircuitBreaker(failures=1, cooldown=30, max_cooldown=100)
+    breaker.failure()
+    clock[0] += 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # the trial slot is taken
+    breaker.failure()
+    assert breaker.state == "open" and breaker.cooldown == 60
+    clock[0] += 60
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.cooldown == 100
+
+
+def test_breaker_closes_and_resets_after_a_successful_trial(clock):
+    breaker = CircuitBreaker(failures=1, cooldown=30)
+    breaker.failure()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.cooldown == 30 and breaker.consecutive_failures == 0
+
+
+class _Provider:
+    columns = ("close",)
+    ids = {"bitcoin": "BTC"}
+
+    def __init__(self, name):
+        self.name = name
+
+    def quotes(self, crypto_ids):
+        return {}
+
+
+def _fail():
+    raise OSError("down")
+
+
+def test_router_skips_a_provider_with_an_open_breaker(clock):
+    slow, fast = _Provider("slow"), _Provider("fast")
+    router = ProviderRouter([slow, fast])
+    assert router.candidates("quotes", ["bitcoin"]) == [slow, fast]
+    for _ in range(providers.BREAKER_FAILURES):
+        with pytest.raises(OSError):
+            router.call(slow, _fail)
+    assert router.candidates("quotes", ["bitcoin"]) == [fast]
+    with pytest.raises(ProviderError):
+        router.call(slow, lambda: "not called")
+    assert router.snapshot()["slow"]["breaker"] == "open"
+
+
+def test_router_ranks_by_measured_latency(clock):
+    first, second = _Provider("first"), _Provider("second")
+    router = ProviderRouter([first, second])
+    router._stats["first"].record(2.0, ok=True)
+    router._stats["second"].record(0.1, ok=True)
+    assert router.candidates("quotes", ["bitcoin"]) == [second, first]
+    assert router.candidates("quotes", ["ethereum"]) == []
+    assert router.candidates("quotes", ["bitcoin"], needs=("volume",)) == []
+
+
+
+def test_rate_limited_call_only_releases_a_trial_it_holds(clock):
+    provider = _Provider("gecko")
+    router = ProviderRouter([provider])
+    breaker = router._stats["gecko"].breaker
+
+    def queued_behind_a_trial():
+        # While this call waits in the rate limiter, the breaker opens and
+        # another request claims the half-open trial
+        for _ in range(providers.BREAKER_FAILURES):
+            breaker.failure()
+        clock[0] += breaker.cooldown
+        assert breaker.allow() == "trial"
+        raise RateLimitTimeout("queue full")
+
+    with pytest.raises(RateLimitTimeout):
+        router.call(provider, queued_behind_a_trial)
+    assert breaker.trial_running  # still the other request's
+    with pytest.raises(ProviderError):
+        router.call(provider, lambda: "not called")
+
+    breaker.trial_running = False
+
+    def rate_limited():
+        raise RateLimitTimeout("queue full")
+
+    with pytest.raises(RateLimitTimeout):
+        router.call(provider, rate_limited)  # this call held the trial
+    assert not breaker.trial_running and breaker.state == "half_open"
+
+def test_universe_coins_are_not_guessed_onto_yahoo_tickers(monkeypatch):
+    kraken, yahoo, gecko = providers.KrakenProvider(), providers.YFinanceProvider(), providers.CoinGeckoProvider()
+    monkeypatch.setattr(providers, "PROVIDERS", [gecko, kraken, yahoo])
+    providers.register_asset("some-coin", "sc")
+    assert gecko.ids["some-coin"] == "some-coin"
+    assert "some-coin" not in kraken.ids and "some-coin" not in yahoo.ids
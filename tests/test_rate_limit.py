@@ -0,0 +1,78 @@
+import threading
+import time
+from email.utils import formatdate
+
+import pytest
+
+from app import rate_limit
+from app.rate_limit import BACKGROUND, INTERACTIVE, RateLimitTimeout, TokenBucket
+
+
+class _Response:
+    def __init__(self, retry_after=None):
+        self.headers = {} if retry_after is None else {"Retry-After": retry_after}
+
+
+def test_parse_limits():
+    assert rate_limit._parse_limits(" coingecko=0.5:10, kraken=2 ,") == {"coingecko": (0.5, 10), "kraken": (2.0, 1)}
+
+
+def test_bucket_serves_the_burst_then_the_rate():
+    bucket = TokenBucket(rate=20, burst=3)
+    assert all(bucket.acquire(timeout=1) < 0.01 for _ in range(3))
+    waited = bucket.acquire(timeout=1)
+    assert 0.02 < waited < 0.2
+
+
+def test_empty_bucket_times_out():
+    bucket = TokenBucket(rate=0.01, burst=1)
+    bucket.acquire()
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire(timeout=0.05)
+
+
+def test_block_empties_the_bucket_and_fails_fast_past_the_deadline():
+    bucket = TokenBucket(rate=100, burst=5)
+    bucket.block(60)
+    start = time.monotonic()
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire(timeout=1)
+    assert time.monotonic() - start < 0.5  # no point waiting for a block that outlasts the timeout
+
+
+def test_interactive_requests_overtake_queued_background_ones():
+    bucket = TokenBucket(rate=10, burst=1)
+    bucket.acquire()
+    order = []
+
+    def take(priority):
+        bucket.acquire(priority, timeout=5)
+        order.append(priority)
+
+    background = threading.Thread(target=take, args=(BACKGROUND,))
+    background.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=take, args=(INTERACTIVE,))
+    interactive.start()
+    background.join()
+    interactive.join()
+    assert order == [INTERACTIVE, BACKGROUND]
+
+
+def test_background_priority_is_scoped_to_the_block():
+    assert rate_limit._priority.get() == INTERACTIVE
+    with rate_limit.background_priority():
+        assert rate_limit._priority.get() == BACKGROUND
+    assert rate_limit._priority.get() == INTERACTIVE
+
+
+def test_unlimited_upstreams_are_not_queued():
+    assert rate_limit.acquire("no-such-upstream") == 0.0
+    assert rate_limit.block("no-such-upstream", 10) is False
+
+
+def test_retry_after_seconds():
+    assert rate_limit.retry_after_seconds(_Response("12")) == 12.0
+    assert rate_limit.retry_after_seconds(_Response(formatdate(time.time() + 30, usegmt=True))) == pytest.approx(30, abs=2)
+    assert rate_limit.retry_after_seconds(_Response("soon")) is None
+    assert rate_limit.retry_after_seconds(_Response()) is None
@@ -0,0 +1,15 @@
+from app.refresher import BackgroundRefresher
+
+
+def test_timestamped_fetch_keeps_the_fetch_time():
+    refresher = BackgroundRefresher(lambda: ("quotes", 1000.0), refresh_after=60, timestamped=True)
+    assert refresher.get() == ("quotes", 1000.0, None)
+
+
+def test_failed_first_fetch_reports_the_error():
+    def fetch():
+        raise RuntimeError("down")
+
+    value, fetched_at, error = BackgroundRefresher(fetch, refresh_after=60, retry_after=60).get()
+    assert value is None and fetched_at is None
+    assert isinstance(error, RuntimeError)
@@ -0,0 +1,28 @@
+import os
+
+from app import shared_cache
+
+
+def test_default_cache_dir_is_anchored_to_the_repository():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(shared_cache.__file__)))
+    assert shared_cache.DEFAULT_CACHE_DIR == os.path.join(root, "data", "cache")
+
+
+def test_local_entries_are_bounded_lru(monkeypatch):
+    monkeypatch.setattr(shared_cache, "LOCAL_CACHE_SIZE", 2)
+    backend = shared_cache.MemoryBackend()
+    monkeypatch.setattr(shared_cache, "_backend", backend)
+    calls = []
+
+    @shared_cache.shared_cache(ttl=60)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert [square(x) for x in (1, 2, 1, 3)] == [1, 4, 1, 9]
+    assert calls == [1, 2, 3]
+    # 2 was evicted as least recently used; with the backend emptied only it reruns
+    backend._items.clear()
+    assert square(1) == 1 and square(3) == 9
+    assert square(2) == 4
+    assert calls == [1, 2, 3, 2]